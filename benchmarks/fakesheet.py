@@ -0,0 +1,88 @@
+import re
+
+# In-memory stand-in for a gspread worksheet, with the methods the sheet
+# updaters call, and a client object whose open() returns the fake worksheet
+# for a spreadsheet title, so the updaters' main() functions can run against
+# it unchanged. Every call is counted in self.calls.
+
+class FakeWorksheet:
+
+    def __init__(self, headers: list, rows: list):
+        self.values = [list(headers)] + [list(row) for row in rows]
+        self.calls = {}
+
+    def _count(self, method: str) -> None:
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+    def get_all_records(self) -> list:
+        self._count("get_all_records")
+        headers = self.values[0]
+        return [dict(zip(headers, row + [""] * (len(headers) - len(row)))) for row in self.values[1:]]
+
+    def get_all_values(self) -> list:
+        self._count("get_all_values")
+        return [list(row) for row in self.values]
+
+    def row_values(self, rowid: int) -> list:
+        self._count("row_values")
+        return list(self.values[rowid - 1])
+
+    def _set_cell(self, rowid: int, colid: int, value) -> None:
+        while len(self.values) < rowid:
+            self.values.append([])
+        row = self.values[rowid - 1]
+        while len(row) < colid:
+            row.append("")
+        row[colid - 1] = str(value)
+
+    def update_cell(self, rowid: int, colid: int, value) -> None:
+        self._count("update_cell")
+        self._set_cell(rowid, colid, value)
+
+    def batch_update(self, data: list, **kwargs) -> None:
+        self._count("batch_update")
+        for update in data:
+            [rowid, colid] = a1_to_rowcol(update["range"])
+            for [rowoffset, rowvalues] in enumerate(update["values"]):
+                for [coloffset, value] in enumerate(rowvalues):
+                    self._set_cell(rowid + rowoffset, colid + coloffset, value)
+
+    def append_row(self, row: list, **kwargs) -> None:
+        self._count("append_row")
+        self.values.append([str(value) for value in row])
+
+    def append_rows(self, rows: list, **kwargs) -> None:
+        self._count("append_rows")
+        for row in rows:
+            self.values.append([str(value) for value in row])
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+class FakeSpreadsheet:
+
+    def __init__(self, worksheet: FakeWorksheet):
+        self.fakeworksheet = worksheet
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        return self.fakeworksheet
+
+class FakeClient:
+
+    def __init__(self, worksheets: dict):
+        # spreadsheet title -> FakeWorksheet
+        self.fakeworksheets = worksheets
+
+    def open(self, title: str) -> FakeSpreadsheet:
+        return FakeSpreadsheet(self.fakeworksheets[title])
+
+    def service_account(self, *args, **kwargs):
+        # stands in for the gspread module itself: gspread.service_account() returns the client
+        return self
+
+def a1_to_rowcol(label: str) -> list:
+    m = re.match(r"([A-Z]+)(\d+)", label.split(":")[0])
+    colid = 0
+    for letter in m.group(1):
+        colid = colid * 26 + ord(letter) - ord("A") + 1
+    return [int(m.group(2)), colid]
@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import contextlib
+import subprocess
+
+benchmarkdir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(benchmarkdir))
+
+import synthetic
+import fakesheet
+
+# Times the github_issues entry points against synthetic issue repositories.
+# For each size, issues, a VCF and a censat BED with that many entries are
+# written once to the work directory; each benchmark case then runs in its own
+# python process (so peak RSS is per case), does its untimed setup, and times
+# one call of the entry point. Issues are served either by the fake hub in
+# benchmarks/bin (one process per hub command, like the real tool) or by the
+# in-process fake backend. Reported for each case: wall time, peak RSS of the
+# case's process, hub processes started, backend calls, and worksheet API calls.
+
+defaultsizes = "1000,10000"
+defaultbackend = "hub"
+
+def case_retrieve_all_issues(checkoutdir: str, datadir: str):
+    from github_issues import callhub
+    return lambda: callhub.retrieve_all_issues(checkoutdir)
+
+def case_sync_full(checkoutdir: str, datadir: str):
+    from github_issues import snapshot
+    return lambda: snapshot.sync_issues(checkoutdir, fullsync=True)
+
+def case_sync_incremental(checkoutdir: str, datadir: str):
+    from github_issues import snapshot
+    snapshot.sync_issues(checkoutdir, fullsync=True)
+    return lambda: snapshot.sync_issues(checkoutdir)
+
+def case_read_issue_vcffile(checkoutdir: str, datadir: str):
+    from github_issues import create_new_issues
+    return lambda: create_new_issues.read_issue_vcffile(os.path.join(datadir, "calls.vcf"))
+
+def case_check_region_list(checkoutdir: str, datadir: str):
+    from github_issues import snapshot
+    from github_issues import create_new_issues
+    snapshot.sync_issues(checkoutdir, fullsync=True)
+    [vcfline_dict, region_list] = create_new_issues.read_issue_vcffile(os.path.join(datadir, "calls.vcf"))
+    return lambda: create_new_issues.check_region_list(region_list, checkoutdir)
+
+def case_read_censat_annotations_cold(checkoutdir: str, datadir: str):
+    from github_issues import create_new_issues
+    # a fresh cache directory, so the compiled index is built inside the timed call
+    os.environ["XDG_CACHE_HOME"] = os.path.join(checkoutdir, "cache")
+    [vcfline_dict, region_list] = create_new_issues.read_issue_vcffile(os.path.join(datadir, "calls.vcf"))
+    return lambda: create_new_issues.read_censat_annotations(os.path.join(datadir, "censat.bed"), region_list)
+
+def case_read_censat_annotations_warm(checkoutdir: str, datadir: str):
+    from github_issues import create_new_issues
+    os.environ["XDG_CACHE_HOME"] = os.path.join(checkoutdir, "cache")
+    [vcfline_dict, region_list] = create_new_issues.read_issue_vcffile(os.path.join(datadir, "calls.vcf"))
+    create_new_issues.read_censat_annotations(os.path.join(datadir, "censat.bed"), region_list)
+    return lambda: create_new_issues.read_censat_annotations(os.path.join(datadir, "censat.bed"), region_list)
+
+def case_annotate_tracks(checkoutdir: str, datadir: str):
+    from github_issues import annotate
+    from github_issues import create_new_issues
+    [vcfline_dict, region_list] = create_new_issues.read_issue_vcffile(os.path.join(datadir, "calls.vcf"))
+    tracks = [[os.path.join(datadir, "censat.bed"), "{lcname}"], [os.path.join(datadir, "censat.bed"), "censat_track"]]
+    return lambda: annotate.annotate_regions(tracks, region_list)
+
+def sheet_case(modulename: str, sheetnames: list):
+    # the updater's main() against fake worksheets holding 90% of their issues, with
+    # one cell out of date in every 20th row
+    def setup(checkoutdir: str, datadir: str):
+        import importlib
+        from github_issues import snapshot
+        from github_issues import sheetsync
+        updater = importlib.import_module("github_issues." + modulename)
+        snapshot.sync_issues(checkoutdir, fullsync=True)
+        sheetconfigs = sheetsync.select_sheets(sheetsync.defaultsheets, sheetnames)
+        sheetissues = sheetsync.route_issues(snapshot.iterate_issues(checkoutdir), sheetconfigs)
+        rng = random.Random(4)
+        worksheets = {}
+        for sheetindex in range(len(sheetconfigs)):
+            headers = list(sheetconfigs[sheetindex]["columns"].keys())
+            rows = []
+            for issue in sheetissues[sheetindex].values():
+                if rng.random() < 0.1:
+                    continue
+                row = [str(issue[sheetconfigs[sheetindex]["columns"][header]]) for header in headers]
+                if rng.random() < 0.05:
+                    row[rng.randrange(1, len(row))] = "stale"
+                rows.append(row)
+            worksheets[sheetconfigs[sheetindex]["spreadsheet"]] = fakesheet.FakeWorksheet(headers, rows)
+        sheetsync.gspread = fakesheet.FakeClient(worksheets)
+        sys.argv = [modulename, "-s", checkoutdir]
+        return [updater.main, list(worksheets.values())]
+    return setup
+
+cases = {
+    "retrieve_all_issues":case_retrieve_all_issues,
+    "sync_full":case_sync_full,
+    "sync_incremental":case_sync_incremental,
+    "read_issue_vcffile":case_read_issue_vcffile,
+    "check_region_list":case_check_region_list,
+    "read_censat_annotations_cold":case_read_censat_annotations_cold,
+    "read_censat_annotations_warm":case_read_censat_annotations_warm,
+    "annotate_tracks":case_annotate_tracks,
+    "coverage_sheet":sheet_case("update_coverage_gsheet", ["coverage"]),
+    "phaseswitch_sheet":sheet_case("update_phaseswitch_gsheet", ["phaseswitch"]),
+    "all_sheets":sheet_case("sheetsync", ["coverage", "phaseswitch"]),
+}
+
+def count_hub_calls(calllog: str) -> int:
+    if not os.path.exists(calllog):
+        return 0
+    with open(calllog, 'r') as fh_log:
+        return len(fh_log.readlines())
+
+def peak_rss_mb() -> float:
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on linux and in bytes on macOS
+    if sys.platform == "darwin":
+        maxrss = maxrss / 1024
+    return maxrss / 1024
+
+def run_case(casename: str, datadir: str, checkoutdir: str) -> dict:
+    # runs in the case's own process; returns the measurements
+    from github_issues import backends
+    calllog = os.path.join(checkoutdir, "hubcalls.log")
+    os.environ["FAKEHUB_CALLLOG"] = calllog
+    backend = backends.get_backend(checkoutdir)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        setupresult = cases[casename](checkoutdir, datadir)
+    if isinstance(setupresult, list):
+        [function, worksheets] = setupresult
+    else:
+        [function, worksheets] = [setupresult, []]
+
+    # only calls made inside the timed call are counted
+    if os.path.exists(calllog):
+        os.remove(calllog)
+    backendcalls = dict(getattr(backend, "calls", {}))
+    for worksheet in worksheets:
+        worksheet.calls = {}
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        starttime = time.perf_counter()
+        function()
+        walltime = time.perf_counter() - starttime
+
+    results = {"seconds":walltime, "peakrssmb":peak_rss_mb(), "hubcalls":count_hub_calls(calllog)}
+    if hasattr(backend, "calls"):
+        results["backendcalls"] = sum(backend.calls.values()) - sum(backendcalls.values())
+    if len(worksheets) > 0:
+        results["sheetcalls"] = sum([worksheet.total_calls() for worksheet in worksheets])
+    return results
+
+def prepare_data(workdir: str, size: int) -> str:
+    datadir = os.path.join(workdir, str(size))
+    if not os.path.exists(os.path.join(datadir, "censat.bed")):
+        os.makedirs(datadir, exist_ok=True)
+        synthetic.write_issues(os.path.join(datadir, "issues.json"), size)
+        synthetic.write_vcf(os.path.join(datadir, "calls.vcf"), size)
+        synthetic.write_censat_bed(os.path.join(datadir, "censat.bed"), size)
+    return datadir
+
+def launch_case(casename: str, datadir: str, backendname: str) -> dict:
+    checkoutdir = os.path.join(datadir, "checkout-" + casename)
+    shutil.rmtree(checkoutdir, ignore_errors=True)
+    os.makedirs(checkoutdir)
+    # the fake hub rewrites its issue file on changes, so each case gets its own copy
+    issuesfile = os.path.join(checkoutdir, "issues.json")
+    shutil.copyfile(os.path.join(datadir, "issues.json"), issuesfile)
+
+    env = dict(os.environ)
+    env["PATH"] = os.path.join(benchmarkdir, "bin") + os.pathsep + env.get("PATH", "")
+    env["GITHUB_ISSUES_BACKEND"] = backendname
+    env["GITHUB_ISSUES_FAKEDATA"] = issuesfile
+    env["FAKEHUB_ISSUES"] = issuesfile
+    env["XDG_CACHE_HOME"] = os.path.join(checkoutdir, "cache")
+    command = [sys.executable, os.path.abspath(__file__), "--case", casename, "--datadir", datadir, "--checkout", checkoutdir]
+    processoutput = subprocess.run(command, env=env, capture_output=True, text=True)
+    if processoutput.returncode != 0:
+        lastline = (processoutput.stderr.strip().splitlines() or ["exit status " + str(processoutput.returncode)])[-1]
+        return {"error":lastline}
+    return json.loads(processoutput.stdout.strip().splitlines()[-1])
+
+def format_result(size: int, casename: str, result: dict) -> str:
+    if "error" in result.keys():
+        return "\t".join([str(size), casename, "failed: " + result["error"]])
+    return "\t".join([str(size), casename, "%.3f" % result["seconds"], "%.1f" % result["peakrssmb"], str(result["hubcalls"]),
+                      str(result.get("backendcalls", "-")), str(result.get("sheetcalls", "-"))])
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION] ...",
+        description="Benchmark github_issues entry points on synthetic issue repositories"
+    )
+    parser.add_argument('-n', '--sizes', type=str, default=defaultsizes, help='comma-delimited numbers of issues (and VCF records and censat intervals) to benchmark', required=False)
+    parser.add_argument('-c', '--cases', type=str, default=",".join(cases.keys()), help='comma-delimited benchmark cases to run', required=False)
+    parser.add_argument('-b', '--backend', type=str, default=defaultbackend, choices=["hub", "fake"], help='serve issues from the fake hub executable or the in-process fake backend', required=False)
+    parser.add_argument('-w', '--workdir', type=str, default="benchmark_data", help='directory for synthetic data, reused across runs', required=False)
+    parser.add_argument('-o', '--output', type=str, default=None, help='also append results to this tab-delimited file', required=False)
+    parser.add_argument('--case', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--datadir', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--checkout', type=str, default=None, help=argparse.SUPPRESS)
+
+    return parser
+
+def main() -> None:
+    parser = init_argparse()
+    args = parser.parse_args()
+
+    if args.case is not None:
+        print(json.dumps(run_case(args.case, args.datadir, args.checkout)))
+        return
+
+    casenames = args.cases.split(",")
+    for casename in casenames:
+        if casename not in cases.keys():
+            print("Unknown benchmark case " + casename + "--choose from " + ",".join(cases.keys()))
+            exit(1)
+
+    header = "\t".join(["issues", "case", "seconds", "peak_rss_mb", "hub_calls", "backend_calls", "sheet_calls"])
+    print(header)
+    for size in [int(size) for size in args.sizes.split(",")]:
+        datadir = prepare_data(os.path.abspath(args.workdir), size)
+        for casename in casenames:
+            line = format_result(size, casename, launch_case(casename, datadir, args.backend))
+            print(line, flush=True)
+            if args.output is not None:
+                with open(args.output, 'a') as fh_output:
+                    fh_output.write(args.backend + "\t" + line + "\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import json
+import random
+import argparse
+import datetime
+
+# Synthetic inputs for the benchmarks: issue dumps in the JSON layout read by
+# github_issues.fakegithub and benchmarks/bin/hub, VCFs of candidate issue
+# calls, and censat BED tracks. Everything is drawn from a seeded random
+# generator, so the same size and seed always give the same files.
+
+haplotypes = ["MATERNAL", "PATERNAL"]
+chromosomes = [str(i) for i in range(1, 23)] + ["X", "Y"]
+programlabels = ["coverage_pri", "flagger_intersect", "merqury", "phase_switch"]
+evidencelabels = ["hifi_evidence", "ont_evidence", "element_evidence", "illumina_evidence"]
+coveragelabels = ["hifi_cov_low", "hifi_cov_high", "ont_cov_low", "ont_cov_high"]
+contentlabels = ["ga", "ct", "tg", "aat_ggt"]
+censatlabels = ["alpha_sat", "hsat2", "hsat3"]
+diagnosislabels = ["priority", "false_positive", "help_wanted"]
+curators = ["nhansen", "arangrhie", "skoren", "mrvollger", "jmmcdaniel"]
+censatnames = ["alphasat", "HSat2", "HSat3", "bsat", "ct", "gsat", "censat"]
+bases = "ACGT"
+
+def chromosome_lengths(rng: random.Random) -> dict:
+    lengths = {}
+    for chromosome in chromosomes:
+        for haplotype in haplotypes:
+            lengths["chr" + chromosome + "_" + haplotype] = rng.randint(50000000, 250000000)
+    return lengths
+
+def random_labels(rng: random.Random) -> list:
+    issuelabels = rng.sample(programlabels, rng.choice([1, 1, 1, 2]))
+    if rng.random() < 0.6:
+        issuelabels.append(rng.choice(evidencelabels))
+    if rng.random() < 0.3:
+        issuelabels.append(rng.choice(coveragelabels))
+    if rng.random() < 0.2:
+        issuelabels.append(rng.choice(contentlabels))
+    if rng.random() < 0.1:
+        issuelabels.append(rng.choice(censatlabels))
+    if rng.random() < 0.05:
+        issuelabels.append("clipped")
+    if rng.random() < 0.05:
+        issuelabels.append("error_kmer")
+    if rng.random() < 0.1:
+        issuelabels.append(rng.choice(diagnosislabels))
+    return issuelabels
+
+def vcf_line(rng: random.Random, chrom: str, position: int) -> str:
+    ref = "".join([rng.choice(bases) for i in range(rng.choice([1, 1, 1, 2, 5, 20]))])
+    alt = rng.choice(bases)
+    genotype = rng.choice(["0/1", "1/1", "1/2"])
+    return "\t".join([chrom, str(position), ".", ref, alt, str(rng.randint(1, 60)), "PASS", ".", "GT:GQ:DP", genotype + ":" + str(rng.randint(1, 60)) + ":" + str(rng.randint(5, 80))])
+
+def synthetic_issues(numissues: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    lengths = chromosome_lengths(rng)
+    chromnames = list(lengths.keys())
+    updated = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    issues = []
+    for number in range(1, numissues + 1):
+        chrom = rng.choice(chromnames)
+        start = rng.randint(1, lengths[chrom] - 100)
+        end = start + rng.choice([0, 0, 1, 10, 50, 1000])
+        region = chrom + ":" + str(start) + "-" + str(end)
+        body = "### Assembly Region\n\n" + region + "\n\n### Assembly Version\n\nv0.7\n\n### DeepVariant Call\n\n" + vcf_line(rng, chrom, start) + "\n\n"
+        if rng.random() < 0.3:
+            body = body + "### Notes\n\nLooks like a collapsed repeat--see the coverage track near " + region + ".\n"
+        updated = updated + datetime.timedelta(seconds=rng.randint(1, 600))
+        issues.append({"number":number, "title":"Issue: " + region, "body":body,
+                       "state":"open" if rng.random() < 0.85 else "closed",
+                       "labels":random_labels(rng),
+                       "assignees":rng.sample(curators, rng.choice([0, 1, 1, 1, 2])),
+                       "updated":updated.strftime("%Y-%m-%dT%H:%M:%SZ")})
+    return issues
+
+def write_issues(issuesfile: str, numissues: int, seed: int = 1) -> None:
+    with open(issuesfile, 'w') as fh_issues:
+        json.dump(synthetic_issues(numissues, seed), fh_issues)
+
+def write_vcf(vcffile: str, numrecords: int, seed: int = 2) -> None:
+    rng = random.Random(seed)
+    lengths = chromosome_lengths(random.Random(1))
+    positions = {}
+    for i in range(numrecords):
+        chrom = rng.choice(list(lengths.keys()))
+        if chrom not in positions.keys():
+            positions[chrom] = []
+        positions[chrom].append(rng.randint(1, lengths[chrom] - 100))
+
+    with open(vcffile, 'w') as fh_vcf:
+        fh_vcf.write("##fileformat=VCFv4.2\n")
+        for chrom in lengths.keys():
+            fh_vcf.write("##contig=<ID=" + chrom + ",length=" + str(lengths[chrom]) + ">\n")
+        fh_vcf.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tHG002\n")
+        for chrom in lengths.keys():
+            for position in sorted(positions.get(chrom, [])):
+                fh_vcf.write(vcf_line(rng, chrom, position) + "\n")
+
+def write_censat_bed(bedfile: str, numintervals: int, seed: int = 3) -> None:
+    # nine-column BED like the censat browser track, with intervals from 1 kb to 1 Mb
+    rng = random.Random(seed)
+    lengths = chromosome_lengths(random.Random(1))
+    with open(bedfile, 'w') as fh_bed:
+        for i in range(numintervals):
+            chrom = rng.choice(list(lengths.keys()))
+            start = rng.randint(0, lengths[chrom] - 1000000)
+            end = start + rng.randint(1000, 1000000)
+            fh_bed.write("\t".join([chrom, str(start), str(end), rng.choice(censatnames), "0", ".", str(start), str(end), "0,0,0"]) + "\n")
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION] ...",
+        description="Write synthetic issue dumps, VCFs and censat BED files for benchmarking"
+    )
+    parser.add_argument('-n', '--number', type=int, default=1000, help='number of issues, VCF records and BED intervals', required=False)
+    parser.add_argument('-i', '--issues', type=str, default=None, help='JSON file of issues to write', required=False)
+    parser.add_argument('-c', '--vcf', type=str, default=None, help='VCF file to write', required=False)
+    parser.add_argument('-b', '--bed', type=str, default=None, help='censat BED file to write', required=False)
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the issues', required=False)
+
+    return parser
+
+def main() -> None:
+    parser = init_argparse()
+    args = parser.parse_args()
+
+    if args.issues is not None:
+        write_issues(args.issues, args.number, args.seed)
+    if args.vcf is not None:
+        write_vcf(args.vcf, args.number)
+    if args.bed is not None:
+        write_censat_bed(args.bed, args.number)
+
+if __name__ == '__main__':
+    main()
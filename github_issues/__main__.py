@@ -1,6 +1,49 @@
 #!/usr/bin/env python3
 
 import sys
-from github_issues.callhub import *
+import importlib
 
-sys.exit(main())
+# python -m github_issues <subcommand> [OPTION]... runs the main() of the
+# subcommand's module. Modules are imported only when their subcommand runs,
+# so quick commands don't pay for gspread and the other heavy dependencies.
+subcommands = {
+    "create":["create_new_issues", "load new issues from a VCF file to github"],
+    "export-bed":["retrieve_issues_from_github", "print a BED file of the repository's issues"],
+    "export-columns":["export_issue_columns", "write the parsed issues as typed columns to a NumPy .npz file"],
+    "liftover":["liftover", "lift the issues' regions to a new assembly version"],
+    "sync":["snapshot", "bring the local snapshot of the issues up to date"],
+    "serve":["serve_issues", "answer region queries over HTTP from an in-memory index of the issues"],
+    "sync-sheets":["sheetsync", "update the google spreadsheets from the issues"],
+    "update":["update_issues", "replace the labels or assignees of many issues"],
+    "close":["close_issues", "close issues"],
+    "transfer":["transfer_issues", "transfer issues to another repository"],
+    "triage":["triage_issues", "close, relabel or transfer the issues overlapping a BED file"],
+}
+
+def usage() -> str:
+    lines = ["usage: python -m github_issues SUBCOMMAND [OPTION]...", "", "subcommands:"]
+    width = max(len(name) for name in subcommands.keys()) + 2
+    for subcommand in subcommands.keys():
+        lines.append("  " + subcommand.ljust(width) + subcommands[subcommand][1])
+    lines.append("")
+    lines.append("Run python -m github_issues SUBCOMMAND -h for a subcommand's options.")
+    return "\n".join(lines)
+
+def main(argv: list = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    if len(argv) == 0 or argv[0] in ["-h", "--help"]:
+        print(usage())
+        return 0 if len(argv) > 0 else 1
+    if argv[0] not in subcommands.keys():
+        print("Unknown subcommand " + argv[0] + "\n\n" + usage())
+        return 1
+
+    module = importlib.import_module("github_issues." + subcommands[argv[0]][0])
+    # argparse names the program after sys.argv[0] in its usage messages
+    sys.argv[0] = "github_issues " + argv[0]
+    module.main(argv[1:])
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
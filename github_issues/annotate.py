@@ -0,0 +1,79 @@
+import heapq
+
+from github_issues import regions
+
+# Labels new issue regions from any number of BED tracks in one sweep. Each
+# track is a BED file with a label rule: a template in which "{name}" is
+# replaced by the BED name column (column 4) and "{lcname}" by its lower case
+# version, or a fixed label. All track intervals and regions are sorted
+# together and swept once per chromosome, keeping the intervals and regions
+# that are still open in heaps ordered by end, so the cost is linear in the
+# total input (after sorting) plus the number of overlaps found.
+
+defaultlabelrule = "{name}"
+
+def parse_track_option(trackoption: str) -> list:
+    # "BEDFILE" or "BEDFILE=LABELRULE"
+    if "=" in trackoption:
+        [bedfile, labelrule] = trackoption.rsplit("=", 1)
+    else:
+        [bedfile, labelrule] = [trackoption, defaultlabelrule]
+
+    return [bedfile, labelrule]
+
+def track_label(labelrule: str, name: str) -> str:
+    return labelrule.replace("{name}", name).replace("{lcname}", name.lower())
+
+def annotate_regions(tracks: list, all_regions: list) -> dict:
+    # tracks is a list of [bedfile, labelrule]; returns region -> {label: True} for regions with labels
+    # events sort by chromosome, then start, and are (chrom, start, end, isregion, payload)
+    events = []
+    for [bedfile, labelrule] in tracks:
+        with open(bedfile, 'r') as fh_track:
+            for line in fh_track:
+                if line[0] == "#" or line.startswith("track") or line.startswith("browser"):
+                    continue
+                fields = line.rstrip("\n").split("\t", 4)
+                if len(fields) < 3:
+                    continue
+                name = fields[3] if len(fields) > 3 else ""
+                events.append((fields[0], int(fields[1]) + 1, int(fields[2]), 0, track_label(labelrule, name)))
+
+    for regionstring in all_regions:
+        region = regions.parse_region(regionstring)
+        if region is None:
+            print("Can\'t parse region to annotate: " + regionstring)
+            exit(1)
+        events.append((region.chrom, region.start, region.end, 1, regionstring))
+
+    events.sort()
+
+    region_labels = {}
+    currentchrom = None
+    opentracks = []
+    openregions = []
+    for (chrom, start, end, isregion, payload) in events:
+        if chrom != currentchrom:
+            currentchrom = chrom
+            opentracks = []
+            openregions = []
+        # drop everything that ended before this start--whatever is left overlaps it
+        while opentracks and opentracks[0][0] < start:
+            heapq.heappop(opentracks)
+        while openregions and openregions[0][0] < start:
+            heapq.heappop(openregions)
+
+        if isregion:
+            for (trackend, label) in opentracks:
+                if payload not in region_labels.keys():
+                    region_labels[payload] = {}
+                region_labels[payload][label] = True
+            heapq.heappush(openregions, (end, payload))
+        else:
+            for (regionend, regionstring) in openregions:
+                if regionstring not in region_labels.keys():
+                    region_labels[regionstring] = {}
+                region_labels[regionstring][payload] = True
+            heapq.heappush(opentracks, (end, payload))
+
+    return region_labels
@@ -0,0 +1,122 @@
+import os
+import sys
+import json
+import mmap
+import array
+import bisect
+import hashlib
+import tempfile
+
+# Compiled, memory-mapped index of a BED annotation track (like the censat
+# track), built once and reused until the BED file changes. For each
+# annotation name (BED column 4) and chromosome it stores the interval starts
+# in sorted order and the running maximum of the interval ends, so a region
+# overlaps an annotation exactly when the last interval starting at or before
+# the region's end reaches the region's start: one binary search per region
+# and annotation.
+#
+# Index files live in $XDG_CACHE_HOME/github_issues (~/.cache by default),
+# named for the BED file's path, and record the BED file's size and mtime.
+indexmagic = b"GHIANNOT1\n"
+indexversion = 1
+
+def cache_directory() -> str:
+    cachehome = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cachehome, "github_issues")
+
+def index_path(bedfile: str) -> str:
+    pathhash = hashlib.sha1(os.path.abspath(bedfile).encode()).hexdigest()
+    return os.path.join(cache_directory(), pathhash + ".annotidx")
+
+def _bed_signature(bedfile: str) -> dict:
+    bedstat = os.stat(bedfile)
+    return {"path":os.path.abspath(bedfile), "size":bedstat.st_size, "mtime":bedstat.st_mtime_ns, "version":indexversion, "byteorder":sys.byteorder}
+
+def build_index(bedfile: str, indexfile: str) -> None:
+    # intervals are stored one-based and closed, like the issue regions
+    annotintervals = {}
+    with open(bedfile, 'r') as fh_annots:
+        for line in fh_annots:
+            fields = line.rstrip("\n").split("\t", 4)
+            if len(fields) < 4 or line[0] == "#":
+                continue
+            chrom = fields[0]
+            annot = fields[3]
+            if annot not in annotintervals.keys():
+                annotintervals[annot] = {}
+            if chrom not in annotintervals[annot].keys():
+                annotintervals[annot][chrom] = []
+            annotintervals[annot][chrom].append((int(fields[1]) + 1, int(fields[2])))
+
+    values = array.array("q")
+    tracks = {}
+    for annot in annotintervals.keys():
+        tracks[annot] = {}
+        for chrom in annotintervals[annot].keys():
+            chromintervals = sorted(annotintervals[annot][chrom])
+            offset = len(values)
+            values.extend([interval[0] for interval in chromintervals])
+            maxend = 0
+            for interval in chromintervals:
+                maxend = max(maxend, interval[1])
+                values.append(maxend)
+            tracks[annot][chrom] = [offset, len(chromintervals)]
+
+    header = _bed_signature(bedfile)
+    header["tracks"] = tracks
+    headerbytes = json.dumps(header).encode()
+    # pad the header so the value array starts 8-byte aligned
+    headerbytes = headerbytes + b" " * (-(len(indexmagic) + 8 + len(headerbytes)) % 8)
+
+    os.makedirs(os.path.dirname(indexfile), exist_ok=True)
+    [handle, tmpfile] = tempfile.mkstemp(dir=os.path.dirname(indexfile))
+    with os.fdopen(handle, "wb") as fh_index:
+        fh_index.write(indexmagic)
+        fh_index.write(len(headerbytes).to_bytes(8, "little"))
+        fh_index.write(headerbytes)
+        values.tofile(fh_index)
+    os.replace(tmpfile, indexfile)
+
+def _map_index(indexfile: str) -> dict:
+    with open(indexfile, 'rb') as fh_index:
+        if fh_index.read(len(indexmagic)) != indexmagic:
+            return None
+        headerlength = int.from_bytes(fh_index.read(8), "little")
+        header = json.loads(fh_index.read(headerlength).decode())
+        valuesoffset = len(indexmagic) + 8 + headerlength
+        filesize = os.fstat(fh_index.fileno()).st_size
+        if filesize > valuesoffset:
+            mapped = mmap.mmap(fh_index.fileno(), 0, access=mmap.ACCESS_READ)
+            values = memoryview(mapped)[valuesoffset:].cast("q")
+        else:
+            values = memoryview(array.array("q"))
+
+    return {"header":header, "tracks":header["tracks"], "values":values}
+
+def open_index(bedfile: str) -> dict:
+    # maps the compiled index for bedfile, building it first if it is missing or out of date
+    indexfile = index_path(bedfile)
+    signature = _bed_signature(bedfile)
+    if os.path.exists(indexfile):
+        index = _map_index(indexfile)
+        if index is not None and all([index["header"].get(key) == signature[key] for key in signature.keys()]):
+            return index
+    build_index(bedfile, indexfile)
+
+    return _map_index(indexfile)
+
+def overlapping_annotations(index: dict, chrom: str, start: int, end: int) -> list:
+    # names of the annotations with at least one interval overlapping chrom:start-end
+    annots = []
+    values = index["values"]
+    tracks = index["tracks"]
+    for annot in tracks.keys():
+        if chrom not in tracks[annot].keys():
+            continue
+        [offset, count] = tracks[annot][chrom]
+        # starts are values[offset:offset+count], running max ends follow them
+        i = bisect.bisect_right(values, end, offset, offset + count)
+        if i > offset and values[i - 1 + count] >= start:
+            annots.append(annot)
+
+    return annots
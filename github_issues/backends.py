@@ -0,0 +1,408 @@
+import re
+import os
+import sys
+import json
+import time
+import queue
+import typing
+import tempfile
+import subprocess
+import urllib.parse
+
+from github_issues import trace
+from github_issues.ratelimit import RateLimited
+
+if typing.TYPE_CHECKING:
+    # only for annotations--RestBackend imports http.client when it first connects
+    import http.client
+
+# Backends carry out the github operations behind the functions in callhub.
+# Every backend provides the same methods:
+#
+#   issue_records(state, since) - yields [number, url, state, title, labels,
+#       assignees, body, updated] string lists, with labels and assignees
+#       comma-and-space separated as hub prints them
+#   open_issue_numbers() - returns the set of open issue numbers, as ints
+#   create_issue(name, comment, labels) - returns the new issue number, or -1
+#       when github turned the request down; raises UncertainOutcome when the
+#       issue may or may not have been created
+#   close_issue(issueid), transfer_issue(issueid, destinationrepo),
+#   replace_labels(issueid, labels), replace_assignees(issueid, username) -
+#       return [succeeded, message]
+#
+# HubBackend runs the hub command line tool for each operation. RestBackend
+# talks to the github REST and GraphQL APIs over a pool of keep-alive HTTPS
+# connections. FakeGitHub (in fakegithub.py) keeps issues in memory.
+#
+# issue_records and open_issue_numbers raise ListingFailed if the listing can't be completed (hub
+# exits with an error, or a page of the REST listing fails), so callers never
+# mistake a partial listing for the whole set of issues. Operations that
+# aren't safe to repeat (creating and transferring issues) raise
+# UncertainOutcome when they fail in a way that leaves it unknown whether
+# github carried them out, rather than being retried blindly.
+#
+# A ratelimit.TokenBucket can be attached as backend.limiter; the REST backend
+# passes the X-RateLimit-* headers of every response on to it.
+
+class ListingFailed(Exception):
+    pass
+
+class UncertainOutcome(Exception):
+    pass
+
+class HubBackend:
+
+    # hub output is split on the ASCII unit and record separator characters, which
+    # can't appear in issue titles, labels or bodies the way "|" and "+" can
+    fieldseparator = "\x1f"
+    recordseparator = "\x1e"
+    readsize = 65536
+    recordformats = ["%I", "%U", "%S", "%t", "%L", "%as", "%b", "%uI"]
+
+    # hub reports primary and secondary rate limits only in its error message
+    ratelimitpattern = re.compile(r"rate limit|HTTP 429", re.IGNORECASE)
+    # requests github turned down, which certainly didn't create anything
+    clienterrorpattern = re.compile(r"HTTP 4\d\d")
+
+    def __init__(self, sourcedir: str):
+        self.sourcedir = sourcedir
+        self.limiter = None
+
+    def _run(self, bashcommand: list) -> list:
+        with trace.span(" ".join(bashcommand[:3]), "hub"):
+            processoutput = subprocess.run(bashcommand, cwd=self.sourcedir, capture_output=True, text=True)
+        return [processoutput.returncode == 0, str(processoutput)]
+
+    def issue_records(self, state: str = None, since: str = None):
+        formatstring = self.fieldseparator.join(self.recordformats) + self.recordseparator
+        bashcommand = ["hub", "issue", "-f", formatstring]
+        if state is not None:
+            bashcommand.extend(["-s", state])
+        if since is not None:
+            bashcommand.extend(["-d", since])
+        starttime = time.perf_counter()
+        process = subprocess.Popen(bashcommand, cwd=self.sourcedir, stdout=subprocess.PIPE, text=True)
+
+        # read the pipe in chunks, yielding each record as soon as it is complete
+        # (the time traced is the time spent waiting on hub, not on the caller)
+        remainder = ""
+        hubtime = time.perf_counter() - starttime
+        try:
+            while True:
+                readstart = time.perf_counter()
+                chunk = process.stdout.read(self.readsize)
+                hubtime = hubtime + time.perf_counter() - readstart
+                if not chunk:
+                    break
+                records = (remainder + chunk).split(self.recordseparator)
+                remainder = records.pop()
+                for record in records:
+                    yield record.lstrip("\n").split(self.fieldseparator)
+            if remainder.strip() != "":
+                yield remainder.lstrip("\n").split(self.fieldseparator)
+        finally:
+            process.stdout.close()
+            waitstart = time.perf_counter()
+            process.wait()
+            trace.record("hub issue list", "hub", starttime, hubtime + time.perf_counter() - waitstart)
+        # only reached when the whole listing was read (a caller that stops early closes the pipe)
+        if process.returncode != 0:
+            raise ListingFailed("hub issue exited with status " + str(process.returncode) + "--the listing is incomplete")
+
+    def open_issue_numbers(self) -> set:
+        with trace.span("hub issue list numbers", "hub"):
+            processoutput = subprocess.run(["hub", "issue", "-s", "open", "-f", "%I%n"], cwd=self.sourcedir, capture_output=True, text=True)
+        if processoutput.returncode != 0:
+            raise ListingFailed("hub issue exited with status " + str(processoutput.returncode) + "--the listing is incomplete")
+        return set(int(number) for number in processoutput.stdout.split())
+
+    def create_issue(self, name: str, comment: str, labels: list) -> int:
+        [handle, tmpfile] = tempfile.mkstemp()
+        with os.fdopen(handle, "w") as fh:
+            fh.write(name + "\n\n" + comment)
+
+        # empty labels (e.g. from an empty --labels option) would leave -l without a value
+        labelstring = ",".join([label for label in labels if label != ""])
+        bashcommand = ["hub", "issue", "create", "--file", tmpfile]
+        if labelstring != "":
+            bashcommand.extend(["-l", labelstring])
+        with trace.span("hub issue create", "hub"):
+            processoutput = subprocess.run(bashcommand, cwd=self.sourcedir, capture_output=True, text=True)
+        print(processoutput)
+
+        os.remove(tmpfile)
+
+        m = re.match(r"https:.*/([0-9]+)$", processoutput.stdout)
+        if m:
+            return int(m.group(1))
+        elif self.ratelimitpattern.search(processoutput.stderr):
+            raise RateLimited("Github rate limit reached creating issue " + name)
+        elif self.clienterrorpattern.search(processoutput.stderr):
+            return -1
+        else:
+            # e.g. a dropped connection or a server error, after which the issue may exist
+            raise UncertainOutcome("hub issue create failed without saying whether issue " + name + " was created: " + processoutput.stderr.strip())
+
+    def close_issue(self, issueid: str) -> list:
+        return self._run(["hub", "issue", "update", issueid, "-s", "closed"])
+
+    def transfer_issue(self, issueid: str, destinationrepo: str) -> list:
+        return self._run(["hub", "issue", "transfer", issueid, destinationrepo])
+
+    def replace_labels(self, issueid: str, newlabels: list) -> list:
+        return self._run(["hub", "issue", "update", issueid, "-l", ",".join(newlabels)])
+
+    def replace_assignees(self, issueid: str, username: str) -> list:
+        return self._run(["hub", "issue", "update", issueid, "--assign", username])
+
+class RestBackend:
+
+    apihost = "api.github.com"
+    pagesize = 100
+    maxconnections = 8
+    timeout = 60
+    retrystatuses = [502, 503, 504]
+    idempotentmethods = ["GET", "PUT", "PATCH", "DELETE"]
+
+    def __init__(self, sourcedir: str, token: str, limiter=None):
+        self.sourcedir = sourcedir
+        self.token = token
+        [self.owner, self.repo] = repository_for_checkout(sourcedir)
+        self.limiter = limiter
+        self.connections = queue.LifoQueue()
+
+    def _connection(self) -> "http.client.HTTPSConnection":
+        # http.client is imported here rather than at the top so that commands that
+        # never talk to the API (like exporting a BED from the snapshot) start quickly
+        import http.client
+        try:
+            return self.connections.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPSConnection(self.apihost, timeout=self.timeout)
+
+    def _release(self, connection: "http.client.HTTPSConnection") -> None:
+        if self.connections.qsize() < self.maxconnections:
+            self.connections.put(connection)
+        else:
+            connection.close()
+
+    def request(self, method: str, path: str, payload=None, idempotent: bool = None) -> list:
+        # returns [status, response headers, decoded JSON response (or None)]. Requests
+        # that are safe to repeat (GET, PUT, PATCH and DELETE, unless the caller says
+        # otherwise) are retried on a dropped connection or a 502, 503 or 504. Others
+        # are only retried when sending them failed; if they may have reached github,
+        # UncertainOutcome is raised so the caller can check what happened.
+        import http.client
+        if idempotent is None:
+            idempotent = method in self.idempotentmethods
+        headers = {"Authorization":"token " + self.token,
+                   "Accept":"application/vnd.github+json",
+                   "User-Agent":"github_issues",
+                   "Connection":"keep-alive"}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        attempt = 0
+        while True:
+            attempt = attempt + 1
+            connection = self._connection()
+            sent = False
+            try:
+                with trace.span("api " + method, "api"):
+                    connection.request(method, path, body=body, headers=headers)
+                    sent = True
+                    response = connection.getresponse()
+                    responsebody = response.read()
+            except (http.client.HTTPException, ConnectionError, OSError) as error:
+                # a pooled connection may have been closed by the server--retry once on a fresh one
+                connection.close()
+                if sent and not idempotent:
+                    raise UncertainOutcome(method + " " + path + " was sent, but the connection failed before github answered: " + str(error))
+                if attempt >= 2:
+                    raise
+                continue
+            if response.getheader("Connection", "").lower() == "close":
+                connection.close()
+            else:
+                self._release(connection)
+            if response.status in self.retrystatuses:
+                if not idempotent:
+                    raise UncertainOutcome(method + " " + path + " got HTTP " + str(response.status) + ", so it may or may not have taken effect")
+                if attempt < 3:
+                    trace.sleep(attempt, "api retry backoff")
+                    continue
+            break
+
+        responseheaders = dict((name.lower(), value) for (name, value) in response.getheaders())
+        self._check_ratelimit(response.status, responseheaders, responsebody)
+        decoded = None
+        if len(responsebody) > 0:
+            decoded = json.loads(responsebody.decode("utf-8"))
+
+        return [response.status, responseheaders, decoded]
+
+    def _check_ratelimit(self, status: int, headers: dict, responsebody: bytes) -> None:
+        if self.limiter is not None and "x-ratelimit-remaining" in headers.keys() and "x-ratelimit-reset" in headers.keys():
+            self.limiter.observe_ratelimit(int(headers["x-ratelimit-remaining"]), float(headers["x-ratelimit-reset"]))
+        if status == 429 or (status == 403 and (b"rate limit" in responsebody.lower() or headers.get("x-ratelimit-remaining") == "0")):
+            retryafter = None
+            if "retry-after" in headers.keys():
+                retryafter = float(headers["retry-after"])
+            elif headers.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in headers.keys():
+                retryafter = max(float(headers["x-ratelimit-reset"]) - time.time(), 1)
+            raise RateLimited("Github rate limit reached (HTTP " + str(status) + ")", retryafter)
+
+    def _repopath(self, suffix: str) -> str:
+        return "/repos/" + self.owner + "/" + self.repo + suffix
+
+    def _result(self, status: int, response) -> list:
+        if 200 <= status < 300:
+            return [True, "HTTP " + str(status)]
+        message = ""
+        if isinstance(response, dict) and "message" in response.keys():
+            message = ": " + response["message"]
+        return [False, "HTTP " + str(status) + message]
+
+    def issue_records(self, state: str = None, since: str = None):
+        query = {"state":state or "open", "per_page":self.pagesize, "sort":"created", "direction":"asc"}
+        if since is not None:
+            query["since"] = since
+        page = 1
+        while True:
+            query["page"] = page
+            [status, headers, issues] = self.request("GET", self._repopath("/issues?" + urllib.parse.urlencode(query)))
+            if status != 200:
+                raise ListingFailed("Unable to list issues (page " + str(page) + "): " + self._result(status, issues)[1])
+            for issue in issues:
+                # the issues endpoint also lists pull requests
+                if "pull_request" in issue.keys():
+                    continue
+                yield [str(issue["number"]),
+                       issue["html_url"],
+                       issue["state"],
+                       issue["title"],
+                       ", ".join([label["name"] for label in issue["labels"]]),
+                       ", ".join([assignee["login"] for assignee in issue["assignees"]]),
+                       issue["body"] or "",
+                       issue["updated_at"]]
+            if 'rel="next"' not in headers.get("link", ""):
+                return
+            page = page + 1
+
+    def open_issue_numbers(self) -> set:
+        # GraphQL can list just the numbers, a page of them at a time
+        numbers = set()
+        cursor = None
+        while True:
+            page = self.graphql("query($owner:String!, $repo:String!, $cursor:String) { repository(owner:$owner, name:$repo) { issues(states:OPEN, first:100, after:$cursor) { nodes { number } pageInfo { hasNextPage endCursor } } } }",
+                                {"owner":self.owner, "repo":self.repo, "cursor":cursor}, True)
+            if page is None or page["repository"] is None:
+                raise ListingFailed("Unable to list open issue numbers (after " + str(len(numbers)) + ")")
+            issues = page["repository"]["issues"]
+            numbers.update(node["number"] for node in issues["nodes"])
+            if not issues["pageInfo"]["hasNextPage"]:
+                return numbers
+            cursor = issues["pageInfo"]["endCursor"]
+
+    def create_issue(self, name: str, comment: str, labels: list) -> int:
+        payload = {"title":name, "body":comment, "labels":[label for label in labels if label != ""]}
+        [status, headers, response] = self.request("POST", self._repopath("/issues"), payload)
+        if status == 201:
+            return int(response["number"])
+        print("Unable to create issue " + name + ": " + self._result(status, response)[1])
+        return -1
+
+    def close_issue(self, issueid: str) -> list:
+        [status, headers, response] = self.request("PATCH", self._repopath("/issues/" + issueid), {"state":"closed"})
+        return self._result(status, response)
+
+    def replace_labels(self, issueid: str, newlabels: list) -> list:
+        [status, headers, response] = self.request("PUT", self._repopath("/issues/" + issueid + "/labels"), {"labels":newlabels})
+        return self._result(status, response)
+
+    def replace_assignees(self, issueid: str, username: str) -> list:
+        assignees = [assignee for assignee in username.split(",") if assignee != ""]
+        [status, headers, response] = self.request("PATCH", self._repopath("/issues/" + issueid), {"assignees":assignees})
+        return self._result(status, response)
+
+    def graphql(self, query: str, variables: dict, idempotent: bool = False) -> dict:
+        # queries can be retried like GETs; mutations can't
+        [status, headers, response] = self.request("POST", "/graphql", {"query":query, "variables":variables}, idempotent)
+        if status != 200 or response is None or "errors" in response.keys():
+            return None
+        return response["data"]
+
+    def transfer_issue(self, issueid: str, destinationrepo: str) -> list:
+        # transfers are only available through GraphQL, which needs node ids
+        if "/" in destinationrepo:
+            [destowner, destrepo] = destinationrepo.split("/", 1)
+        else:
+            [destowner, destrepo] = [self.owner, destinationrepo]
+        nodeids = self.graphql("query($owner:String!, $repo:String!, $number:Int!, $destowner:String!, $destrepo:String!) { source: repository(owner:$owner, name:$repo) { issue(number:$number) { id } } destination: repository(owner:$destowner, name:$destrepo) { id } }",
+                               {"owner":self.owner, "repo":self.repo, "number":int(issueid), "destowner":destowner, "destrepo":destrepo}, True)
+        if nodeids is None or nodeids["source"] is None or nodeids["source"]["issue"] is None or nodeids["destination"] is None:
+            return [False, "Unable to find issue " + issueid + " or repository " + destinationrepo]
+        transferred = self.graphql("mutation($issue:ID!, $repository:ID!) { transferIssue(input:{issueId:$issue, repositoryId:$repository}) { issue { number } } }",
+                                   {"issue":nodeids["source"]["issue"]["id"], "repository":nodeids["destination"]["id"]})
+        if transferred is None:
+            return [False, "Unable to transfer issue " + issueid + " to " + destinationrepo]
+        return [True, "Transferred to " + destinationrepo + " as issue " + str(transferred["transferIssue"]["issue"]["number"])]
+
+def repository_for_checkout(sourcedir: str) -> list:
+    processoutput = subprocess.run(["git", "remote", "get-url", "origin"], cwd=sourcedir, capture_output=True, text=True)
+    m = re.search(r"github\.com[:/]([^/\s]+)/([^/\s]+?)(\.git)?/?$", processoutput.stdout.strip())
+    if not m:
+        print("Can\'t find a github origin remote for checkout " + sourcedir)
+        exit(1)
+    return [m.group(1), m.group(2)]
+
+def github_token() -> list:
+    # [token, where it came from] for the same token hub uses for github.com: from the
+    # environment or hub's configuration file, where tokens are listed by host (a
+    # GitHub Enterprise token won't do for api.github.com); [None, None] if there is none
+    for variable in ["GITHUB_TOKEN", "GH_TOKEN"]:
+        if os.environ.get(variable):
+            return [os.environ[variable], variable]
+    hubconfig = os.environ.get("HUB_CONFIG", os.path.join(os.path.expanduser("~"), ".config", "hub"))
+    if os.path.exists(hubconfig):
+        with open(hubconfig, 'r') as fh_config:
+            host = None
+            for line in fh_config:
+                mhost = re.match(r"(\S+):\s*$", line)
+                if mhost:
+                    host = mhost.group(1).strip("\"'")
+                    continue
+                m = re.match(r"[\s-]*oauth_token:\s*(\S+)", line)
+                if m and host == "github.com":
+                    return [m.group(1), hubconfig]
+    return [None, None]
+
+# backends by checkout directory; GITHUB_ISSUES_BACKEND can be "hub", "rest" or
+# "fake". Otherwise the REST backend is used when a github.com token is
+# available, and hub if not--the choice is reported on stderr.
+_backends = {}
+
+def get_backend(sourcedir: str):
+    if sourcedir not in _backends.keys():
+        backendname = os.environ.get("GITHUB_ISSUES_BACKEND", "")
+        [token, tokensource] = github_token()
+        if backendname == "fake":
+            from github_issues import fakegithub
+            _backends[sourcedir] = fakegithub.FakeGitHub(os.environ.get("GITHUB_ISSUES_FAKEDATA"))
+        elif backendname == "hub" or (backendname == "" and token is None):
+            if backendname == "":
+                print("Using hub for github (no github.com token in GITHUB_TOKEN, GH_TOKEN or hub\'s configuration)", file=sys.stderr)
+            _backends[sourcedir] = HubBackend(sourcedir)
+        elif token is None:
+            print("The rest backend needs a github.com token in GITHUB_TOKEN, GH_TOKEN or hub\'s configuration")
+            exit(1)
+        else:
+            if backendname == "":
+                print("Using the github REST API with the token from " + tokensource + " (set GITHUB_ISSUES_BACKEND=hub to use hub)", file=sys.stderr)
+            _backends[sourcedir] = RestBackend(sourcedir, token)
+    return _backends[sourcedir]
+
+def set_backend(sourcedir: str, backend) -> None:
+    _backends[sourcedir] = backend
@@ -0,0 +1,222 @@
+import os
+import gzip
+import zlib
+import struct
+
+# Random access to BGZF-compressed (bgzip) text files through their tabix
+# (.tbi) or CSI (.csi) index. A BGZF file is a series of gzip members of at
+# most 64 KB each; positions in it are "virtual offsets", the compressed offset
+# of a block shifted left 16 bits plus the offset within the uncompressed block.
+# Plain gzip.open() can stream the whole file, so this is only needed to jump
+# to the records in a region.
+
+tbimagic = b"TBI\x01"
+csimagic = b"CSI\x01"
+tbiminshift = 14
+tbidepth = 5
+
+class BgzfReader:
+    def __init__(self, filename: str):
+        self.fh = open(filename, 'rb')
+        self.blockoffset = 0
+        self.nextblockoffset = 0
+        self.block = b""
+        self.withinblock = 0
+
+    def close(self) -> None:
+        self.fh.close()
+
+    def _load_block(self, blockoffset: int) -> bool:
+        self.fh.seek(blockoffset)
+        header = self.fh.read(18)
+        if len(header) < 18:
+            self.block = b""
+            return False
+        # the BC extra subfield holds the total block size minus one
+        extralength = struct.unpack("<H", header[10:12])[0]
+        extra = header[12:18] + self.fh.read(extralength - 6)
+        blocksize = None
+        i = 0
+        while i + 4 <= len(extra):
+            [subfieldlength] = struct.unpack("<H", extra[i + 2:i + 4])
+            if extra[i:i + 2] == b"BC":
+                blocksize = struct.unpack("<H", extra[i + 4:i + 6])[0] + 1
+            i = i + 4 + subfieldlength
+        if blocksize is None:
+            print("File is not BGZF-compressed (use bgzip rather than gzip)")
+            exit(1)
+        compressed = self.fh.read(blocksize - 12 - extralength - 8)
+        self.fh.read(8)
+        self.block = zlib.decompress(compressed, -15)
+        self.blockoffset = blockoffset
+        self.nextblockoffset = blockoffset + blocksize
+        return True
+
+    def seek(self, virtualoffset: int) -> None:
+        self._load_block(virtualoffset >> 16)
+        self.withinblock = virtualoffset & 0xffff
+
+    def tell(self) -> int:
+        return (self.blockoffset << 16) | self.withinblock
+
+    def readline(self) -> bytes:
+        pieces = []
+        while True:
+            if self.withinblock >= len(self.block):
+                if not self._load_block(self.nextblockoffset):
+                    break
+                self.withinblock = 0
+                # an empty block marks the end of the file
+                if len(self.block) == 0:
+                    break
+            newline = self.block.find(b"\n", self.withinblock)
+            if newline >= 0:
+                pieces.append(self.block[self.withinblock:newline + 1])
+                self.withinblock = newline + 1
+                # a line ending exactly at a block boundary continues from the next block
+                if self.withinblock >= len(self.block) and self._load_block(self.nextblockoffset):
+                    self.withinblock = 0
+                break
+            pieces.append(self.block[self.withinblock:])
+            self.withinblock = len(self.block)
+
+        return b"".join(pieces)
+
+def _read_names(data: bytes) -> list:
+    return [name.decode() for name in data.split(b"\x00") if name != b""]
+
+def read_index(indexfile: str) -> dict:
+    # returns {"minshift", "depth", "references": {name: {"bins": {bin: [[start, end], ...]}, "linear": [...],
+    # "loffsets": {bin: offset}}}}--tabix indexes have a linear index, CSI indexes give
+    # each bin the virtual offset of its first record (loffset) instead
+    with gzip.open(indexfile, 'rb') as fh_index:
+        data = fh_index.read()
+
+    magic = data[0:4]
+    if magic == tbimagic:
+        minshift = tbiminshift
+        depth = tbidepth
+        [numrefs, indexformat, colseq, colbeg, colend, meta, skip, namelength] = struct.unpack("<8i", data[4:36])
+        names = _read_names(data[36:36 + namelength])
+        position = 36 + namelength
+    elif magic == csimagic:
+        [minshift, depth, auxlength] = struct.unpack("<3i", data[4:16])
+        aux = data[16:16 + auxlength]
+        position = 16 + auxlength
+        [numrefs] = struct.unpack("<i", data[position:position + 4])
+        position = position + 4
+        # tabix writes the same header fields into the CSI aux data
+        names = []
+        if auxlength >= 28:
+            namelength = struct.unpack("<i", aux[24:28])[0]
+            names = _read_names(aux[28:28 + namelength])
+    else:
+        print("Unrecognized index file " + indexfile)
+        exit(1)
+
+    references = {}
+    for refindex in range(numrefs):
+        bins = {}
+        loffsets = {}
+        [numbins] = struct.unpack("<i", data[position:position + 4])
+        position = position + 4
+        for binindex in range(numbins):
+            if magic == tbimagic:
+                [binnumber, numchunks] = struct.unpack("<Ii", data[position:position + 8])
+                position = position + 8
+            else:
+                [binnumber, loffset, numchunks] = struct.unpack("<IQi", data[position:position + 16])
+                position = position + 16
+                loffsets[binnumber] = loffset
+            chunks = []
+            for chunkindex in range(numchunks):
+                chunks.append(list(struct.unpack("<QQ", data[position:position + 16])))
+                position = position + 16
+            bins[binnumber] = chunks
+        linear = []
+        if magic == tbimagic:
+            [numintervals] = struct.unpack("<i", data[position:position + 4])
+            position = position + 4
+            linear = list(struct.unpack("<" + str(numintervals) + "Q", data[position:position + 8 * numintervals]))
+            position = position + 8 * numintervals
+        if refindex < len(names):
+            references[names[refindex]] = {"bins":bins, "linear":linear, "loffsets":loffsets}
+
+    return {"minshift":minshift, "depth":depth, "references":references}
+
+def region_to_bins(start: int, end: int, minshift: int, depth: int) -> list:
+    # bins that can hold records overlapping the zero-based, half-open interval start-end
+    bins = []
+    end = end - 1
+    offset = 0
+    shift = minshift + depth * 3
+    for level in range(depth + 1):
+        bins.extend(range(offset + (start >> shift), offset + (end >> shift) + 1))
+        shift = shift - 3
+        offset = offset + (1 << (level * 3))
+    return bins
+
+def min_offset(index: dict, reference: dict, regionstart: int) -> int:
+    # no record overlapping a region starting at regionstart (zero-based) comes before this virtual offset
+    if len(reference["linear"]) > 0:
+        return reference["linear"][min(regionstart >> tbiminshift, len(reference["linear"]) - 1)]
+    if len(reference["loffsets"]) > 0:
+        # the loffset of the smallest indexed bin holding regionstart, from the finest level up
+        depth = index["depth"]
+        binnumber = ((1 << (depth * 3)) - 1) // 7 + (regionstart >> index["minshift"])
+        while binnumber > 0 and binnumber not in reference["loffsets"].keys():
+            binnumber = (binnumber - 1) >> 3
+        return reference["loffsets"].get(binnumber, 0)
+    return 0
+
+def merge_chunks(chunks: list) -> list:
+    merged = []
+    for chunk in sorted(chunks):
+        if len(merged) > 0 and chunk[0] <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], chunk[1])
+        else:
+            merged.append(list(chunk))
+    return merged
+
+def region_chunks(index: dict, chrom: str, start: int, end: int) -> list:
+    # [start, end] virtual offset ranges holding the records for chrom:start-end (one-based, closed)
+    if chrom not in index["references"].keys():
+        return []
+    reference = index["references"][chrom]
+    maxposition = 1 << (index["minshift"] + index["depth"] * 3)
+    regionstart = max(start - 1, 0)
+    regionend = min(end, maxposition)
+    minoffset = min_offset(index, reference, regionstart)
+
+    chunks = []
+    for binnumber in region_to_bins(regionstart, regionend, index["minshift"], index["depth"]):
+        for chunk in reference["bins"].get(binnumber, []):
+            if chunk[1] > minoffset:
+                chunks.append([max(chunk[0], minoffset), chunk[1]])
+
+    return merge_chunks(chunks)
+
+def find_index(filename: str) -> str:
+    for suffix in [".tbi", ".csi"]:
+        if os.path.exists(filename + suffix):
+            return filename + suffix
+    return None
+
+def iterate_region_lines(filename: str, index: dict, chrom: str, regionlist: list):
+    # lines from the chunks that may overlap any of the [start, end] regions on chrom--callers
+    # still check each record's position. Chunks are merged across the regions first, so a
+    # chunk in a coarse bin shared by several regions is read only once.
+    chunks = []
+    for [start, end] in regionlist:
+        chunks.extend(region_chunks(index, chrom, start, end))
+    reader = BgzfReader(filename)
+    try:
+        for [chunkstart, chunkend] in merge_chunks(chunks):
+            reader.seek(chunkstart)
+            while reader.tell() < chunkend:
+                line = reader.readline()
+                if line == b"":
+                    break
+                yield line.decode()
+    finally:
+        reader.close()
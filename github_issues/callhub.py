@@ -1,211 +1,277 @@
 import re
-import os
-import subprocess
-import tempfile
+
+from github_issues import labels
+from github_issues import backends
+from github_issues import issuerecord
+from github_issues import ratelimit
+from github_issues import trace
 
 def close_issue(issueid:str, sourcedir:str):
     
-    bashcommand = "hub issue update " + issueid + " -s closed"
-    process = subprocess.run(bashcommand.split(), cwd=sourcedir)
+    backends.get_backend(sourcedir).close_issue(issueid)
 
 def transfer_issue(issueid:str, sourcedir:str, destinationrepo:str):
     
-    bashcommand = "hub issue transfer " + issueid + " " + destinationrepo
-    process = subprocess.run(bashcommand.split(), cwd=sourcedir)
+    backends.get_backend(sourcedir).transfer_issue(issueid, destinationrepo)
 
-def retrieve_issue_ids(sourcedir:str):
+def iterate_issue_records(sourcedir:str, state:str=None, since:str=None):
 
-    bashcommand = "hub issue -f \"%I+\""
-    processoutput = subprocess.run(bashcommand.split(), cwd=sourcedir, capture_output=True, text=True)
+    # [number, url, state, title, labels, assignees, body, updated] for each issue
+    return backends.get_backend(sourcedir).issue_records(state, since)
 
-    issueoutput = processoutput.stdout
-    issueoutput = issueoutput.replace('+', "\n")
-    issueoutput = issueoutput.replace('"', "")
+def open_issue_numbers(sourcedir:str)->set:
 
-    return issueoutput
+    # the numbers of the open issues, as ints, without their contents
+    return backends.get_backend(sourcedir).open_issue_numbers()
 
-def retrieve_all_issues(sourcedir:str):
+def retrieve_issue_ids(sourcedir:str):
 
-    bashcommand = "hub issue -f \"%I|%U|%S|%t|%L|%as|%b+\""
-    #print(bashcommand)
-    processoutput = subprocess.run(bashcommand.split(), cwd=sourcedir, capture_output=True, text=True)
-    
-    issueoutput = processoutput.stdout
-    issueoutput = issueoutput.replace('"', "")
-
-    issuelist = issueoutput.split("+")
-
-    processedlist = []
-    for issuestring in issuelist:
-        issuestring = issuestring.replace("\n", "+")
-        issuefields = issuestring.split("|")
-        numberfields = len(issuefields)
-        #print(str(numberfields) + " fields in string:")
-
-        if numberfields >= 7:
-            body = issuefields[6]
-            #print(body)
-            m = re.match(r".*Region\+\+(\S+:([\d,]+)\-([\d,]+)).*", body)
-            mreg = re.match(r".*\+(\S+:([\d,]+)\-([\d,]+))\+.*", body)
-            msingle = re.match(r".*\+(\S+):([\d,]+)\+.*", body)
-            if m:
-                region = m.group(1)
-                region = region.replace(",", "")
-                start = m.group(2).replace(",", "")
-                end = m.group(3).replace(",", "")
-                size = int(end) - int(start) + 1
-            elif mreg:
-                region = mreg.group(1)
-                region = region.replace(",", "")
-                start = mreg.group(2).replace(",", "")
-                end = mreg.group(3).replace(",", "")
-                size = int(end) - int(start) + 1
-            elif msingle:
-                chrom = msingle.group(1)
-                pos = msingle.group(2).replace(",", "")
-                region = chrom + ":" + pos + "-" + pos
-                size = 1
-            else:
-                region = "unparsable"
-                size = "unknown"
-
-            # fields parsed from labels:
-            labels = issuefields[4].split(", ")
-            centrotags = []
-            covgtags = []
-            evidencetags = []
-            nuctags = []
-            errortags = []
-            cliptags = []
-            programtags = []
-            diagnosistags = []
-
-            for label in labels:
-                if label == "alpha_sat" or re.match(r"hsat.*", label):
-                    centrotags.append(label)
-                elif re.match(r".*_cov_.*", label):
-                    covgtags.append(label)
-                elif re.match(r".*evidence", label):
-                    evidencetags.append(label)
-                elif re.match(r"^[atgc_]+$", label):
-                    nuctags.append(label)
-                elif label == "clipped":
-                    cliptags.append(label)
-                elif label == "error_kmer":
-                    errortags.append(label)
-                elif label == "coverage_pri":
-                    programtags.append(label)
-                elif label == "flagger_intersect":
-                    programtags.append(label)
-                elif label == "merqury":
-                    programtags.append(label)
-                elif label == "phase_switch":
-                    programtags.append(label)
-                elif label == "priority":
-                    diagnosistags.append(label)
-                elif label == "false_positive":
-                    diagnosistags.append(label)
-                elif label == "help_wanted":
-                    diagnosistags.append(label)
-
-            if len(centrotags) > 0:
-                centromere = ",".join(centrotags)
-            else:
-                centromere = "no"
-
-            if len(covgtags) > 0:
-                coverage = ",".join(covgtags)
-            else:
-                coverage = "unflagged"
-
-            if len(evidencetags) > 0:
-                evidence = ",".join(evidencetags)
-            else:
-                evidence = "none"
-
-            if len(nuctags) > 0:
-                content = ",".join(nuctags)
-            else:
-                content = "unflagged"
-
-            if len(programtags) > 0:
-                programs = ",".join(programtags)
-            else:
-                programs = "none"
-
-            if len(cliptags) > 0:
-                clipped = "yes"
-            else:
-                clipped = "no"
-
-            if len(errortags) > 0:
-                errors = ",".join(errortags)
-            else:
-                errors = "no"
-
-            if len(diagnosistags) > 0:
-                diagnosis = ",".join(diagnosistags)
-            else:
-                diagnosis = "none"
-
-            if len(issuefields[5]) != 0:
-                assignedto = issuefields[5]
-                assignedto = assignedto.replace(' ', '')
-            else:
-                assignedto = "unassigned"
-
-            issuedict = {"issueid":issuefields[0],
-                         "url":issuefields[1],
-                         "status":issuefields[2],
-                         "name":issuefields[3],
-                         "labels":labels,
-                         "assignedto":assignedto,
-                         "region":region,
-                         "size":size,
-                         "coverage":coverage,
-                         "evidence":evidence,
-                         "centromere":centromere,
-                         "clipped":clipped,
-                         "errors":errors,
-                         "content":content,
-                         "programs":programs,
-                         "diagnosis":diagnosis
-                         }
-
-            processedlist.append(issuedict) 
-
-    return processedlist
+    issueids = []
+    for issuefields in iterate_issue_records(sourcedir):
+        issueids.append(issuefields[0] + "\n")
 
-def create_new_issue(sourcedir:str, name:str, comment:str, labels:list)->int:
+    return "".join(issueids)
 
-    [handle, tmpfile] = tempfile.mkstemp()
-    with os.fdopen(handle, "w") as fh:
-        fh.write(name + "\n\n" + comment)
+def retrieve_all_issues(sourcedir:str):
 
-    labelstring = ",".join(labels)
-    bashcommand = "hub issue create --file " + tmpfile + " -l " + labelstring
-    processoutput = subprocess.run(bashcommand.split(), cwd=sourcedir, capture_output=True, text=True)
-    print(processoutput)
+    return list(iterate_issues(sourcedir))
+
+def iterate_issues(sourcedir:str):
+
+    for issuefields in iterate_issue_records(sourcedir):
+        with trace.span("parse issue", "parse", event=False):
+            issuedict = parse_issue_fields(issuefields)
+        if issuedict is not None:
+            yield issuedict
+
+# issue bodies are written as "### Section" headers (see
+# create_new_issues.create_github_issue and the repository's issue form),
+# so they are parsed with one pass over their lines using anchored patterns
+sectionheaderpattern = re.compile(r"###\s+(.*\S)\s*$")
+regionpattern = re.compile(r"(\S+):([\d,]+)\-([\d,]+)")
+positionpattern = re.compile(r"(\S+):([\d,]+)")
+noresponse = "_No response_"
+maxregionlinelength = 256
+
+def parse_issue_body(body:str)->dict:
+
+    sections = {}
+    sectionlines = None
+    for line in body.splitlines():
+        m = sectionheaderpattern.match(line)
+        if m:
+            sectionlines = []
+            sections[m.group(1)] = sectionlines
+        elif sectionlines is not None:
+            sectionlines.append(line)
+
+    for section in sections.keys():
+        sectiontext = "\n".join(sections[section]).strip()
+        if sectiontext == noresponse:
+            sectiontext = ""
+        sections[section] = sectiontext
+
+    return sections
+
+def parse_body_region(body:str, sections:dict)->list:
+
+    # the first word of the Assembly Region section wins; otherwise use the first
+    # line of the body that consists of nothing but a region or a single position
+    candidatelines = []
+    if "Assembly Region" in sections.keys() and sections["Assembly Region"] != "":
+        candidatelines = sections["Assembly Region"].split(None, 1)[:1]
+    candidatelines.extend(body.splitlines())
+
+    for line in candidatelines:
+        # long lines are pasted VCF records or logs, never a bare region
+        if len(line) > maxregionlinelength or ":" not in line:
+            continue
+        line = line.strip()
+        m = regionpattern.fullmatch(line)
+        if m:
+            region = m.group(0).replace(",", "")
+            start = m.group(2).replace(",", "")
+            end = m.group(3).replace(",", "")
+            return [region, int(end) - int(start) + 1]
+        msingle = positionpattern.fullmatch(line)
+        if msingle:
+            pos = msingle.group(2).replace(",", "")
+            return [msingle.group(1) + ":" + pos + "-" + pos, 1]
+
+    return ["unparsable", "unknown"]
+
+def parse_issue_fields(issuefields:list)->issuerecord.IssueRecord:
+
+    numberfields = len(issuefields)
+
+    if numberfields >= 7:
+        body = issuefields[6]
+        sections = parse_issue_body(body)
+        [region, size] = parse_body_region(body, sections)
+        if "Assembly Version" in sections.keys():
+            assembly = sections["Assembly Version"]
+        else:
+            assembly = "unknown"
+
+        if len(issuefields[5]) != 0:
+            assignedto = issuefields[5]
+            assignedto = assignedto.replace(' ', '')
+        else:
+            assignedto = "unassigned"
+
+        # the labels and the fields parsed from them are shared with other issues with the same labels
+        return issuerecord.IssueRecord(issuefields[0], issuefields[1], issuefields[2], issuefields[3], labels.shared_labels(issuefields[4]),
+                                       assignedto, region, size, assembly)
+
+    return None
 
-    os.remove(tmpfile)
+def create_new_issue(sourcedir:str, name:str, comment:str, labels:list)->int:
 
-    m = re.match(r"https:.*/([0-9]+)$", processoutput.stdout)
-    if m:
-        return int(m.group(1))
-    else:
-        return -1
+    # raises ratelimit.RateLimited when github refuses the request for rate limiting
+    return backends.get_backend(sourcedir).create_issue(name, comment, labels)
 
 def replace_labels_for_issue(sourcedir:str, issueid:str, newlabels:list)->int:
 
-    labelstring = ",".join(newlabels)
-    bashcommand = "hub issue update " + issueid + " -l " + labelstring
-    processoutput = subprocess.run(bashcommand.split(), cwd=sourcedir, capture_output=True, text=True)
+    [succeeded, message] = backends.get_backend(sourcedir).replace_labels(issueid, newlabels)
 
-    return str(processoutput)
+    return message
 
 def replace_assignees_for_issue(sourcedir:str, issueid:str, username:str)->int:
 
-    bashcommand = "hub issue update " + issueid + " --assign " + username
-    processoutput = subprocess.run(bashcommand.split(), cwd=sourcedir, capture_output=True, text=True)
-
-    return str(processoutput)
+    [succeeded, message] = backends.get_backend(sourcedir).replace_assignees(issueid, username)
+
+    return message
+
+# Bulk updates run concurrently on numworkers threads, paced by a shared
+# ratelimit.TokenBucket. Failed updates are retried with exponential backoff
+# up to maxattempts times, and updates refused for rate limiting are retried
+# after the limiter's pause. Updates that fail with backends.UncertainOutcome
+# are not retried. Each returns a dict of issueid -> [status, attempts,
+# message], where status is "updated", "unchanged", "failed" or "missing".
+defaultbulkworkers = 4
+defaultbulkattempts = 3
+defaultbulkrate = 60
+initialbulkbackoff = 2
+
+def run_bulk_updates(sourcedir:str, updates:dict, numworkers:int=defaultbulkworkers, maxattempts:int=defaultbulkattempts, limiter:ratelimit.TokenBucket=None)->dict:
+
+    # updates maps issue ids to functions that take a backend and return [succeeded, message]
+    import concurrent.futures
+    backend = backends.get_backend(sourcedir)
+    if limiter is None:
+        limiter = ratelimit.TokenBucket(defaultbulkrate / 60.0, defaultbulkrate / 60.0)
+    backend.limiter = limiter
+
+    def update_issue(issueid:str)->list:
+        attempts = 0
+        backoff = initialbulkbackoff
+        while True:
+            limiter.acquire()
+            attempts = attempts + 1
+            try:
+                [succeeded, message] = updates[issueid](backend)
+            except ratelimit.RateLimited as error:
+                limiter.throttled(error.retryafter)
+                if attempts >= maxattempts:
+                    return ["failed", attempts, str(error)]
+                continue
+            except backends.UncertainOutcome as error:
+                # e.g. a transfer whose connection dropped--trying again could do it twice
+                return ["failed", attempts, str(error)]
+            if succeeded:
+                limiter.succeeded()
+                return ["updated", attempts, message]
+            if attempts >= maxattempts:
+                return ["failed", attempts, message]
+            trace.sleep(backoff, "bulk update backoff")
+            backoff = backoff * 2
+
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=numworkers) as executor:
+        futures = dict((issueid, executor.submit(update_issue, issueid)) for issueid in updates.keys())
+        for issueid in futures.keys():
+            results[issueid] = futures[issueid].result()
+
+    return results
+
+def _current_issues(sourcedir:str, currentissues:dict)->dict:
+
+    # issue dicts by issue id, from the local snapshot unless the caller has them already
+    if currentissues is None:
+        from github_issues import snapshot
+        currentissues = {}
+        for issue in snapshot.iterate_issues(sourcedir, state="all"):
+            currentissues[issue["issueid"]] = issue
+    return currentissues
+
+def replace_labels_for_issues(sourcedir:str, newlabels:dict, currentissues:dict=None, numworkers:int=defaultbulkworkers, maxattempts:int=defaultbulkattempts)->dict:
+
+    # newlabels maps issue ids to the complete list of labels each issue should have
+    currentissues = _current_issues(sourcedir, currentissues)
+    results = {}
+    updates = {}
+    for issueid in newlabels.keys():
+        wantedlabels = [label for label in newlabels[issueid] if label != ""]
+        if issueid not in currentissues.keys():
+            results[issueid] = ["missing", 0, "Issue " + issueid + " is not in the snapshot"]
+        elif set(wantedlabels) == set([label for label in currentissues[issueid]["labels"] if label != ""]):
+            results[issueid] = ["unchanged", 0, ""]
+        else:
+            updates[issueid] = lambda backend, issueid=issueid, wantedlabels=wantedlabels: backend.replace_labels(issueid, wantedlabels)
+
+    results.update(run_bulk_updates(sourcedir, updates, numworkers, maxattempts))
+    return results
+
+def replace_assignees_for_issues(sourcedir:str, newassignees:dict, currentissues:dict=None, numworkers:int=defaultbulkworkers, maxattempts:int=defaultbulkattempts)->dict:
+
+    # newassignees maps issue ids to comma-separated user names, as in replace_assignees_for_issue
+    currentissues = _current_issues(sourcedir, currentissues)
+    results = {}
+    updates = {}
+    for issueid in newassignees.keys():
+        username = newassignees[issueid].replace(" ", "")
+        if issueid not in currentissues.keys():
+            results[issueid] = ["missing", 0, "Issue " + issueid + " is not in the snapshot"]
+        elif set(username.split(",")) - set([""]) == set(currentissues[issueid]["assignedto"].split(",")) - set(["unassigned"]):
+            results[issueid] = ["unchanged", 0, ""]
+        else:
+            updates[issueid] = lambda backend, issueid=issueid, username=username: backend.replace_assignees(issueid, username)
+
+    results.update(run_bulk_updates(sourcedir, updates, numworkers, maxattempts))
+    return results
+
+def updated_issue_ids(results:dict)->list:
+
+    return [issueid for issueid in results.keys() if results[issueid][0] == "updated"]
+
+def close_issues(sourcedir:str, issueids:list, numworkers:int=defaultbulkworkers, maxattempts:int=defaultbulkattempts)->dict:
+
+    from github_issues import snapshot
+    updates = {}
+    for issueid in issueids:
+        updates[issueid] = lambda backend, issueid=issueid: backend.close_issue(issueid)
+
+    results = run_bulk_updates(sourcedir, updates, numworkers, maxattempts)
+    snapshot.mark_closed(sourcedir, updated_issue_ids(results))
+    return results
+
+def transfer_issues(sourcedir:str, issueids:list, destinationrepo:str, numworkers:int=defaultbulkworkers, maxattempts:int=defaultbulkattempts)->dict:
+
+    # transferred issues leave the snapshot along with the repository
+    from github_issues import snapshot
+    updates = {}
+    for issueid in issueids:
+        updates[issueid] = lambda backend, issueid=issueid: backend.transfer_issue(issueid, destinationrepo)
+
+    results = run_bulk_updates(sourcedir, updates, numworkers, maxattempts)
+    snapshot.remove_issues(sourcedir, updated_issue_ids(results))
+    return results
+
+def print_status_table(results:dict)->None:
+
+    print("IssueID\tStatus\tAttempts\tMessage")
+    for issueid in sorted(results.keys(), key=lambda issueid: int(issueid) if issueid.isdigit() else 0):
+        [status, attempts, message] = results[issueid]
+        if status not in ["failed", "missing"]:
+            message = ""
+        print(issueid + "\t" + status + "\t" + str(attempts) + "\t" + message.replace("\n", " "))
@@ -0,0 +1,56 @@
+import argparse
+
+from github_issues import callhub
+from github_issues import trace
+
+def read_issue_ids(issueids: list, idfile: str) -> list:
+    # issue ids from the command line and/or the first column of a file, one per line
+    allids = list(issueids)
+    if idfile is not None:
+        with open(idfile, 'r') as fh_ids:
+            for line in fh_ids:
+                fields = line.split()
+                if len(fields) == 0 or line[0] == "#":
+                    continue
+                allids.append(fields[0])
+    for issueid in allids:
+        if not issueid.isdigit():
+            print("Issue id " + issueid + " is not a number")
+            exit(1)
+
+    return allids
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION] [ISSUEID]...",
+        description="Close github issues"
+    )
+    parser.add_argument(
+        "-v", "--version", action="version",
+        version = f"{parser.prog} version 1.0.0"
+    )
+    parser.add_argument('issueids', type=str, nargs='*', metavar='ISSUEID', help='numbers of the issues to close')
+    parser.add_argument('-s', '--source', type=str, metavar='directory of checkout of source github repository', required=True)
+    parser.add_argument('-f', '--file', type=str, default=None, help='file of issue numbers, one per line, to close', required=False)
+    parser.add_argument('-j', '--jobs', type=int, default=callhub.defaultbulkworkers, help='number of issues to close concurrently', required=False)
+    parser.add_argument('-r', '--retries', type=int, default=callhub.defaultbulkattempts, help='number of times to try each update', required=False)
+    trace.add_arguments(parser)
+
+    return parser
+
+def main(argv: list = None) -> None:
+    parser = init_argparse()
+    args = parser.parse_args(argv)
+
+    issueids = read_issue_ids(args.issueids, args.file)
+    if len(issueids) == 0:
+        print("Nothing to do--specify issue numbers or a file of them")
+        exit(1)
+
+    trace.start_from_args(args)
+    with trace.span("close issues"):
+        results = callhub.close_issues(args.source, issueids, args.jobs, args.retries)
+    callhub.print_status_table(results)
+
+if __name__ == '__main__':
+    main()
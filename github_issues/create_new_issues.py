@@ -1,140 +1,202 @@
-import gspread
-import subprocess
-import sys
 import os
 import re
-import time
+import gzip
 import argparse
+import threading
+import collections
+import concurrent.futures
 
 from github_issues import callhub
+from github_issues import snapshot
+from github_issues import intervals
+from github_issues import regions
+from github_issues import bgzf
+from github_issues import annotindex
+from github_issues import annotate
+from github_issues import ratelimit
+from github_issues import backends
+from github_issues import trace
+from github_issues import journal
 
 # defaults
 defaultassemblyversion = "v0.7"
 defaultsleeptime = 20
+# github asks for no more than 500 content-creating requests per hour
+defaultmaxrate = 8
+defaultworkers = 4
+defaultcreateattempts = 3
+initialcreatebackoff = 5
+issuenameprefix = "Issue: "
+# end coordinate used for a whole-chromosome region filter
+wholechromosome = 1 << 40
 censat_bedfile = "/data/Phillippy/projects/HG002_diploid/annotation/browsertracks/HG002v0.7_censat.9col.bed"
 
 issue_directory = os.getcwd()
 
 # sleep time to avoid github blocking:
 
-def read_issue_vcffile(issue_file: str) -> list:
+def read_region_filter(regionstrings: list, bedfile: str) -> dict:
+    # intervals index of the regions to keep: "chrom" or "chrom:start-end" strings, and/or the intervals in a BED file
+    filterregions = {}
+    for regionstring in regionstrings:
+        m = re.match(r"^(\S+):([\d,]+)\-([\d,]+)$", regionstring)
+        if m:
+            intervals.add_interval(filterregions, m.group(1), int(m.group(2).replace(",", "")), int(m.group(3).replace(",", "")), regionstring)
+        else:
+            intervals.add_interval(filterregions, regionstring, 1, wholechromosome, regionstring)
+    if bedfile is not None:
+        with open(bedfile, 'r') as fh_bed:
+            for line in fh_bed:
+                fields = line.split("\t", 3)
+                if len(fields) < 3 or line[0] == "#" or fields[0] in ["track", "browser"]:
+                    continue
+                intervals.add_interval(filterregions, fields[0], int(fields[1]) + 1, int(fields[2]), line)
+
+    return intervals.build_interval_index(filterregions)
+
+def iterate_vcf_lines(issue_file: str, regionfilter: dict):
+    with open(issue_file, 'rb') as fh_magic:
+        compressed = fh_magic.read(2) == b"\x1f\x8b"
+
+    # with an index, read only the blocks that can hold records in the filter regions
+    indexfile = None
+    if compressed and regionfilter is not None:
+        indexfile = bgzf.find_index(issue_file)
+    if indexfile is not None:
+        vcfindex = bgzf.read_index(indexfile)
+        for chrom in regionfilter.keys():
+            # merge overlapping filter intervals so no block is read twice
+            merged = []
+            for [start, end, regionstring] in intervals.overlapping_intervals(regionfilter, chrom, 1, wholechromosome):
+                if len(merged) > 0 and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            yield from bgzf.iterate_region_lines(issue_file, vcfindex, chrom, merged)
+    elif compressed:
+        # gzip reads all the members of a bgzipped file as one stream
+        with gzip.open(issue_file, 'rt') as fh_issues:
+            yield from fh_issues
+    else:
+        with open(issue_file, 'r') as fh_issues:
+            yield from fh_issues
+
+def read_issue_vcffile(issue_file: str, regionfilter: dict = None) -> list:
     issue_vcfrecord = {}
     region_list = []
 
-    with open(issue_file, 'r') as fh_issues:
-        for line in fh_issues:
-            fields = line.split("\t")
-            chrom = fields[0]
-            if chrom[0] == "#":
-                continue
-            # region boundaries are strings, *not* zero-based
-            regionstart = fields[1]
-            regionend = str(int(fields[1]) + len(fields[3]) - 1)
-            ref = fields[3]
-            alt = fields[4]
-
-            regionstring = chrom + ":" + regionstart + "-" + regionend
-            if regionstring not in issue_vcfrecord.keys():
-                issue_vcfrecord[regionstring] = line
-                region_list.append(regionstring)
+    for line in iterate_vcf_lines(issue_file, regionfilter):
+        if line[0] == "#":
+            continue
+        # only the columns up to ALT are needed--the rest of the line is left unsplit
+        fields = line.split("\t", 5)
+        chrom = fields[0]
+        # region boundaries are strings, *not* zero-based
+        regionstart = fields[1]
+        regionend = str(int(fields[1]) + len(fields[3]) - 1)
+
+        if regionfilter is not None and len(intervals.overlapping_intervals(regionfilter, chrom, int(regionstart), int(regionend))) == 0:
+            continue
+
+        regionstring = chrom + ":" + regionstart + "-" + regionend
+        if regionstring not in issue_vcfrecord.keys():
+            # the whole record goes into the issue body, so only records that become issues are kept
+            issue_vcfrecord[regionstring] = line
+            region_list.append(regionstring)
     
     return [issue_vcfrecord, region_list]
 
-def check_region_list(all_regions: list, checkoutdir: str) -> None:
+def cluster_vcf_records(vcfline_dict: dict, region_list: list, mergedistance: int) -> list:
+    # merges records that overlap or lie within mergedistance bases of each other into one region
+    # with all of their VCF lines, in one sweep over the regions in sorted order
+    clusters = []
+    for region in sorted([regions.parse_region(regionstring) for regionstring in region_list]):
+        if len(clusters) > 0 and region.chrom == clusters[-1][0] and region.start - clusters[-1][2] <= mergedistance:
+            clusters[-1][2] = max(clusters[-1][2], region.end)
+            clusters[-1][3].append(region.string)
+        else:
+            clusters.append([region.chrom, region.start, region.end, [region.string]])
 
+    clustered_vcflines = {}
+    clustered_regions = []
+    for [chrom, start, end, members] in clusters:
+        regionstring = chrom + ":" + str(start) + "-" + str(end)
+        clustered_vcflines[regionstring] = "".join([vcfline_dict[member] for member in members])
+        clustered_regions.append(regionstring)
+    print("Merged " + str(len(region_list)) + " VCF records into " + str(len(clustered_regions)) + " issue regions")
+
+    return [clustered_vcflines, clustered_regions]
+
+def check_region_list(all_regions: list, checkoutdir: str) -> list:
+
+    # index existing issue regions once, then look up each new region
     currentissueregions = {}
-    currentissues = callhub.retrieve_all_issues(checkoutdir)
-    for issue in currentissues:
+    for issue in snapshot.iterate_issues(checkoutdir):
         issueregion = issue["region"]
-        m = re.match(r"(\S+):(\d+)\-(\d+)", issueregion)
-        if not m:
+        region = regions.parse_region(issueregion)
+        if region is None:
             print("Can\'t parse existing issue region: " + issueregion)
             continue
         else:
-            chrom = m.group(1)
-            start = int(m.group(2)) 
-            end = int(m.group(3)) 
-            print("Issue region: " + issueregion)
-            if chrom not in currentissueregions.keys():
-                currentissueregions[chrom] = []
-            currentissueregions[chrom].append([start, end])
+            intervals.add_interval(currentissueregions, region.chrom, region.start, region.end, issueregion)
+    existingindex = intervals.build_interval_index(currentissueregions)
 
+    newissueregions = {}
     for regionstring in all_regions:
-        m = re.match(r"(\S+):(\d+)\-(\d+)", regionstring)
-        if not m:
+        region = regions.parse_region(regionstring)
+        if region is None:
             print("Can\'t parse VCF region: " + regionstring)
             exit(1)
-        chrom = m.group(1)
-        start = int(m.group(2)) 
-        end = int(m.group(3)) 
-        # New issue region chr14_MATERNAL:81767103-81767104 overlaps with existing issue chr14_MATERNAL:85121934-85123552
-        for limits in currentissueregions[chrom]:
-            if not (start > limits[1] or end < limits[0]):
-                print("New issue region " + regionstring + " overlaps with existing issue " + chrom + ":" + str(limits[0]) + "-" + str(limits[1]))
-                exit(1)
+        intervals.add_interval(newissueregions, region.chrom, region.start, region.end, regionstring)
+    newindex = intervals.build_interval_index(newissueregions)
+
+    # report every overlap, with existing issues and within the new batch
+    overlaps = []
+    for chrom in newindex.keys():
+        newstarts = newindex[chrom]["starts"]
+        newends = newindex[chrom]["ends"]
+        newregions = newindex[chrom]["data"]
+        for i in range(len(newregions)):
+            regionstring = newregions[i]
+            for hit in intervals.overlapping_intervals(existingindex, chrom, newstarts[i], newends[i]):
+                # New issue region chr14_MATERNAL:81767103-81767104 overlaps with existing issue chr14_MATERNAL:85121934-85123552
+                print("New issue region " + regionstring + " overlaps with existing issue " + hit[2])
+                overlaps.append([regionstring, hit[2]])
+            for hit in intervals.overlapping_intervals(newindex, chrom, newstarts[i], newends[i]):
+                # each pair within the batch is reported once, from its leftmost region
+                if [hit[0], hit[1]] <= [newstarts[i], newends[i]]:
+                    continue
+                print("New issue region " + regionstring + " overlaps with new issue region " + hit[2])
+                overlaps.append([regionstring, hit[2]])
+
+    return overlaps
 
 def read_censat_annotations(centro_file: str, all_regions: list) -> dict:
-    centro_regions = {}
-
-    # read in censat annotations:
-    with open(centro_file, 'r') as fh_annots:
-        for line in fh_annots:
-            line = line.replace("\n", "")
-            fields = line.split("\t")
-            if len(fields) < 4:
-                continue 
-            chrom = fields[0]
-            regionstart = int(fields[1]) + 1
-            regionend = int(fields[2])
-            annot = fields[3]
-
-            if annot not in centro_regions.keys():
-                centro_regions[annot] = {}
-            if chrom not in centro_regions[annot].keys():
-                centro_regions[annot][chrom] = []
-            centro_regions[annot][chrom].append([regionstart, regionend])
+    # censat annotations come from a compiled index that is rebuilt only when the BED file changes
+    centro_index = annotindex.open_index(centro_file)
 
     region_labels = {}
     for regionstring in all_regions:
-        m = re.match(r"(\S+):(\d+)\-(\d+)", regionstring)
-        if not m:
+        region = regions.parse_region(regionstring)
+        if region is None:
             print("Can\'t parse censat region: " + regionstring + " from file " + centro_file)
             exit(1)
-        chrom = m.group(1)
-        start = int(m.group(2)) 
-        end = int(m.group(3)) 
 
-        for annot in centro_regions.keys(): 
+        for annot in annotindex.overlapping_annotations(centro_index, region.chrom, region.start, region.end):
             lc_annot = annot
             if annot=="HSat2" or annot=="HSat3":
                 lc_annot = annot.replace("HS", "hs")
             if annot=="alphasat":
                 lc_annot = "alpha_sat"
 
-            if chrom not in centro_regions[annot].keys():
-                continue
-            for limits in centro_regions[annot][chrom]:
-                if not (start > limits[1] or end < limits[0]):
-                    if regionstring not in region_labels.keys():
-                        region_labels[regionstring] = {}
-                    region_labels[regionstring][lc_annot] = True
-                if end < limits[0]:
-                    break
+            if regionstring not in region_labels.keys():
+                region_labels[regionstring] = {}
+            region_labels[regionstring][lc_annot] = True
 
     return region_labels
 
-def padded_region(regionstring: str):
-    m = re.search(r'(\S+)\:(\d+)\-(\d+)', regionstring)
-    [chrom, start, end] = m.groups()
-    chrom = chrom.replace("chrX", "chr23")
-    chrom = chrom.replace("chrY", "chr24")
-    chrom = chrom.replace("chrM", "chr25_MATERNAL")
-    chrom = chrom.replace("chrEBV", "chr26_PATERNAL")
-
-    return chrom.zfill(50) + start.zfill(12) + end.zfill(12)
-
 def create_github_issue(issuevcfline: dict, centrodict: dict, region: str, issuetypetags: list, githubdir: str, dryrun: bool, version: str) -> int:
-    name = "Issue: " + region
+    name = issuenameprefix + region
     centrotags = list(centrodict.keys())
     all_labels = issuetypetags + centrotags
 
@@ -144,13 +206,159 @@ def create_github_issue(issuevcfline: dict, centrodict: dict, region: str, issue
 
     if dryrun:
         print(issuecomment + labelstring) 
+        return 0
     else:
         issueid = callhub.create_new_issue(githubdir, name, issuecomment, all_labels)
         if issueid == -1:
             print("Something went wrong creating issue " + name)
-            exit(1)
         else:
             print("Created issue with id " + str(issueid))
+        return issueid
+
+def snapshot_issue_regions(checkoutdir: str) -> dict:
+    # region -> issue number for the issues in the snapshot, by the region in each
+    # issue's body and by the "Issue: REGION" name create_github_issue gives it
+    issueregions = {}
+    for issue in snapshot.iterate_issues(checkoutdir, state="all"):
+        issueregions[issue["region"]] = int(issue["issueid"])
+        if issue["name"].startswith(issuenameprefix):
+            issueregions[issue["name"][len(issuenameprefix):]] = int(issue["issueid"])
+    return issueregions
+
+def create_github_issues(region_list: list, vcfline_dict: dict, censat_dict: dict, issuetypetags: list, githubdir: str, version: str, limiter: ratelimit.TokenBucket, numworkers: int, creationjournal: journal.CreationJournal = None, maxattempts: int = defaultcreateattempts) -> dict:
+    # Regions are handed out and given rate limiter tokens in region_list order
+    # under one lock, so issues are submitted in that order even though up to
+    # numworkers of them are in flight at once. A region that hits a rate limit
+    # goes back to the front of the queue. A creation github turned down is
+    # retried, after an exponentially growing wait, up to maxattempts times. One
+    # that failed part way (a dropped connection, a server error) may have
+    # created the issue anyway, so after the wait the snapshot is synced and the
+    # issue looked for before the region is tried again. Regions that still fail
+    # are reported and left for the next run. Every submission and its outcome
+    # are written to creationjournal, if given.
+    pending = collections.deque(region_list)
+    dispatchlock = threading.Lock()
+    synclock = threading.Lock()
+    issueids = {}
+    attempts = {}
+    failedregions = []
+
+    def journal_record(region: str, state: str, issueid: int = None, message: str = None):
+        if creationjournal is not None:
+            creationjournal.record(region, state, issueid, message)
+
+    def find_created_issue(region: str) -> int:
+        # one sync at a time--the others will find their issues in the same snapshot
+        with synclock:
+            snapshot.sync_issues(githubdir)
+            return snapshot_issue_regions(githubdir).get(region)
+
+    def create_worker():
+        while True:
+            with dispatchlock:
+                if len(pending) == 0:
+                    return
+                region = pending.popleft()
+                limiter.acquire()
+                attempts[region] = attempts.get(region, 0) + 1
+            if region in censat_dict.keys():
+                censatdict = censat_dict[region]
+            else:
+                censatdict = {}
+            journal_record(region, "submitted")
+            message = None
+            uncertain = False
+            try:
+                issueid = create_github_issue(vcfline_dict[region], censatdict, region, issuetypetags, githubdir, False, version)
+            except ratelimit.RateLimited as error:
+                # github refused the request, so no issue was created--this doesn't count as an attempt
+                print(str(error) + "--slowing down")
+                journal_record(region, "failed", message=str(error))
+                limiter.throttled(error.retryafter)
+                with dispatchlock:
+                    attempts[region] = attempts[region] - 1
+                    pending.appendleft(region)
+                continue
+            except Exception as error:
+                # e.g. a dropped connection (backends.UncertainOutcome)
+                issueid = -1
+                message = str(error)
+                uncertain = True
+            if issueid != -1:
+                journal_record(region, "created", issueid)
+                limiter.succeeded()
+                with dispatchlock:
+                    issueids[region] = issueid
+                continue
+
+            backoff = initialcreatebackoff * 2 ** (attempts[region] - 1)
+            if uncertain:
+                # the region stays "submitted" in the journal until the issue is found or ruled out
+                print("Creating the issue for region " + region + " failed part way (" + message + ")--looking for it in " + str(backoff) + " seconds")
+                trace.sleep(backoff, "create retry backoff")
+                try:
+                    issueid = find_created_issue(region)
+                except Exception as error:
+                    print("Unable to look for an issue for region " + region + ": " + str(error))
+                    with dispatchlock:
+                        failedregions.append(region)
+                    continue
+                if issueid is not None:
+                    print("Found issue " + str(issueid) + " for region " + region)
+                    journal_record(region, "created", issueid, "found in snapshot")
+                    with dispatchlock:
+                        issueids[region] = issueid
+                    continue
+
+            journal_record(region, "failed", message=message)
+            if attempts[region] >= maxattempts:
+                print("Giving up on region " + region + " after " + str(attempts[region]) + " attempts")
+                with dispatchlock:
+                    failedregions.append(region)
+                continue
+            if uncertain:
+                print("No issue was created for region " + region + "--retrying")
+            else:
+                print("Retrying region " + region + " in " + str(backoff) + " seconds")
+                trace.sleep(backoff, "create retry backoff")
+            with dispatchlock:
+                pending.appendleft(region)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=numworkers) as executor:
+        workers = [executor.submit(create_worker) for i in range(numworkers)]
+        for worker in workers:
+            worker.result()
+
+    # github numbers issues in the order it receives them, which can differ from submission order
+    lastissueid = 0
+    for region in region_list:
+        if region not in issueids.keys():
+            continue
+        if issueids[region] < lastissueid:
+            print("Issue " + str(issueids[region]) + " for region " + region + " was numbered out of region order")
+        lastissueid = max(lastissueid, issueids[region])
+
+    if len(failedregions) > 0:
+        print("Failed to create issues for " + ",".join(failedregions) + "--run again to retry them")
+
+    return issueids
+
+def resume_from_journal(creationjournal: journal.CreationJournal, region_list: list, checkoutdir: str) -> list:
+    # returns the regions in region_list that still need issues. Regions that were
+    # submitted when the last run stopped are looked up in the (just synced) snapshot.
+    unconfirmed = creationjournal.unconfirmed_regions()
+    if len(unconfirmed) > 0:
+        snapshotregions = snapshot_issue_regions(checkoutdir)
+        for region in unconfirmed:
+            if region in snapshotregions.keys():
+                creationjournal.record(region, "created", snapshotregions[region], "found in snapshot")
+
+    created = creationjournal.created_issues()
+    remaining = [region for region in region_list if region not in created.keys()]
+    if len(remaining) < len(region_list):
+        print("Resuming from " + creationjournal.journalfile + ": " + str(len(region_list) - len(remaining)) + " regions already have issues")
+
+    return remaining
 
 def init_argparse() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
@@ -165,14 +373,23 @@ def init_argparse() -> argparse.ArgumentParser:
     parser.add_argument('-s', '--source', type=str, metavar='directory of checkout of source github repository', required=True)
     parser.add_argument('-a', '--assembly', type=str, default=defaultassemblyversion, metavar='assembly version', required=False)
     parser.add_argument('-d', '--dryrun', action='store_true', help='just print info about issue--dont actually create it')
-    parser.add_argument('-w', '--wait', type=int, default=defaultsleeptime, help='number of seconds to wait after creating an issue', required=False)
+    parser.add_argument('-w', '--wait', type=int, default=defaultsleeptime, help='number of seconds to wait between issues at the start of a run', required=False)
+    parser.add_argument('-m', '--maxrate', type=float, default=defaultmaxrate, help='maximum number of issues to create per minute', required=False)
+    parser.add_argument('-j', '--jobs', type=int, default=defaultworkers, help='number of issues to create concurrently', required=False)
     parser.add_argument('-l', '--labels', type=str, default="", help='comma-delimited string of labels to apply to all issues', required=False)
+    parser.add_argument('-r', '--region', type=str, action='append', default=[], help='only load VCF records in this chromosome or chrom:start-end region (may be repeated)', required=False)
+    parser.add_argument('-b', '--bed', type=str, default=None, help='only load VCF records in the regions of this BED file', required=False)
+    parser.add_argument('--retries', type=int, default=defaultcreateattempts, help='number of times to try creating each issue', required=False)
+    parser.add_argument('--journal', type=str, default=None, help='journal file recording the issues created, for resuming an interrupted run (default: a file in the checkout directory named for the VCF file)', required=False)
+    parser.add_argument('-g', '--merge-distance', type=int, default=None, help='merge VCF records that overlap or are within this many bases of each other into one issue', required=False)
+    parser.add_argument('-t', '--track', type=str, action='append', default=[], help='label regions overlapping this BED track, as BEDFILE or BEDFILE=LABELRULE where {name} and {lcname} in the rule stand for the BED name column (may be repeated)', required=False)
+    trace.add_arguments(parser)
 
     return parser
 
-def main() -> None:
+def main(argv: list = None) -> None:
     parser = init_argparse()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
  
     vcffile = args.vcffile
     checkoutdir = args.source
@@ -180,21 +397,60 @@ def main() -> None:
     version = args.assembly
     sleeptime = args.wait
     labels = args.labels.split(',')
+    trace.start_from_args(args)
 
-    [vcfline_dict, region_list] = read_issue_vcffile(vcffile)
-    check_region_list(region_list, checkoutdir) 
-    censat_dict = read_censat_annotations(censat_bedfile, region_list)
+    with trace.span("read VCF"):
+        regionfilter = None
+        if len(args.region) > 0 or args.bed is not None:
+            regionfilter = read_region_filter(args.region, args.bed)
+        [vcfline_dict, region_list] = read_issue_vcffile(vcffile, regionfilter)
+    if args.merge_distance is not None:
+        with trace.span("cluster records"):
+            [vcfline_dict, region_list] = cluster_vcf_records(vcfline_dict, region_list, args.merge_distance)
+    with trace.span("sync snapshot"):
+        snapshot.sync_issues(checkoutdir)
+    creationjournal = None
+    if not dryrun:
+        journalfile = args.journal
+        if journalfile is None:
+            journalfile = journal.journal_path(checkoutdir, vcffile)
+        creationjournal = journal.CreationJournal(journalfile)
+        region_list = resume_from_journal(creationjournal, region_list, checkoutdir)
+    with trace.span("check overlaps"):
+        overlaps = check_region_list(region_list, checkoutdir)
+    if len(overlaps) > 0:
+        print(str(len(overlaps)) + " overlapping regions found--no issues will be created")
+        exit(1)
+    with trace.span("annotate regions"):
+        censat_dict = read_censat_annotations(censat_bedfile, region_list)
+    if len(args.track) > 0:
+        tracks = [annotate.parse_track_option(trackoption) for trackoption in args.track]
+        with trace.span("annotate tracks"):
+            track_dict = annotate.annotate_regions(tracks, region_list)
+        for region in track_dict.keys():
+            if region not in censat_dict.keys():
+                censat_dict[region] = {}
+            censat_dict[region].update(track_dict[region])
 
-    region_list.sort(key=padded_region)
+    region_list.sort(key=regions.sort_key)
 
-    for region in region_list:
-        if region in censat_dict.keys():
-            censatdict = censat_dict[region]
-        else:
-            censatdict = {}
-        create_github_issue(vcfline_dict[region], censatdict, region, labels, checkoutdir, dryrun, version)
-        if not dryrun:
-            time.sleep(sleeptime)
+    if dryrun:
+        for region in region_list:
+            if region in censat_dict.keys():
+                censatdict = censat_dict[region]
+            else:
+                censatdict = {}
+            create_github_issue(vcfline_dict[region], censatdict, region, labels, checkoutdir, dryrun, version)
+    else:
+        # start at one issue every --wait seconds and speed up towards --maxrate
+        limiter = ratelimit.TokenBucket(1.0 / max(sleeptime, 1), args.maxrate / 60.0)
+        # a backend that sees X-RateLimit-* headers passes them on to the limiter
+        backends.get_backend(checkoutdir).limiter = limiter
+        with trace.span("create issues"):
+            issueids = create_github_issues(region_list, vcfline_dict, censat_dict, labels, checkoutdir, version, limiter, args.jobs, creationjournal, args.retries)
+        creationjournal.close()
+        if len(issueids) < len(region_list):
+            exit(1)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,159 @@
+import sys
+import argparse
+
+from github_issues import labels
+from github_issues import regions
+from github_issues import snapshot
+from github_issues import trace
+
+# Writes the parsed issues as typed columns in a NumPy .npz file, so counts by
+# curator, size distributions per chromosome and the like can be computed with
+# array operations on a file that loads in milliseconds, instead of re-parsing
+# every issue. Each array has one entry per issue, in issue number order:
+#
+#   issueid, start, end, size - int64 (start, end and size are -1 when the
+#       issue's region or size couldn't be parsed)
+#   name - the issue titles
+#   chrom, status, assignedto, assembly and each label taxonomy column -
+#       int32 codes into the matching "<column>_categories" array of strings
+#       (chromosomes in region sort order, the others alphabetical; chrom is -1
+#       for unparsable regions)
+#   labels - uint64 bitsets, one row per issue, with bit i of the row (word
+#       i // 64, bit i % 64) set when the issue has label labels_categories[i]
+#
+# numpy is only needed here; install it with pip install github_issues[columnar].
+
+categorycolumns = ["status", "assignedto", "assembly"]
+
+def import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        print("Columnar export needs numpy--install it with pip install numpy (or github_issues[columnar])", file=sys.stderr)
+        sys.exit(1)
+    return numpy
+
+def encode_categories(numpy, values: list, categories: list):
+    # int32 codes of values in categories, with -1 for None
+    codes = dict((categories[code], code) for code in range(len(categories)))
+    return numpy.array([codes[value] if value is not None else -1 for value in values], dtype=numpy.int32)
+
+def issue_columns(issues) -> dict:
+    # column name -> numpy array, from parsed issues
+    numpy = import_numpy()
+    labelcolumns = labels.taxonomy_columns()
+    textcolumns = dict((column, []) for column in categorycolumns + labelcolumns)
+    issueids = []
+    names = []
+    chroms = []
+    starts = []
+    ends = []
+    sizes = []
+    issuelabels = []
+    for issue in issues:
+        issueids.append(int(issue["issueid"]))
+        names.append(issue["name"])
+        region = regions.parse_region(issue["region"])
+        if region is None:
+            chroms.append(None)
+            starts.append(-1)
+            ends.append(-1)
+        else:
+            chroms.append(region.chrom)
+            starts.append(region.start)
+            ends.append(region.end)
+        sizes.append(issue["size"] if isinstance(issue["size"], int) else -1)
+        for column in textcolumns.keys():
+            textcolumns[column].append(str(issue[column]))
+        issuelabels.append(issue["labels"])
+
+    columns = {"issueid":numpy.array(issueids, dtype=numpy.int64),
+               "name":numpy.array(names, dtype=str),
+               "start":numpy.array(starts, dtype=numpy.int64),
+               "end":numpy.array(ends, dtype=numpy.int64),
+               "size":numpy.array(sizes, dtype=numpy.int64)}
+
+    chromcategories = sorted(set([chrom for chrom in chroms if chrom is not None]), key=regions.chromosome_rank)
+    columns["chrom"] = encode_categories(numpy, chroms, chromcategories)
+    columns["chrom_categories"] = numpy.array(chromcategories, dtype=str)
+    for column in textcolumns.keys():
+        categories = sorted(set(textcolumns[column]))
+        columns[column] = encode_categories(numpy, textcolumns[column], categories)
+        columns[column + "_categories"] = numpy.array(categories, dtype=str)
+
+    # issues mostly share a few label combinations (see labels.shared_labels), so
+    # each distinct combination's bitset row is built once
+    labelcategories = sorted(set([label for labeltuple in set(issuelabels) for label in labeltuple if label != ""]))
+    labelbits = dict((labelcategories[bit], bit) for bit in range(len(labelcategories)))
+    numwords = max(1, (len(labelcategories) + 63) // 64)
+    labelrows = {}
+    for labeltuple in set(issuelabels):
+        row = [0] * numwords
+        for label in labeltuple:
+            if label in labelbits.keys():
+                bit = labelbits[label]
+                row[bit // 64] |= 1 << (bit % 64)
+        labelrows[labeltuple] = row
+    columns["labels"] = numpy.array([labelrows[labeltuple] for labeltuple in issuelabels], dtype=numpy.uint64).reshape(len(issuelabels), numwords)
+    columns["labels_categories"] = numpy.array(labelcategories, dtype=str)
+
+    return columns
+
+def write_issue_columns(checkoutdir: str, outfile: str, state: str = "open") -> int:
+    numpy = import_numpy()
+    with trace.span("read issues"):
+        columns = issue_columns(snapshot.iterate_issues(checkoutdir, state))
+    with trace.span("write columns"):
+        # uncompressed, so loading is just reading the arrays
+        numpy.savez(outfile, **columns)
+    return len(columns["issueid"])
+
+def load_issue_columns(columnfile: str) -> dict:
+    numpy = import_numpy()
+    with numpy.load(columnfile, allow_pickle=False) as npzfile:
+        return dict((column, npzfile[column]) for column in npzfile.files)
+
+def label_mask(columns: dict, label: str):
+    # boolean array of the issues with label, from loaded columns
+    numpy = import_numpy()
+    labelcategories = list(columns["labels_categories"])
+    if label not in labelcategories:
+        return numpy.zeros(len(columns["issueid"]), dtype=bool)
+    bit = labelcategories.index(label)
+    return (columns["labels"][:, bit // 64] & numpy.uint64(1 << (bit % 64))) != 0
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION] ...",
+        description="Write a repository's parsed issues to a NumPy .npz file of typed columns"
+    )
+    parser.add_argument(
+        "-v", "--version", action="version",
+        version = f"{parser.prog} version 1.0.0"
+    )
+    parser.add_argument('-s', '--source', type=str, metavar='directory of checkout of source github repository', required=True)
+    parser.add_argument('-o', '--output', type=str, default="issues.npz", help='.npz file to write (default issues.npz)', required=False)
+    parser.add_argument('-a', '--all', action='store_true', help='include closed issues')
+    parser.add_argument('-t', '--taxonomy', type=str, default=None, help='JSON file of label categories to use in place of the default taxonomy', required=False)
+    parser.add_argument('-n', '--nosync', action='store_true', help='use the local snapshot of the issues as it is, without asking github for updates')
+    trace.add_arguments(parser)
+
+    return parser
+
+def main(argv: list = None) -> None:
+    parser = init_argparse()
+    args = parser.parse_args(argv)
+
+    import_numpy()
+    trace.start_from_args(args)
+    if not args.nosync:
+        with trace.span("sync snapshot"):
+            snapshot.sync_issues(args.source)
+    if args.taxonomy is not None:
+        labels.load_taxonomy_file(args.taxonomy)
+
+    numissues = write_issue_columns(args.source, args.output, "all" if args.all else "open")
+    print("Wrote " + str(numissues) + " issues to " + args.output)
+
+if __name__ == '__main__':
+    main()
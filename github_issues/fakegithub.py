@@ -0,0 +1,92 @@
+import json
+import datetime
+import threading
+
+# In-process stand-in for a github repository, with the same methods as the
+# backends in backends.py, so the package can be run, tested and benchmarked
+# without network access. Issues can be seeded from a JSON file holding a
+# list of objects with "number", "title", "body", "state", "labels" and
+# "assignees" keys (labels and assignees as lists); the other fields are
+# filled in. Every operation is counted in self.calls.
+
+class FakeGitHub:
+
+    urlprefix = "https://github.com/fake/fake-issues/issues/"
+
+    def __init__(self, issuesfile: str = None):
+        self.issues = {}
+        self.nextnumber = 1
+        self.calls = {}
+        self.transferred = {}
+        self.limiter = None
+        self.lock = threading.Lock()
+        if issuesfile is not None:
+            with open(issuesfile, 'r') as fh_issues:
+                for issue in json.load(fh_issues):
+                    self.add_issue(issue.get("title", ""), issue.get("body", ""), issue.get("labels", []), issue.get("assignees", []), issue.get("state", "open"), issue.get("number"))
+
+    def _count(self, operation: str) -> None:
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def _now(self) -> str:
+        return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def add_issue(self, name: str, comment: str, labels: list, assignees: list, state: str = "open", number: int = None) -> int:
+        with self.lock:
+            if number is None:
+                number = self.nextnumber
+            self.nextnumber = max(self.nextnumber, number + 1)
+            self.issues[number] = {"number":number, "title":name, "body":comment, "state":state,
+                                   "labels":[label for label in labels if label != ""],
+                                   "assignees":list(assignees), "updated":self._now()}
+        return number
+
+    def issue_records(self, state: str = None, since: str = None):
+        with self.lock:
+            self._count("list")
+            issues = [dict(issue) for issue in self.issues.values()]
+        for issue in sorted(issues, key=lambda issue: issue["number"]):
+            if state != "all" and issue["state"] != (state or "open"):
+                continue
+            if since is not None and issue["updated"] < since:
+                continue
+            yield [str(issue["number"]), self.urlprefix + str(issue["number"]), issue["state"], issue["title"],
+                   ", ".join(issue["labels"]), ", ".join(issue["assignees"]), issue["body"], issue["updated"]]
+
+    def open_issue_numbers(self) -> set:
+        with self.lock:
+            self._count("list numbers")
+            return set(number for (number, issue) in self.issues.items() if issue["state"] == "open")
+
+    def create_issue(self, name: str, comment: str, labels: list) -> int:
+        with self.lock:
+            self._count("create")
+        return self.add_issue(name, comment, labels, [])
+
+    def _update(self, operation: str, issueid: str, field: str, value) -> list:
+        with self.lock:
+            self._count(operation)
+            if not issueid.isdigit() or int(issueid) not in self.issues.keys():
+                return [False, "No issue " + issueid]
+            issue = self.issues[int(issueid)]
+            issue[field] = value
+            issue["updated"] = self._now()
+        return [True, "Updated issue " + issueid]
+
+    def close_issue(self, issueid: str) -> list:
+        return self._update("close", issueid, "state", "closed")
+
+    def replace_labels(self, issueid: str, newlabels: list) -> list:
+        return self._update("labels", issueid, "labels", [label for label in newlabels if label != ""])
+
+    def replace_assignees(self, issueid: str, username: str) -> list:
+        return self._update("assignees", issueid, "assignees", [assignee for assignee in username.split(",") if assignee != ""])
+
+    def transfer_issue(self, issueid: str, destinationrepo: str) -> list:
+        with self.lock:
+            self._count("transfer")
+            if not issueid.isdigit() or int(issueid) not in self.issues.keys():
+                return [False, "No issue " + issueid]
+            self.transferred[int(issueid)] = destinationrepo
+            del self.issues[int(issueid)]
+        return [True, "Transferred to " + destinationrepo]
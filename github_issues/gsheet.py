@@ -0,0 +1,56 @@
+import gspread
+
+from gspread.utils import rowcol_to_a1
+
+from github_issues import trace
+
+# Google Sheets writes are collected first and then sent as a few batched
+# requests. Requests that hit the Sheets quota (HTTP 429) or a transient
+# server error are retried with exponential backoff, honoring Retry-After.
+maxbatchranges = 500
+maxbatchrows = 500
+maxretries = 8
+initialbackoff = 2
+maxbackoff = 64
+retrystatuses = [429, 500, 502, 503, 504]
+
+def call_with_backoff(function, *args, **kwargs):
+    backoff = initialbackoff
+    attempt = 1
+    while True:
+        try:
+            with trace.span("sheets " + function.__name__, "sheets"):
+                return function(*args, **kwargs)
+        except gspread.exceptions.APIError as error:
+            status = error.response.status_code
+            if status not in retrystatuses or attempt >= maxretries:
+                raise
+            retryafter = error.response.headers.get("Retry-After")
+            if retryafter is not None and retryafter.isdigit():
+                waittime = int(retryafter)
+            else:
+                waittime = backoff
+            print("Google Sheets returned status " + str(status) + ", retrying in " + str(waittime) + " seconds")
+            trace.sleep(waittime, "sheets backoff")
+            backoff = min(backoff * 2, maxbackoff)
+            attempt = attempt + 1
+
+def apply_sheet_changes(wks, cellupdates: list, newrows: list) -> int:
+    # cellupdates are [row, column, value] with one-based row and column numbers
+    numcalls = 0
+    for batchstart in range(0, len(cellupdates), maxbatchranges):
+        batch = []
+        for [rowid, colid, value] in cellupdates[batchstart:batchstart + maxbatchranges]:
+            batch.append({"range":rowcol_to_a1(rowid, colid), "values":[[value]]})
+        call_with_backoff(wks.batch_update, batch, value_input_option="USER_ENTERED")
+        numcalls = numcalls + 1
+
+    for batchstart in range(0, len(newrows), maxbatchrows):
+        call_with_backoff(wks.append_rows, newrows[batchstart:batchstart + maxbatchrows])
+        numcalls = numcalls + 1
+
+    # the unbatched updaters made one request per changed cell and one per new row
+    unbatchedcalls = len(cellupdates) + len(newrows)
+    print("Wrote " + str(len(cellupdates)) + " cell updates and " + str(len(newrows)) + " new rows with " + str(numcalls) + " API calls (" + str(unbatchedcalls - numcalls) + " fewer than one call per cell and row)")
+
+    return numcalls
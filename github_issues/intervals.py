@@ -0,0 +1,141 @@
+# Per-chromosome interval index: intervals are kept sorted by start and laid
+# out as an implicit augmented binary tree (the layout used by cgranges), where
+# each node also records the maximum end coordinate of its subtree. Building
+# the index is O(n log n) and each overlap query is O(log n + hits).
+#
+# Coordinates are one-based and closed, like the region strings used in the
+# issue bodies ("chr1_MATERNAL:1000-1010").
+#
+# For nearest-interval queries the index also keeps the order of the intervals
+# by end coordinate, so intervals to the left of a query can be walked outward
+# from it the same way the starts are walked to its right.
+
+import bisect
+
+def build_interval_index(intervals: dict) -> dict:
+    # intervals is a dict of chrom -> list of [start, end, data] entries
+    index = {}
+    for chrom in intervals.keys():
+        entries = sorted(intervals[chrom], key=lambda entry: (entry[0], entry[1]))
+        starts = [entry[0] for entry in entries]
+        ends = [entry[1] for entry in entries]
+        data = [entry[2] for entry in entries]
+        maxends = list(ends)
+        rootlevel = _augment_maxends(ends, maxends)
+        endorder = sorted(range(len(ends)), key=lambda i: ends[i])
+        sortedends = [ends[i] for i in endorder]
+        index[chrom] = {"starts":starts, "ends":ends, "maxends":maxends, "data":data, "rootlevel":rootlevel,
+                        "endorder":endorder, "sortedends":sortedends}
+
+    return index
+
+def add_interval(intervals: dict, chrom: str, start: int, end: int, data) -> None:
+    if chrom not in intervals.keys():
+        intervals[chrom] = []
+    intervals[chrom].append([start, end, data])
+
+def _augment_maxends(ends: list, maxends: list) -> int:
+    numintervals = len(ends)
+    if numintervals == 0:
+        return -1
+
+    # leaves sit at even positions, their max end is their own end
+    lastindex = 0
+    for i in range(0, numintervals, 2):
+        lastindex = i
+    lastmax = maxends[lastindex]
+
+    level = 1
+    while (1 << level) <= numintervals:
+        halfstep = 1 << (level - 1)
+        firstnode = (halfstep << 1) - 1
+        step = halfstep << 2
+        for i in range(firstnode, numintervals, step):
+            leftmax = maxends[i - halfstep]
+            rightmax = maxends[i + halfstep] if i + halfstep < numintervals else lastmax
+            maxends[i] = max(ends[i], leftmax, rightmax)
+        # track the max end of the rightmost (possibly incomplete) subtree
+        lastindex = lastindex - halfstep if (lastindex >> level) & 1 else lastindex + halfstep
+        if lastindex < numintervals and maxends[lastindex] > lastmax:
+            lastmax = maxends[lastindex]
+        level = level + 1
+
+    return level - 1
+
+def overlapping_intervals(index: dict, chrom: str, start: int, end: int) -> list:
+    # returns [start, end, data] for every indexed interval overlapping start-end, sorted by start
+    hits = []
+    if chrom not in index.keys():
+        return hits
+    chromindex = index[chrom]
+    starts = chromindex["starts"]
+    ends = chromindex["ends"]
+    maxends = chromindex["maxends"]
+    data = chromindex["data"]
+    numintervals = len(starts)
+    rootlevel = chromindex["rootlevel"]
+    if rootlevel < 0:
+        return hits
+
+    stack = [(rootlevel, (1 << rootlevel) - 1, False)]
+    while stack:
+        level, node, leftdone = stack.pop()
+        if level <= 3:
+            # small subtree: scan its nodes in order
+            first = node >> level << level
+            last = min(first + (1 << (level + 1)) - 1, numintervals)
+            for i in range(first, last):
+                if starts[i] > end:
+                    break
+                if ends[i] >= start:
+                    hits.append([starts[i], ends[i], data[i]])
+        elif not leftdone:
+            leftchild = node - (1 << (level - 1))
+            stack.append((level, node, True))
+            if leftchild >= numintervals or maxends[leftchild] >= start:
+                stack.append((level - 1, leftchild, False))
+        elif node < numintervals and starts[node] <= end:
+            if ends[node] >= start:
+                hits.append([starts[node], ends[node], data[node]])
+            stack.append((level - 1, node + (1 << (level - 1)), False))
+
+    return hits
+
+def nearest_intervals(index: dict, chrom: str, start: int, end: int, count: int = 1, accept=None) -> list:
+    # returns [start, end, data, distance] for the count indexed intervals closest
+    # to start-end (overlapping intervals have distance 0), nearest first; when
+    # accept is given, only intervals whose data it returns True for are counted
+    nearest = []
+    if chrom not in index.keys() or count <= 0:
+        return nearest
+    chromindex = index[chrom]
+    starts = chromindex["starts"]
+    ends = chromindex["ends"]
+    data = chromindex["data"]
+    endorder = chromindex["endorder"]
+
+    for hit in overlapping_intervals(index, chrom, start, end):
+        if accept is None or accept(hit[2]):
+            nearest.append(hit + [0])
+            if len(nearest) == count:
+                return nearest
+
+    # intervals starting after end, in order of start, and intervals ending before
+    # start, in reverse order of end, merged by distance
+    right = bisect.bisect_right(starts, end)
+    left = bisect.bisect_left(chromindex["sortedends"], start) - 1
+    while len(nearest) < count and (right < len(starts) or left >= 0):
+        rightdistance = starts[right] - end if right < len(starts) else None
+        leftdistance = start - ends[endorder[left]] if left >= 0 else None
+        if leftdistance is None or (rightdistance is not None and rightdistance <= leftdistance):
+            i = right
+            distance = rightdistance
+            right = right + 1
+        else:
+            i = endorder[left]
+            distance = leftdistance
+            left = left - 1
+        if accept is None or accept(data[i]):
+            nearest.append([starts[i], ends[i], data[i], distance])
+
+    return nearest
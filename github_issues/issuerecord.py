@@ -0,0 +1,70 @@
+import sys
+
+# Parsed issues (see callhub.parse_issue_fields). They used to be one dict per
+# issue with its own labels list and freshly built copies of "no", "none",
+# "unassigned" and the other few values most fields take, which adds up when
+# the sheet updaters hold every issue in memory. An IssueRecord keeps the
+# per-issue fields in slots, interns the strings drawn from a small vocabulary,
+# and shares the labels tuple, label set and label-derived column values with
+# every other issue that has the same labels (labels.shared_labels).
+#
+# Records still read like the old dicts--issue["region"], issue.get(),
+# keys(), items()--so sheet column maps and other field lookups by name keep
+# working. They are read-only.
+
+class IssueRecord:
+    __slots__ = ("issueid", "url", "status", "name", "labels", "labelset", "assignedto", "region", "size", "assembly", "labelcolumns")
+
+    # fields held in slots, in the order of the old dict's keys; the label
+    # taxonomy's columns follow them
+    fields = ("issueid", "url", "status", "name", "labels", "assignedto", "region", "size", "assembly")
+
+    def __init__(self, issueid: str, url: str, status: str, name: str, sharedlabels: list, assignedto: str, region: str, size, assembly: str):
+        self.issueid = issueid
+        self.url = url
+        self.status = sys.intern(status)
+        self.name = name
+        [self.labels, self.labelset, self.labelcolumns] = sharedlabels
+        self.assignedto = sys.intern(assignedto)
+        self.region = region
+        self.size = size
+        self.assembly = sys.intern(assembly)
+
+    def __getitem__(self, key: str):
+        if key in _fieldset:
+            return getattr(self, key)
+        return self.labelcolumns[key]
+
+    def get(self, key: str, default=None):
+        if key in _fieldset:
+            return getattr(self, key)
+        return self.labelcolumns.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in _fieldset or key in self.labelcolumns
+
+    def keys(self) -> list:
+        return list(self.fields) + list(self.labelcolumns.keys())
+
+    def values(self) -> list:
+        return [self[key] for key in self.keys()]
+
+    def items(self) -> list:
+        return [(key, self[key]) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.fields) + len(self.labelcolumns)
+
+    def to_dict(self) -> dict:
+        issuedict = dict((field, getattr(self, field)) for field in self.fields)
+        issuedict["labels"] = list(self.labels)
+        issuedict.update(self.labelcolumns)
+        return issuedict
+
+    def __repr__(self) -> str:
+        return "IssueRecord(" + repr(self.issueid) + ", " + repr(self.region) + ")"
+
+_fieldset = frozenset(IssueRecord.fields)
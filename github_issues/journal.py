@@ -0,0 +1,63 @@
+import os
+import json
+import hashlib
+import datetime
+import threading
+
+# Write-ahead journal of issue creation, so an interrupted create_new_issues
+# run can be started again and pick up where it stopped. Each region is
+# journaled as "submitted" (flushed to disk) before its issue is created, then
+# as "created" with the new issue number or "failed" with the error. The
+# journal is a file of JSON lines, one per event, in the checkout directory,
+# named for the VCF file the regions came from; the last line for a region
+# gives its state.
+
+def journal_path(checkoutdir: str, vcffile: str) -> str:
+    vcfhash = hashlib.sha1(os.path.abspath(vcffile).encode()).hexdigest()[:16]
+    return os.path.join(checkoutdir, ".create_new_issues." + vcfhash + ".journal")
+
+class CreationJournal:
+
+    def __init__(self, journalfile: str):
+        self.journalfile = journalfile
+        self.states = {}
+        self.lock = threading.Lock()
+        if os.path.exists(journalfile):
+            with open(journalfile, 'rb+') as fh_journal:
+                lines = fh_journal.read().split(b"\n")
+                # a line cut short when the last run was killed is cut off, so the
+                # next record doesn't get appended to it
+                if lines[-1] != b"":
+                    fh_journal.truncate(fh_journal.tell() - len(lines[-1]))
+                for line in lines[:-1]:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.states[entry["region"]] = entry
+        self.fh = open(journalfile, 'a')
+
+    def close(self) -> None:
+        self.fh.close()
+
+    def record(self, region: str, state: str, issueid: int = None, message: str = None) -> None:
+        entry = {"region":region, "state":state, "time":datetime.datetime.now(datetime.timezone.utc).isoformat()}
+        if issueid is not None:
+            entry["issueid"] = issueid
+        if message is not None:
+            entry["message"] = message
+        with self.lock:
+            self.states[region] = entry
+            self.fh.write(json.dumps(entry) + "\n")
+            self.fh.flush()
+            os.fsync(self.fh.fileno())
+
+    def created_issues(self) -> dict:
+        # region -> issue number for regions whose issues were confirmed created
+        with self.lock:
+            return dict((region, entry["issueid"]) for (region, entry) in self.states.items() if entry["state"] == "created")
+
+    def unconfirmed_regions(self) -> list:
+        # regions submitted when the last run stopped--their issues may or may not exist
+        with self.lock:
+            return [region for (region, entry) in self.states.items() if entry["state"] == "submitted"]
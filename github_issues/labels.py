@@ -0,0 +1,148 @@
+import re
+import sys
+import json
+
+# Label taxonomy: each category names the issue field (column) it fills, the
+# exact labels and label patterns (matched from the start of the label, like
+# re.match) that belong to it, the value to use when no label matches, and
+# optionally a fixed value to use instead of the joined labels. When a label
+# fits more than one category, the first category in the list wins.
+#
+# A taxonomy with the same layout can be loaded from a JSON file with
+# load_taxonomy_file().
+#
+# Patterns are matched together as one alternation, each wrapped in a
+# numbered group that maps back to its category. Patterns with groups of
+# their own (named or numbered, or backreferences to them) would upset that
+# numbering, and inline global flags like (?i) are only allowed at the start
+# of the whole expression, so those patterns are matched one at a time after
+# the alternation.
+defaulttaxonomy = {
+    "categories": [
+        {"column":"centromere", "labels":["alpha_sat"], "patterns":["hsat.*"], "default":"no"},
+        {"column":"coverage", "patterns":[".*_cov_.*"], "default":"unflagged"},
+        {"column":"evidence", "patterns":[".*evidence"], "default":"none"},
+        {"column":"content", "patterns":["^[atgc_]+$"], "default":"unflagged"},
+        {"column":"clipped", "labels":["clipped"], "default":"no", "value":"yes"},
+        {"column":"errors", "labels":["error_kmer"], "default":"no"},
+        {"column":"programs", "labels":["coverage_pri", "flagger_intersect", "merqury", "phase_switch"], "default":"none"},
+        {"column":"diagnosis", "labels":["priority", "false_positive", "help_wanted"], "default":"none"}
+    ]
+}
+
+# the flags of a pattern without inline flags
+_plainflags = re.compile("").flags
+
+_categories = []
+_exactlabels = {}
+_familypattern = None
+_familycategories = []
+_grouppatterns = []
+_labelcache = {}
+_labelstringcache = {}
+
+def set_taxonomy(taxonomy: dict) -> None:
+    global _categories, _exactlabels, _familypattern, _familycategories, _grouppatterns, _labelcache, _labelstringcache
+
+    categories = taxonomy["categories"]
+    exactlabels = {}
+    familypatterns = []
+    familycategories = []
+    grouppatterns = []
+    for categoryindex in range(len(categories)):
+        category = categories[categoryindex]
+        if "column" not in category.keys() or "default" not in category.keys():
+            print("Label category " + str(categoryindex) + " needs a column and a default value")
+            exit(1)
+        for label in category.get("labels", []):
+            if label not in exactlabels.keys():
+                exactlabels[label] = categoryindex
+        for pattern in category.get("patterns", []):
+            try:
+                compiled = re.compile(pattern)
+            except re.error as error:
+                print("Label pattern " + pattern + " in category " + category["column"] + " is not a valid regular expression: " + str(error))
+                exit(1)
+            if compiled.groups > 0 or compiled.flags != _plainflags:
+                grouppatterns.append([compiled, categoryindex])
+            else:
+                familypatterns.append("(" + pattern + ")")
+                familycategories.append(categoryindex)
+
+    # one alternation for all families--the first alternative that matches
+    # belongs to the earliest category, because patterns are added in category order
+    if len(familypatterns) > 0:
+        familypattern = re.compile("|".join(familypatterns))
+    else:
+        familypattern = None
+
+    _categories = categories
+    _exactlabels = exactlabels
+    _familypattern = familypattern
+    _familycategories = familycategories
+    _grouppatterns = grouppatterns
+    _labelcache = {}
+    _labelstringcache = {}
+
+def load_taxonomy_file(taxonomyfile: str) -> None:
+    with open(taxonomyfile, 'r') as fh_taxonomy:
+        set_taxonomy(json.load(fh_taxonomy))
+
+def taxonomy_columns() -> list:
+    return [category["column"] for category in _categories]
+
+def classify_label(label: str) -> int:
+    # returns the index of the label's category, or -1 for labels in no category
+    if label in _labelcache:
+        return _labelcache[label]
+
+    categoryindex = _exactlabels.get(label, -1)
+    if _familypattern is not None:
+        m = _familypattern.match(label)
+        if m:
+            patternindex = _familycategories[m.lastindex - 1]
+            if categoryindex == -1 or patternindex < categoryindex:
+                categoryindex = patternindex
+    for [compiled, patternindex] in _grouppatterns:
+        if categoryindex != -1 and patternindex >= categoryindex:
+            break
+        if compiled.match(label):
+            categoryindex = patternindex
+            break
+
+    _labelcache[label] = categoryindex
+    return categoryindex
+
+def classify_labels(labels: list) -> dict:
+    categorylabels = [[] for category in _categories]
+    for label in labels:
+        categoryindex = classify_label(label)
+        if categoryindex >= 0:
+            categorylabels[categoryindex].append(label)
+
+    columnvalues = {}
+    for categoryindex in range(len(_categories)):
+        category = _categories[categoryindex]
+        if len(categorylabels[categoryindex]) == 0:
+            columnvalues[category["column"]] = category["default"]
+        elif "value" in category.keys():
+            columnvalues[category["column"]] = category["value"]
+        else:
+            columnvalues[category["column"]] = ",".join(categorylabels[categoryindex])
+
+    return columnvalues
+
+def shared_labels(labelstring: str) -> list:
+    # [labels, labelset, columnvalues] for an issue's ", "-separated labels: a tuple
+    # of the labels, a frozenset of them, and classify_labels() of them. Most issues
+    # share a handful of label combinations, so these are built once per distinct
+    # string and shared by every issue that has it--treat them as read-only.
+    if labelstring in _labelstringcache:
+        return _labelstringcache[labelstring]
+
+    issuelabels = tuple([sys.intern(label) for label in labelstring.split(", ")])
+    columnvalues = dict((column, sys.intern(value)) for (column, value) in classify_labels(issuelabels).items())
+    _labelstringcache[labelstring] = [issuelabels, frozenset(issuelabels), columnvalues]
+    return _labelstringcache[labelstring]
+
+set_taxonomy(defaulttaxonomy)
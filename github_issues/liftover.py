@@ -0,0 +1,192 @@
+import argparse
+
+from github_issues import intervals
+from github_issues import regions
+from github_issues import snapshot
+from github_issues import trace
+
+# Moves issue regions from one assembly version to the next. The aligned blocks
+# of a UCSC chain file (old assembly as target, new as query, the layout of
+# chains made for liftOver) or a PAF file with cg:Z: CIGAR tags (old assembly
+# as query, new as target, e.g. minimap2 -c new.fa old.fa) are loaded into an
+# interval index on the old assembly's chromosomes. Each block is stored as
+# [start, end, [newchrom, anchor, sign]], one-based and closed, where position
+# pos of the block maps to anchor + sign * (pos - start) in the new assembly.
+#
+# Every region is projected through the blocks it overlaps, and gets a status:
+#
+#   lifted - all of it is aligned, to one place in the new assembly
+#   partial - only part of it is aligned, to one place; the new region spans
+#       the aligned parts
+#   split - it aligns to more than one chromosome or strand, or its aligned
+#       parts are spread over much more than its own length
+#   unliftable - none of it is aligned
+
+defaultmaxexpansion = 2.0
+expansionslack = 100
+
+def add_block(blocks: dict, chrom: str, start: int, size: int, newchrom: str, anchor: int, sign: int) -> None:
+    intervals.add_interval(blocks, chrom, start, start + size - 1, [newchrom, anchor, sign])
+
+def read_chain_blocks(chainfile: str, blocks: dict) -> None:
+    # chain coordinates are zero-based; query coordinates on the "-" strand count
+    # from the end of the reverse complement
+    with open(chainfile, 'r') as fh_chain:
+        tpos = qpos = 0
+        header = None
+        for line in fh_chain:
+            fields = line.split()
+            if len(fields) == 0 or fields[0].startswith("#"):
+                continue
+            if fields[0] == "chain":
+                if len(fields) < 12:
+                    print("Can\'t parse chain header " + line.rstrip("\n"))
+                    exit(1)
+                header = fields
+                tpos = int(fields[5])
+                qpos = int(fields[10])
+                continue
+            if header is None:
+                print("Chain file " + chainfile + " has alignment lines before its first chain header")
+                exit(1)
+            size = int(fields[0])
+            if header[9] == "-":
+                add_block(blocks, header[2], tpos + 1, size, header[7], int(header[8]) - qpos, -1)
+            else:
+                add_block(blocks, header[2], tpos + 1, size, header[7], qpos + 1, 1)
+            if len(fields) >= 3:
+                tpos = tpos + size + int(fields[1])
+                qpos = qpos + size + int(fields[2])
+
+def read_paf_blocks(paffile: str, blocks: dict) -> None:
+    with open(paffile, 'r') as fh_paf:
+        for line in fh_paf:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 12:
+                continue
+            cigars = [field[5:] for field in fields[12:] if field.startswith("cg:Z:")]
+            if len(cigars) == 0:
+                print("PAF line for " + fields[0] + " has no cg:Z: CIGAR tag--align with minimap2 -c")
+                exit(1)
+            [qname, qstart, qend, strand, tname, tstart] = [fields[0], int(fields[2]), int(fields[3]), fields[4], fields[5], int(fields[7])]
+            # the query walks forward on the "+" strand and backward from its end on the "-" strand
+            qpos = qstart if strand == "+" else qend
+            tpos = tstart
+            oplength = 0
+            for character in cigars[0]:
+                if character.isdigit():
+                    oplength = oplength * 10 + int(character)
+                    continue
+                if character in "M=X":
+                    if strand == "+":
+                        add_block(blocks, qname, qpos + 1, oplength, tname, tpos + 1, 1)
+                        qpos = qpos + oplength
+                    else:
+                        add_block(blocks, qname, qpos - oplength + 1, oplength, tname, tpos + oplength, -1)
+                        qpos = qpos - oplength
+                    tpos = tpos + oplength
+                elif character == "I":
+                    qpos = qpos + oplength if strand == "+" else qpos - oplength
+                elif character == "D":
+                    tpos = tpos + oplength
+                oplength = 0
+
+def load_alignment_index(alignmentfile: str) -> dict:
+    # interval index of the aligned blocks of a .paf file, or else a chain file
+    blocks = {}
+    if alignmentfile.endswith(".paf"):
+        read_paf_blocks(alignmentfile, blocks)
+    else:
+        read_chain_blocks(alignmentfile, blocks)
+    return intervals.build_interval_index(blocks)
+
+def lift_region(index: dict, region: regions.Region, maxexpansion: float = defaultmaxexpansion) -> list:
+    # [status, new region string or None, note] for one region
+    hits = intervals.overlapping_intervals(index, region.chrom, region.start, region.end)
+    if len(hits) == 0:
+        return ["unliftable", None, "no aligned blocks"]
+
+    # aligned pieces of the region, grouped by new chromosome and strand
+    pieces = {}
+    for [blockstart, blockend, [newchrom, anchor, sign]] in hits:
+        clippedstart = max(region.start, blockstart)
+        clippedend = min(region.end, blockend)
+        newstart = anchor + sign * (clippedstart - blockstart)
+        newend = anchor + sign * (clippedend - blockstart)
+        key = (newchrom, sign)
+        if key not in pieces.keys():
+            pieces[key] = [min(newstart, newend), max(newstart, newend), 0]
+        piece = pieces[key]
+        piece[0] = min(piece[0], newstart, newend)
+        piece[1] = max(piece[1], newstart, newend)
+        piece[2] = piece[2] + clippedend - clippedstart + 1
+
+    if len(pieces) > 1:
+        places = [newchrom + ":" + str(piece[0]) + "-" + str(piece[1]) + ("(-)" if sign < 0 else "") for ((newchrom, sign), piece) in pieces.items()]
+        return ["split", None, "aligned to " + ",".join(places)]
+
+    [(newchrom, sign)] = pieces.keys()
+    [newstart, newend, alignedbases] = pieces[(newchrom, sign)]
+    regionlength = region.end - region.start + 1
+    newregion = newchrom + ":" + str(newstart) + "-" + str(newend)
+    if newend - newstart + 1 > maxexpansion * regionlength + expansionslack:
+        return ["split", None, "aligned parts spread over " + newregion]
+    note = "reverse strand" if sign < 0 else ""
+    if alignedbases < regionlength:
+        return ["partial", newregion, str(alignedbases) + " of " + str(regionlength) + " bases aligned" + (", " + note if note != "" else "")]
+    return ["lifted", newregion, note]
+
+def lift_regions(index: dict, regionstrings: list, maxexpansion: float = defaultmaxexpansion) -> dict:
+    # region string -> [status, new region string or None, note]
+    lifted = {}
+    for regionstring in regionstrings:
+        region = regions.parse_region(regionstring)
+        if region is None:
+            lifted[regionstring] = ["unliftable", None, "unparsable region"]
+        else:
+            lifted[regionstring] = lift_region(index, region, maxexpansion)
+    return lifted
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION] ALIGNMENTFILE",
+        description="Lift the regions of open github issues to a new assembly version with a chain or PAF alignment"
+    )
+    parser.add_argument(
+        "-v", "--version", action="version",
+        version = f"{parser.prog} version 1.0.0"
+    )
+    parser.add_argument('alignmentfile', type=str, metavar='ALIGNMENTFILE', help='.chain file (old assembly as target) or .paf file with CIGARs (old assembly as query)')
+    parser.add_argument('-s', '--source', type=str, metavar='directory of checkout of source github repository', required=True)
+    parser.add_argument('-a', '--assembly', type=str, default=None, help='only lift issues with this assembly version', required=False)
+    parser.add_argument('-x', '--max-expansion', type=float, default=defaultmaxexpansion, help='call a region split when its aligned parts spread over more than this many times its length', required=False)
+    parser.add_argument('-n', '--nosync', action='store_true', help='use the local snapshot of the issues as it is, without asking github for updates')
+    trace.add_arguments(parser)
+
+    return parser
+
+def main(argv: list = None) -> None:
+    parser = init_argparse()
+    args = parser.parse_args(argv)
+
+    checkoutdir = args.source
+    trace.start_from_args(args)
+    with trace.span("load alignment"):
+        index = load_alignment_index(args.alignmentfile)
+    if not args.nosync:
+        with trace.span("sync snapshot"):
+            snapshot.sync_issues(checkoutdir)
+    issues = [issue for issue in snapshot.iterate_issues(checkoutdir) if args.assembly is None or issue["assembly"] == args.assembly]
+    with trace.span("lift regions"):
+        lifted = lift_regions(index, [issue["region"] for issue in issues], args.max_expansion)
+
+    counts = {"lifted":0, "partial":0, "split":0, "unliftable":0}
+    print("IssueID\tAssembly\tRegion\tStatus\tNewRegion\tNote")
+    for issue in issues:
+        [status, newregion, note] = lifted[issue["region"]]
+        counts[status] = counts[status] + 1
+        print(issue["issueid"] + "\t" + issue["assembly"] + "\t" + issue["region"] + "\t" + status + "\t" + (newregion or "") + "\t" + note)
+    print("# " + ", ".join([str(counts[status]) + " " + status for status in counts.keys()]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import time
+import threading
+
+from github_issues import trace
+
+# Adaptive token-bucket limiter shared by threads that send content-creating
+# requests to github. The rate grows additively after each successful request
+# (up to maxrate) and is halved whenever github signals a secondary rate limit,
+# at which point all requests also pause for the Retry-After time (or
+# defaultpause seconds when github doesn't say). X-RateLimit-Remaining and
+# X-RateLimit-Reset values, when a backend can see them, cap the rate so the
+# remaining quota is spread out until the reset time.
+defaultpause = 60
+
+class RateLimited(Exception):
+    def __init__(self, message: str, retryafter: float = None):
+        super().__init__(message)
+        self.retryafter = retryafter
+
+class TokenBucket:
+    def __init__(self, rate: float, maxrate: float, capacity: int = 1):
+        # rates are in requests per second
+        self.rate = min(rate, maxrate)
+        self.maxrate = maxrate
+        self.minrate = self.rate / 8
+        self.increase = maxrate / 10
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.pauseuntil = 0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        # blocks until a request may be sent, and returns the time spent waiting
+        waited = 0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.pauseuntil and self.tokens >= 1:
+                    self.tokens = self.tokens - 1
+                    return waited
+                waittime = max(self.pauseuntil - now, (1 - self.tokens) / self.rate)
+            trace.sleep(waittime, "rate limiter wait")
+            waited = waited + waittime
+
+    def succeeded(self) -> None:
+        with self.lock:
+            self.rate = min(self.maxrate, self.rate + self.increase)
+
+    def throttled(self, retryafter: float = None) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self.rate = max(self.minrate, self.rate / 2)
+            if retryafter is None:
+                retryafter = defaultpause
+            self.pauseuntil = max(self.pauseuntil, now + retryafter)
+            self.tokens = 0
+            self.updated = now
+
+    def observe_ratelimit(self, remaining: int, resettime: float) -> None:
+        # resettime is in seconds since the epoch, as in X-RateLimit-Reset
+        with self.lock:
+            now = time.monotonic()
+            untilreset = max(resettime - time.time(), 1)
+            if remaining <= 0:
+                self.pauseuntil = max(self.pauseuntil, now + untilreset)
+                self.tokens = 0
+                self.updated = now
+            else:
+                self.rate = min(self.rate, max(self.minrate, remaining / untilreset))
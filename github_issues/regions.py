@@ -0,0 +1,89 @@
+import re
+import functools
+
+# Assembly regions ("chr14_MATERNAL:81767103-81767104", one-based and closed),
+# parsed once and kept with an integer sort key. Regions sort by chromosome
+# the way the old zero-padded region strings did--chrX, chrY, chrM and chrEBV
+# after the numbered chromosomes--then by start and end, but the key is a
+# single int, so sorting and comparing regions never touches the strings.
+#
+# Chromosome names of up to chromosomenamelength characters sort exactly as
+# they did; longer names sort after all of those (and among themselves by
+# length, then alphabetically), where the padded strings mixed the start
+# coordinate into the comparison.
+#
+# parse_region() keeps recently parsed regions in a bounded cache, since the
+# same region strings are parsed over and over when issues are sorted and
+# compared. Strings that won't come up again, like a query service's
+# client-supplied regions, can go through make_region() instead.
+
+regionpattern = re.compile(r"(\S+):(\d+)\-(\d+)")
+chromosomerenames = [["chrX", "chr23"], ["chrY", "chr24"], ["chrM", "chr25_MATERNAL"], ["chrEBV", "chr26_PATERNAL"]]
+positionbits = 48
+chromosomenamelength = 50
+chromosomecachesize = 4096
+regioncachesize = 65536
+
+class Region:
+    __slots__ = ("string", "chrom", "start", "end", "sortkey")
+
+    def __init__(self, chrom: str, start: int, end: int, string: str = None):
+        self.chrom = chrom
+        self.start = start
+        self.end = end
+        if string is None:
+            string = chrom + ":" + str(start) + "-" + str(end)
+        self.string = string
+        self.sortkey = (chromosome_rank(chrom) << (2 * positionbits)) | (start << positionbits) | end
+
+    def __str__(self) -> str:
+        return self.string
+
+    def __repr__(self) -> str:
+        return "Region(" + repr(self.string) + ")"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Region) and self.sortkey == other.sortkey and self.chrom == other.chrom
+
+    def __hash__(self) -> int:
+        return hash(self.sortkey)
+
+    def __lt__(self, other) -> bool:
+        return self.sortkey < other.sortkey
+
+    def __le__(self, other) -> bool:
+        return self.sortkey <= other.sortkey
+
+    def __gt__(self, other) -> bool:
+        return self.sortkey > other.sortkey
+
+    def __ge__(self, other) -> bool:
+        return self.sortkey >= other.sortkey
+
+    def overlaps(self, other) -> bool:
+        return self.chrom == other.chrom and self.start <= other.end and other.start <= self.end
+
+    def bed_fields(self) -> list:
+        # chrom, zero-based start and end as strings, for BED output
+        return [self.chrom, str(self.start - 1), str(self.end)]
+
+@functools.lru_cache(maxsize=chromosomecachesize)
+def chromosome_rank(chrom: str) -> int:
+    for [name, replacement] in chromosomerenames:
+        chrom = chrom.replace(name, replacement)
+    return int.from_bytes(chrom.zfill(chromosomenamelength).encode(), "big")
+
+def make_region(regionstring: str) -> Region:
+    # returns None for strings that don't start with a chrom:start-end region
+    m = regionpattern.match(regionstring)
+    if not m:
+        return None
+    return Region(m.group(1), int(m.group(2)), int(m.group(3)), regionstring)
+
+@functools.lru_cache(maxsize=regioncachesize)
+def parse_region(regionstring: str) -> Region:
+    return make_region(regionstring)
+
+def sort_key(regionstring: str) -> int:
+    # sort key for region strings, for sorting lists of strings in region order
+    return parse_region(regionstring).sortkey
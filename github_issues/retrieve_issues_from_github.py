@@ -1,11 +1,9 @@
-import subprocess
 import sys
-import os
-import re
-import time
 import argparse
 
-from github_issues import callhub
+from github_issues import snapshot
+from github_issues import regions
+from github_issues import trace
 
 # defaults
 defaultassemblyversion = "v1.0"
@@ -13,37 +11,49 @@ defaultassemblyversion = "v1.0"
 def retrieve_issues(checkoutdir: str, assembly: str, labels: str) -> None:
 
     regiondict = {}
-    currentissues = callhub.retrieve_all_issues(checkoutdir)
-    for issue in currentissues:
+    for issue in snapshot.iterate_issues(checkoutdir):
         skip = False
         #print("Desired labels: " + labels)
         issuelabels = issue["labels"]
         for label in labels.split(","):
-            if label not in issuelabels:
+            if label != "" and label not in issuelabels:
                 skip = True
 
         if not skip:
             issuename = issue["name"]
             issueid = issue["issueid"]
             issueregion = issue["region"]
-            m = re.match(r"(\S+):(\d+)\-(\d+)", issueregion)
-            if not m:
+            if regions.parse_region(issueregion) is None:
                 print("Can\'t parse existing issue region: " + issueregion)
                 continue
             else:
-                regiondict[issueregion] = {"issuename":issuename, "issueid":issueid}
+                regiondict[issueregion] = {"issuename":issuename, "issueid":issueid, "assembly":issue["assembly"]}
 
     return regiondict
 
-def padded_region(regionstring: str):
-    m = re.search(r'(\S+)\:(\d+)\-(\d+)', regionstring)
-    [chrom, start, end] = m.groups()
-    chrom = chrom.replace("chrX", "chr23")
-    chrom = chrom.replace("chrY", "chr24")
-    chrom = chrom.replace("chrM", "chr25_MATERNAL")
-    chrom = chrom.replace("chrEBV", "chr26_PATERNAL")
+def lift_region_dict(regiondict: dict, alignmentfile: str, fromassembly: str, toassembly: str) -> dict:
+    # the issues keyed by their regions in the new assembly: issues on fromassembly are lifted,
+    # issues already on toassembly are kept as they are, and split, unliftable and other
+    # assemblies' issues are left out
+    from github_issues import liftover
+    liftregions = [region for region in regiondict.keys() if regiondict[region]["assembly"] == fromassembly]
+    lifted = liftover.lift_regions(liftover.load_alignment_index(alignmentfile), liftregions)
+    liftedregiondict = {}
+    for region in regiondict.keys():
+        issueassembly = regiondict[region]["assembly"]
+        if issueassembly == toassembly:
+            liftedregiondict[region] = regiondict[region]
+            continue
+        if issueassembly != fromassembly:
+            print("Leaving out issue " + regiondict[region]["issueid"] + " on assembly " + issueassembly + " (neither " + fromassembly + " nor " + toassembly + ")", file=sys.stderr)
+            continue
+        [status, newregion, note] = lifted[region]
+        if newregion is None:
+            print("Can\'t lift issue " + regiondict[region]["issueid"] + " region " + region + " (" + status + ": " + note + ")", file=sys.stderr)
+            continue
+        liftedregiondict[newregion] = regiondict[region]
 
-    return chrom.zfill(50) + start.zfill(12) + end.zfill(12)
+    return liftedregiondict
 
 def init_argparse() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
@@ -57,26 +67,39 @@ def init_argparse() -> argparse.ArgumentParser:
     parser.add_argument('-s', '--source', type=str, metavar='directory of checkout of source github repository', required=True)
     parser.add_argument('-a', '--assembly', type=str, default=defaultassemblyversion, metavar='assembly version', required=False)
     parser.add_argument('-l', '--labels', type=str, default="", help='required labels, comma-delimited, to filter issues', required=False)
+    parser.add_argument('-c', '--liftover', type=str, default=None, help='chain or PAF alignment to lift issue regions on the --liftover-from assembly to the --assembly version with (see liftover.py)', required=False)
+    parser.add_argument('--liftover-from', type=str, default=None, help='assembly version the --liftover alignment lifts from', required=False)
+    parser.add_argument('-n', '--nosync', action='store_true', help='use the local snapshot of the issues as it is, without asking github for updates')
+    trace.add_arguments(parser)
 
     return parser
 
-def main() -> None:
+def main(argv: list = None) -> None:
     parser = init_argparse()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
  
     checkoutdir = args.source
+    if args.liftover is not None and args.liftover_from is None:
+        print("Give the assembly version the --liftover alignment lifts from with --liftover-from")
+        exit(1)
+    trace.start_from_args(args)
+    if not args.nosync:
+        with trace.span("sync snapshot"):
+            snapshot.sync_issues(checkoutdir)
     version = args.assembly
-    labels = args.labels
+    requiredlabels = args.labels
 
-    region_dict = retrieve_issues(checkoutdir, version, labels) 
+    with trace.span("read issues"):
+        region_dict = retrieve_issues(checkoutdir, version, requiredlabels) 
+    if args.liftover is not None:
+        with trace.span("lift regions"):
+            region_dict = lift_region_dict(region_dict, args.liftover, args.liftover_from, version)
     region_keys = list(region_dict.keys())
 
-    region_keys.sort(key=padded_region)
+    region_keys.sort(key=regions.sort_key)
 
     for region in region_keys:
-        m = re.search(r'(\S+)\:(\d+)\-(\d+)', region)
-        [chrom, start, end] = m.groups()
-        start = str(int(start) - 1)
+        [chrom, start, end] = regions.parse_region(region).bed_fields()
         issuename = region_dict[region]["issuename"]
         issueid = region_dict[region]["issueid"]
         print(chrom + "\t" + start + "\t" + end + "\t" + issuename + "\t1000\t+\t" + start + "\t" + end + "\t0,0,100\t" + issuename + "\t" + "<a href=\"https://github.com/marbl/HG002-issues/issues/" + issueid + "\">https://github.com/marbl/HG002-issues/issues/" + issueid + "</a>" )
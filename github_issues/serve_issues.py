@@ -0,0 +1,222 @@
+import json
+import time
+import argparse
+import threading
+import urllib.parse
+import http.server
+
+from github_issues import intervals
+from github_issues import labels
+from github_issues import regions
+from github_issues import snapshot
+from github_issues import trace
+
+# A long-running local HTTP service answering "which issues overlap this
+# region?" and "which issues are nearest to it?" from per-chromosome interval
+# indexes of the parsed issues, so genome browser and review tools don't have
+# to rebuild a BED of every issue for each question. Issues of every state are
+# loaded from the snapshot once; a background thread then syncs the snapshot
+# every --refresh seconds, re-parses only the issues github reports as
+# updated, drops the ones that are gone (transferred or deleted), and swaps in
+# a rebuilt index.
+#
+#   GET /overlap?region=chr1_MATERNAL:1000-2000
+#   GET /nearest?region=chr1_MATERNAL:1000-2000&count=5
+#   GET /issues/123
+#   GET /status
+#
+# /overlap and /nearest take labels=a,b (only issues with all of them) and
+# state=open|closed|all (default open). Responses are JSON: issues are
+# objects with the fields of callhub.parse_issue_fields (plus "distance" for
+# /nearest), listed in region order.
+
+defaultport = 8150
+defaultrefresh = 300
+
+class IssueIndex:
+
+    def __init__(self, checkoutdir: str):
+        self.checkoutdir = checkoutdir
+        self.issues = {}
+        self.index = {}
+        self.watermark = None
+        self.refreshed = None
+        self.updatelock = threading.Lock()
+
+    def load(self) -> None:
+        with trace.span("sync snapshot"):
+            snapshot.sync_issues(self.checkoutdir)
+        self.watermark = snapshot.read_watermark(self.checkoutdir)
+        issues = {}
+        for issue in snapshot.iterate_issues(self.checkoutdir, state="all"):
+            issues[issue["issueid"]] = issue
+        self.swap(issues)
+
+    def refresh(self) -> int:
+        # syncs the snapshot and re-reads the issues updated since the last refresh
+        with self.updatelock:
+            watermark = snapshot.read_watermark(self.checkoutdir)
+            with trace.span("sync snapshot"):
+                numfetched = snapshot.sync_issues(self.checkoutdir)
+            # the watermark is inclusive, so the newest issues come back on every sync--only
+            # rebuild the index when something actually changed
+            changed = []
+            if numfetched > 0:
+                for issue in snapshot.iterate_issues(self.checkoutdir, state="all", since=watermark):
+                    current = self.issues.get(issue["issueid"])
+                    if current is None or current.to_dict() != issue.to_dict():
+                        changed.append(issue)
+            # issues transferred or deleted on github are dropped from the snapshot by the sync
+            snapshotids = snapshot.issue_ids(self.checkoutdir)
+            removed = [issueid for issueid in self.issues.keys() if issueid not in snapshotids]
+            if len(changed) == 0 and len(removed) == 0:
+                self.refreshed = time.time()
+                return 0
+            issues = dict(self.issues)
+            for issueid in removed:
+                del issues[issueid]
+            for issue in changed:
+                issues[issue["issueid"]] = issue
+            self.watermark = snapshot.read_watermark(self.checkoutdir)
+            self.swap(issues)
+            return len(changed) + len(removed)
+
+    def swap(self, issues: dict) -> None:
+        # queries in flight keep the index they started with
+        issueintervals = {}
+        for issue in issues.values():
+            region = regions.parse_region(issue["region"])
+            if region is not None:
+                intervals.add_interval(issueintervals, region.chrom, region.start, region.end, issue)
+        [self.issues, self.index] = [issues, intervals.build_interval_index(issueintervals)]
+        self.refreshed = time.time()
+
+    def overlapping(self, region: regions.Region, accept) -> list:
+        return [hit[2] for hit in intervals.overlapping_intervals(self.index, region.chrom, region.start, region.end) if accept(hit[2])]
+
+    def nearest(self, region: regions.Region, count: int, accept) -> list:
+        return [[hit[2], hit[3]] for hit in intervals.nearest_intervals(self.index, region.chrom, region.start, region.end, count, accept)]
+
+def refresh_periodically(issueindex: IssueIndex, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            numfetched = issueindex.refresh()
+        except Exception as error:
+            # a failed sync (network trouble, rate limiting) just waits for the next round
+            print("Refresh failed: " + str(error), flush=True)
+            continue
+        if numfetched > 0:
+            print("Refreshed " + str(numfetched) + " updated or removed issues", flush=True)
+
+def issue_filter(query: dict):
+    requiredlabels = [label for label in query.get("labels", [""])[0].split(",") if label != ""]
+    state = query.get("state", ["open"])[0]
+    def accept(issue) -> bool:
+        if state != "all" and issue["status"] != state:
+            return False
+        for label in requiredlabels:
+            if label not in issue.labelset:
+                return False
+        return True
+    return accept
+
+class QueryHandler(http.server.BaseHTTPRequestHandler):
+    issueindex = None
+
+    def send_json(self, status: int, response) -> None:
+        body = json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        issueindex = self.issueindex
+
+        if url.path == "/status":
+            self.send_json(200, {"issues":len(issueindex.issues), "watermark":issueindex.watermark, "refreshed":issueindex.refreshed})
+            return
+        if url.path.startswith("/issues/"):
+            issue = issueindex.issues.get(url.path[len("/issues/"):])
+            if issue is None:
+                self.send_json(404, {"error":"no issue " + url.path[len("/issues/"):]})
+            else:
+                self.send_json(200, issue.to_dict())
+            return
+        if url.path not in ["/overlap", "/nearest"]:
+            self.send_json(404, {"error":"unknown path " + url.path + "--use /overlap, /nearest, /issues/ID or /status"})
+            return
+
+        # client regions are parsed without parse_region's cache, which would keep every one of them
+        region = regions.make_region(query.get("region", [""])[0].replace(",", ""))
+        if region is None:
+            self.send_json(400, {"error":"give a region=CHROM:START-END"})
+            return
+        if region.start > region.end:
+            self.send_json(400, {"error":"region start " + str(region.start) + " is after its end " + str(region.end)})
+            return
+        accept = issue_filter(query)
+        if url.path == "/overlap":
+            self.send_json(200, [issue.to_dict() for issue in issueindex.overlapping(region, accept)])
+            return
+        count = query.get("count", ["1"])[0]
+        if not count.isdigit():
+            self.send_json(400, {"error":"count must be a number"})
+            return
+        nearest = []
+        for [issue, distance] in issueindex.nearest(region, int(count), accept):
+            issuedict = issue.to_dict()
+            issuedict["distance"] = distance
+            nearest.append(issuedict)
+        self.send_json(200, nearest)
+
+    def log_message(self, format: str, *args) -> None:
+        # one line per request is too much for a service answering browser tracks
+        pass
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION] ...",
+        description="Answer region overlap and nearest-issue queries over HTTP from an in-memory index of a repository's issues"
+    )
+    parser.add_argument(
+        "-v", "--version", action="version",
+        version = f"{parser.prog} version 1.0.0"
+    )
+    parser.add_argument('-s', '--source', type=str, metavar='directory of checkout of source github repository', required=True)
+    parser.add_argument('-p', '--port', type=int, default=defaultport, help='port to listen on (default ' + str(defaultport) + ')', required=False)
+    parser.add_argument('-b', '--bind', type=str, default="127.0.0.1", help='address to listen on (default 127.0.0.1)', required=False)
+    parser.add_argument('-r', '--refresh', type=float, default=defaultrefresh, help='seconds between syncs with github (default ' + str(defaultrefresh) + ', 0 for never)', required=False)
+    parser.add_argument('-t', '--taxonomy', type=str, default=None, help='JSON file of label categories to use in place of the default taxonomy', required=False)
+    trace.add_arguments(parser)
+
+    return parser
+
+def main(argv: list = None) -> None:
+    parser = init_argparse()
+    args = parser.parse_args(argv)
+
+    trace.start_from_args(args)
+    if args.taxonomy is not None:
+        labels.load_taxonomy_file(args.taxonomy)
+    issueindex = IssueIndex(args.source)
+    with trace.span("load issues"):
+        issueindex.load()
+    if args.refresh > 0:
+        threading.Thread(target=refresh_periodically, args=(issueindex, args.refresh), daemon=True).start()
+
+    QueryHandler.issueindex = issueindex
+    server = http.server.ThreadingHTTPServer((args.bind, args.port), QueryHandler)
+    print("Serving " + str(len(issueindex.issues)) + " issues on http://" + args.bind + ":" + str(server.server_address[1]), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import re
+
+# Works out what has to change in a worksheet to match the github issues
+# routed to it (see sheetsync.py). The sheet's header row is mapped to issue
+# fields once, the sheet rows are indexed by issue id in the same single pass
+# that compares them, and the result is a Changeset that can be printed (for
+# --dryrun) before any of it is written.
+
+urlidpattern = re.compile(r'.*/(\d+)')
+
+class Changeset:
+    __slots__ = ("updates", "inserts", "orphans", "appendnew")
+
+    def __init__(self, appendnew: bool):
+        # updates: [rowid, colid, issueid, header, sheet value, github value], one-based rows and columns
+        # inserts: [issueid, row values] for issues missing from the sheet
+        # orphans: [rowid, issueid] for sheet rows with no matching issue
+        self.updates = []
+        self.inserts = []
+        self.orphans = []
+        self.appendnew = appendnew
+
+    def cell_updates(self) -> list:
+        return [[update[0], update[1], update[5]] for update in self.updates]
+
+    def new_rows(self) -> list:
+        # issues missing from the sheet are only added to sheets configured to append them
+        if not self.appendnew:
+            return []
+        return [insert[1] for insert in self.inserts]
+
+    def print_changes(self) -> None:
+        for [rowid, colid, issueid, header, sheetvalue, githubvalue] in self.updates:
+            print("Issue " + issueid + " has the wrong " + header + " values " + githubvalue + "/" + sheetvalue)
+        for [issueid, rowvalues] in self.inserts:
+            if self.appendnew:
+                print("Issue " + issueid + " will be added to the spreadsheet")
+            else:
+                print("Issue " + issueid + " not in spreadsheet!")
+        for [rowid, issueid] in self.orphans:
+            print("Row " + str(rowid) + " (issue " + issueid + ") has no matching issue")
+
+    def summary(self) -> str:
+        return str(len(self.updates)) + " cell updates, " + str(len(self.inserts)) + " issues missing from the sheet" + ("" if self.appendnew else " (not added)") + ", " + str(len(self.orphans)) + " orphaned rows"
+
+def column_positions(headers: list, gsheet_columns: dict) -> list:
+    # [zero-based index, header, issue field] for each header row column that maps to an issue field
+    return [[colindex, headers[colindex], gsheet_columns[headers[colindex]]] for colindex in range(len(headers)) if headers[colindex] in gsheet_columns.keys()]
+
+def row_issueid(row: list, idindex: int, urlindex: int) -> str:
+    # returns the issue id for a sheet row, or None if it can't be found
+    issueid = row[idindex] if idindex is not None and idindex < len(row) else ""
+    if urlindex is not None:
+        url = row[urlindex] if urlindex < len(row) else ""
+        idmatch = urlidpattern.search(url)
+        if idmatch is None:
+            print("Couldn\'t parse " + url)
+            return None
+        if issueid != idmatch.group(1):
+            print("Column A " + issueid + " is not equal to URL derived " + idmatch.group(1))
+        issueid = idmatch.group(1)
+    return issueid if issueid != "" else None
+
+def diff_sheet(values: list, sheetconfig: dict, github_issues: dict) -> Changeset:
+    # values is the whole worksheet, header row first, as strings (gspread's get_all_values())
+    changeset = Changeset(sheetconfig.get("appendnew", False))
+    if len(values) == 0:
+        print("Sheet " + sheetconfig["name"] + " has no header row")
+        return changeset
+    headers = values[0]
+    positions = column_positions(headers, sheetconfig["columns"])
+    headerindex = dict((headers[colindex], colindex) for colindex in range(len(headers)))
+    idindex = headerindex.get(sheetconfig["idcolumn"])
+    urlindex = headerindex.get(sheetconfig["urlcolumn"]) if "urlcolumn" in sheetconfig.keys() else None
+
+    # issue id -> row, built while the rows are compared
+    rowindex = {}
+    for rowoffset in range(1, len(values)):
+        row = values[rowoffset]
+        rowid = rowoffset + 1
+        issueid = row_issueid(row, idindex, urlindex)
+        if issueid is None:
+            continue
+        if issueid in rowindex.keys():
+            print("Issue " + issueid + " is in rows " + str(rowindex[issueid]) + " and " + str(rowid))
+            continue
+        rowindex[issueid] = rowid
+
+        issue = github_issues.get(issueid)
+        if issue is None:
+            changeset.orphans.append([rowid, issueid])
+            continue
+        for [colindex, header, field] in positions:
+            githubvalue = str(issue[field])
+            sheetvalue = row[colindex] if colindex < len(row) else ""
+            if githubvalue != sheetvalue:
+                changeset.updates.append([rowid, colindex + 1, issueid, header, sheetvalue, githubvalue])
+
+    for issueid in sorted(github_issues.keys(), key=int):
+        if issueid in rowindex.keys():
+            continue
+        issue = github_issues[issueid]
+        rowvalues = [''] * len(headers)
+        for [colindex, header, field] in positions:
+            rowvalues[colindex] = issue[field]
+        changeset.inserts.append([issueid, rowvalues])
+
+    return changeset
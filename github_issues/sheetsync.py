@@ -0,0 +1,158 @@
+import re
+import json
+import argparse
+import gspread
+
+from github_issues import gsheet
+from github_issues import labels
+from github_issues import sheetdiff
+from github_issues import snapshot
+from github_issues import trace
+
+# Brings any number of Google sheets up to date from one read of the issues.
+# Each sheet is described by a dict with:
+#
+#   name - short name used on the command line
+#   spreadsheet, worksheet - titles to open
+#   filter - {"column": issue field, "pattern": regular expression matched
+#       from the start of the field}; only matching issues belong in the sheet
+#   columns - sheet header -> issue field, like the old gsheet_columns
+#   idcolumn - header of the column holding the issue id
+#   urlcolumn - (optional) header of a column holding the issue URL, to take
+#       the issue id from instead, checking it against idcolumn
+#   appendnew - whether to add rows for issues missing from the sheet (if
+#       false, they are only reported)
+#
+# A JSON file with a "sheets" list of these can be given in place of the
+# default sheets below. Issues are read from the snapshot once and routed to
+# every sheet whose filter they match in the same pass, and the service
+# account is authenticated once for all the sheets.
+
+defaultsheets = [
+    {"name":"coverage",
+     "spreadsheet":"HG002 Coverage Polishing Issues",
+     "worksheet":"Sheet1",
+     "filter":{"column":"programs", "pattern":".*coverage_pri.*"},
+     "columns":{'IssueID':'issueid', 'GithubURL':'url', 'Curator':'assignedto', 'Region':'region', 'Name':'name', 'EvidenceTags':'evidence', 'Status':'status',
+                'Coverage':'coverage', 'Centromere':'centromere', 'Content':'content', 'Errors':'errors', 'Clipped':'clipped', 'FlaggedBy':'programs', 'Diagnosis':'diagnosis'},
+     "idcolumn":"IssueID",
+     "urlcolumn":"GithubURL",
+     "appendnew":False},
+    {"name":"phaseswitch",
+     "spreadsheet":"HG002 Phase Switch Polishing Issues",
+     "worksheet":"Sheet1",
+     "filter":{"column":"programs", "pattern":".*phase_switch.*"},
+     "columns":{'IssueID':'issueid', 'GithubURL':'url', 'Curator':'assignedto', 'Region':'region', 'Name':'name', 'EvidenceTags':'evidence', 'Status':'status',
+                'Centromere':'centromere', 'FlaggedBy':'programs', 'Diagnosis':'diagnosis'},
+     "idcolumn":"IssueID",
+     "appendnew":True}
+]
+
+def load_sheet_config(configfile: str) -> list:
+    with open(configfile, 'r') as fh_config:
+        config = json.load(fh_config)
+    if "sheets" not in config.keys() or len(config["sheets"]) == 0:
+        print("Sheet configuration " + configfile + " has no sheets")
+        exit(1)
+    for sheetconfig in config["sheets"]:
+        for key in ["name", "spreadsheet", "worksheet", "columns", "idcolumn"]:
+            if key not in sheetconfig.keys():
+                print("Sheet configuration " + configfile + " is missing " + key + " for sheet " + sheetconfig.get("name", "(unnamed)"))
+                exit(1)
+    return config["sheets"]
+
+def select_sheets(sheetconfigs: list, names: list) -> list:
+    selected = []
+    for name in names:
+        matches = [sheetconfig for sheetconfig in sheetconfigs if sheetconfig["name"] == name]
+        if len(matches) == 0:
+            print("No sheet named " + name + "--choose from " + ",".join([sheetconfig["name"] for sheetconfig in sheetconfigs]))
+            exit(1)
+        selected.extend(matches)
+    return selected
+
+def route_issues(issues, sheetconfigs: list) -> list:
+    # one dict of issueid -> issue per sheet, filled in a single pass over the issues
+    filters = []
+    for sheetconfig in sheetconfigs:
+        if "filter" in sheetconfig.keys():
+            filters.append([sheetconfig["filter"]["column"], re.compile(sheetconfig["filter"]["pattern"])])
+        else:
+            filters.append(None)
+
+    sheetissues = [{} for sheetconfig in sheetconfigs]
+    for issue in issues:
+        for sheetindex in range(len(sheetconfigs)):
+            sheetfilter = filters[sheetindex]
+            if sheetfilter is None or sheetfilter[1].match(str(issue[sheetfilter[0]])):
+                sheetissues[sheetindex][issue["issueid"]] = issue
+
+    return sheetissues
+
+def sync_sheets(checkoutdir: str, sheetconfigs: list, dryrun: bool = False) -> None:
+    with trace.span("sync snapshot"):
+        snapshot.sync_issues(checkoutdir)
+    with trace.span("read issues"):
+        sheetissues = route_issues(snapshot.iterate_issues(checkoutdir), sheetconfigs)
+
+    with trace.span("open sheets", "sheets"):
+        sa = gspread.service_account()
+        spreadsheets = {}
+        worksheets = []
+        for sheetconfig in sheetconfigs:
+            if sheetconfig["spreadsheet"] not in spreadsheets.keys():
+                spreadsheets[sheetconfig["spreadsheet"]] = sa.open(sheetconfig["spreadsheet"])
+            worksheets.append(spreadsheets[sheetconfig["spreadsheet"]].worksheet(sheetconfig["worksheet"]))
+
+    for sheetindex in range(len(sheetconfigs)):
+        sheetconfig = sheetconfigs[sheetindex]
+        print("Updating sheet " + sheetconfig["name"] + " with " + str(len(sheetissues[sheetindex])) + " issues")
+        with trace.span("update sheet " + sheetconfig["name"]):
+            values = gsheet.call_with_backoff(worksheets[sheetindex].get_all_values)
+            changeset = sheetdiff.diff_sheet(values, sheetconfig, sheetissues[sheetindex])
+            changeset.print_changes()
+            print("Sheet " + sheetconfig["name"] + ": " + changeset.summary())
+            if not dryrun:
+                gsheet.apply_sheet_changes(worksheets[sheetindex], changeset.cell_updates(), changeset.new_rows())
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    # options shared by this script and the single-sheet updaters
+    parser.add_argument('-s', '--source', type=str, metavar='directory of checkout of source github repository', required=True)
+    parser.add_argument('-t', '--taxonomy', type=str, default=None, help='JSON file of label categories to use in place of the default taxonomy', required=False)
+    parser.add_argument('-d', '--dryrun', '--dry-run', action='store_true', help='just print the changes each sheet needs--dont write them')
+    trace.add_arguments(parser)
+
+def run(args, sheetconfigs: list) -> None:
+    trace.start_from_args(args)
+    if args.taxonomy is not None:
+        labels.load_taxonomy_file(args.taxonomy)
+    sync_sheets(args.source, sheetconfigs, args.dryrun)
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION] ...",
+        description="Update all of a repository's google spreadsheets from one read of its issues"
+    )
+    parser.add_argument(
+        "-v", "--version", action="version",
+        version = f"{parser.prog} version 1.0.0"
+    )
+    parser.add_argument('-c', '--config', type=str, default=None, help='JSON file listing the sheets to update, in place of the default coverage and phase switch sheets', required=False)
+    parser.add_argument('-n', '--names', type=str, default=None, help='comma-delimited names of the sheets to update (default all)', required=False)
+    add_arguments(parser)
+
+    return parser
+
+def main(argv: list = None) -> None:
+    parser = init_argparse()
+    args = parser.parse_args(argv)
+
+    sheetconfigs = defaultsheets
+    if args.config is not None:
+        sheetconfigs = load_sheet_config(args.config)
+    if args.names is not None:
+        sheetconfigs = select_sheets(sheetconfigs, args.names.split(","))
+    run(args, sheetconfigs)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import datetime
+import argparse
+
+from github_issues import callhub
+from github_issues import trace
+
+# Local snapshot of a repository's issues, kept in an SQLite file in the
+# checkout directory. Each sync only asks github for issues updated since the
+# newest update time already stored (the watermark), and the scripts read
+# their issues from the snapshot instead of downloading the whole repository.
+# Since transferred and deleted issues never show up as updated, each sync
+# also lists the numbers of the open issues and drops open issues that are
+# gone.
+snapshotfilename = ".github_issues.sqlite"
+
+def snapshot_path(checkoutdir: str) -> str:
+    return os.path.join(checkoutdir, snapshotfilename)
+
+def open_snapshot(checkoutdir: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(snapshot_path(checkoutdir))
+    connection.execute("CREATE TABLE IF NOT EXISTS issues (issueid INTEGER PRIMARY KEY, url TEXT, status TEXT, name TEXT, labels TEXT, assignees TEXT, body TEXT, updated TEXT)")
+    connection.execute("CREATE TABLE IF NOT EXISTS syncstate (key TEXT PRIMARY KEY, value TEXT)")
+    return connection
+
+def read_syncstate(connection: sqlite3.Connection, key: str):
+    row = connection.execute("SELECT value FROM syncstate WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    return row[0]
+
+def write_syncstate(connection: sqlite3.Connection, key: str, value: str) -> None:
+    connection.execute("INSERT OR REPLACE INTO syncstate (key, value) VALUES (?, ?)", (key, value))
+
+def sync_issues(checkoutdir: str, fullsync: bool = False) -> int:
+    # a listing that fails part way (backends.ListingFailed, ratelimit.RateLimited) is
+    # rolled back--the deletion of a full sync included--and the watermark is left
+    # where it was, so the next sync asks for the same issues again
+    connection = open_snapshot(checkoutdir)
+    watermark = None
+    if not fullsync:
+        watermark = read_syncstate(connection, "watermark")
+
+    # the watermark is inclusive, so issues updated at exactly that time are fetched again and replaced
+    numfetched = 0
+    newwatermark = watermark
+    try:
+        with connection:
+            if watermark is None:
+                # a full sync also drops issues that have since been transferred or deleted
+                connection.execute("DELETE FROM issues")
+            for issuefields in callhub.iterate_issue_records(checkoutdir, state="all", since=watermark):
+                if len(issuefields) < 8:
+                    continue
+                connection.execute("INSERT OR REPLACE INTO issues (issueid, url, status, name, labels, assignees, body, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                   (int(issuefields[0]), issuefields[1], issuefields[2], issuefields[3], issuefields[4], issuefields[5], issuefields[6], issuefields[7]))
+                numfetched = numfetched + 1
+                if newwatermark is None or issuefields[7] > newwatermark:
+                    newwatermark = issuefields[7]
+            if watermark is not None:
+                # issues transferred or deleted on github are never listed as updated, so
+                # open issues that github no longer lists as open are dropped (one closed
+                # since the listing above comes back, closed, with the next sync)
+                opennumbers = callhub.open_issue_numbers(checkoutdir)
+                staleids = [row[0] for row in connection.execute("SELECT issueid FROM issues WHERE status = 'open'") if row[0] not in opennumbers]
+                connection.executemany("DELETE FROM issues WHERE issueid = ?", [(issueid,) for issueid in staleids])
+            if newwatermark is not None:
+                write_syncstate(connection, "watermark", newwatermark)
+            write_syncstate(connection, "lastsynced", datetime.datetime.now(datetime.timezone.utc).isoformat())
+    finally:
+        connection.close()
+
+    return numfetched
+
+def iterate_issues(checkoutdir: str, state: str = "open", since: str = None):
+    # like callhub.iterate_issues, but read from the snapshot (hub lists only open issues by default);
+    # with since, only issues updated at or after that time are read
+    connection = open_snapshot(checkoutdir)
+    query = "SELECT issueid, url, status, name, labels, assignees, body FROM issues"
+    conditions = []
+    parameters = []
+    if state != "all":
+        conditions.append("status = ?")
+        parameters.append(state)
+    if since is not None:
+        conditions.append("updated >= ?")
+        parameters.append(since)
+    if len(conditions) > 0:
+        query = query + " WHERE " + " AND ".join(conditions)
+    rows = connection.execute(query + " ORDER BY issueid", parameters)
+    try:
+        for row in rows:
+            with trace.span("parse issue", "parse", event=False):
+                issuedict = callhub.parse_issue_fields([str(row[0])] + list(row[1:]))
+            if issuedict is not None:
+                yield issuedict
+    finally:
+        connection.close()
+
+def mark_closed(checkoutdir: str, issueids: list) -> None:
+    # for issues just closed, so the snapshot agrees with github before the next sync
+    connection = open_snapshot(checkoutdir)
+    with connection:
+        connection.executemany("UPDATE issues SET status = 'closed' WHERE issueid = ?", [(int(issueid),) for issueid in issueids])
+    connection.close()
+
+def remove_issues(checkoutdir: str, issueids: list) -> None:
+    # for issues just transferred to another repository
+    connection = open_snapshot(checkoutdir)
+    with connection:
+        connection.executemany("DELETE FROM issues WHERE issueid = ?", [(int(issueid),) for issueid in issueids])
+    connection.close()
+
+def replace_labels(checkoutdir: str, newlabels: dict) -> None:
+    # newlabels maps issue ids to the labels the issues were just given
+    connection = open_snapshot(checkoutdir)
+    with connection:
+        connection.executemany("UPDATE issues SET labels = ? WHERE issueid = ?", [(", ".join(newlabels[issueid]), int(issueid)) for issueid in newlabels.keys()])
+    connection.close()
+
+def issue_ids(checkoutdir: str) -> set:
+    # the ids of all the issues in the snapshot, as strings like IssueRecord issueids
+    connection = open_snapshot(checkoutdir)
+    issueids = set(str(row[0]) for row in connection.execute("SELECT issueid FROM issues"))
+    connection.close()
+    return issueids
+
+def read_watermark(checkoutdir: str) -> str:
+    # the update time of the newest issue in the snapshot, or None before the first sync
+    connection = open_snapshot(checkoutdir)
+    watermark = read_syncstate(connection, "watermark")
+    connection.close()
+    return watermark
+
+def retrieve_all_issues(checkoutdir: str, state: str = "open") -> list:
+    return list(iterate_issues(checkoutdir, state))
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION] ...",
+        description="Bring the local snapshot of a github repository's issues up to date"
+    )
+    parser.add_argument(
+        "-v", "--version", action="version",
+        version = f"{parser.prog} version 1.0.0"
+    )
+    parser.add_argument('-s', '--source', type=str, metavar='directory of checkout of source github repository', required=True)
+    parser.add_argument('-f', '--full', action='store_true', help='download all issues again instead of only the ones updated since the last sync')
+
+    return parser
+
+def main(argv: list = None) -> None:
+    parser = init_argparse()
+    args = parser.parse_args(argv)
+
+    numfetched = sync_issues(args.source, args.full)
+    print("Fetched " + str(numfetched) + " issues into " + snapshot_path(args.source))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import contextlib
+
+# Run instrumentation. When enabled (with the --profile or --trace options the
+# scripts add through add_arguments()), every hub process, github API request,
+# Google Sheets call and sleep is timed, along with the phases of each script.
+# Each span is counted under its name with a latency histogram, and totals are
+# kept per category ("hub", "api", "sheets", "sleep", "phase", "parse") so the
+# time spent sleeping can be told apart from the time spent working.
+#
+# --profile prints the counts, totals and histograms when the script exits;
+# --trace FILE writes them, plus every span as a Chrome trace event, to FILE
+# (load it in chrome://tracing or https://ui.perfetto.dev). When neither is
+# given, span() returns one shared do-nothing context manager.
+
+histogrambounds = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 60]
+
+_enabled = False
+_keepevents = False
+_events = []
+_stats = {}
+_lock = threading.Lock()
+_starttime = time.perf_counter()
+_nullspan = contextlib.nullcontext()
+
+def enabled() -> bool:
+    return _enabled
+
+def enable(keepevents: bool = False) -> None:
+    global _enabled, _keepevents, _starttime
+    if not _enabled:
+        _starttime = time.perf_counter()
+    _enabled = True
+    _keepevents = _keepevents or keepevents
+
+def record(name: str, category: str, start: float, duration: float, event: bool = True) -> None:
+    # start is a time.perf_counter() value, duration is in seconds
+    if not _enabled:
+        return
+    bucket = len(histogrambounds)
+    for i in range(len(histogrambounds)):
+        if duration <= histogrambounds[i]:
+            bucket = i
+            break
+    with _lock:
+        if name not in _stats.keys():
+            _stats[name] = {"category":category, "count":0, "seconds":0.0, "maxseconds":0.0, "histogram":[0] * (len(histogrambounds) + 1)}
+        stats = _stats[name]
+        stats["count"] = stats["count"] + 1
+        stats["seconds"] = stats["seconds"] + duration
+        stats["maxseconds"] = max(stats["maxseconds"], duration)
+        stats["histogram"][bucket] = stats["histogram"][bucket] + 1
+        if _keepevents and event:
+            _events.append({"name":name, "cat":category, "ph":"X", "pid":os.getpid(), "tid":threading.get_ident(),
+                            "ts":(start - _starttime) * 1e6, "dur":duration * 1e6})
+
+class _Span:
+    __slots__ = ("name", "category", "event", "start")
+
+    def __init__(self, name: str, category: str, event: bool):
+        self.name = name
+        self.category = category
+        self.event = event
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exctype, excvalue, exctraceback) -> bool:
+        record(self.name, self.category, self.start, time.perf_counter() - self.start, self.event)
+        return False
+
+def span(name: str, category: str = "phase", event: bool = True):
+    # event=False keeps only the counts and histogram, for spans run once per issue
+    if not _enabled:
+        return _nullspan
+    return _Span(name, category, event)
+
+def sleep(seconds: float, reason: str = "sleep") -> None:
+    if not _enabled:
+        time.sleep(seconds)
+        return
+    start = time.perf_counter()
+    time.sleep(seconds)
+    record(reason, "sleep", start, time.perf_counter() - start)
+
+def summary() -> dict:
+    with _lock:
+        spans = dict((name, dict(stats)) for (name, stats) in _stats.items())
+    categories = {}
+    for stats in spans.values():
+        categories[stats["category"]] = categories.get(stats["category"], 0.0) + stats["seconds"]
+    return {"wallseconds":time.perf_counter() - _starttime, "categories":categories, "spans":spans,
+            "histogrambounds":histogrambounds}
+
+def print_summary(fh=None) -> None:
+    if fh is None:
+        fh = sys.stderr
+    runsummary = summary()
+    fh.write("Run time " + "%.3f" % runsummary["wallseconds"] + "s; " + ", ".join([category + " " + "%.3f" % seconds + "s" for (category, seconds) in sorted(runsummary["categories"].items())]) + "\n")
+    fh.write("\t".join(["span", "category", "count", "total_s", "mean_ms", "max_ms", "histogram (<=" + ",".join([str(bound) for bound in histogrambounds]) + ",more s)"]) + "\n")
+    for (name, stats) in sorted(runsummary["spans"].items(), key=lambda item: -item[1]["seconds"]):
+        fh.write("\t".join([name, stats["category"], str(stats["count"]), "%.3f" % stats["seconds"],
+                            "%.2f" % (1000 * stats["seconds"] / stats["count"]), "%.2f" % (1000 * stats["maxseconds"]),
+                            " ".join([str(count) for count in stats["histogram"]])]) + "\n")
+
+def write_trace(tracefile: str) -> None:
+    with _lock:
+        events = list(_events)
+    with open(tracefile, 'w') as fh_trace:
+        json.dump({"traceEvents":events, "displayTimeUnit":"ms", "otherData":summary()}, fh_trace)
+
+def add_arguments(parser) -> None:
+    parser.add_argument('--profile', action='store_true', help='print call counts and timings when finished')
+    parser.add_argument('--trace', type=str, default=None, metavar='FILE', help='write call timings and a Chrome trace of the run to this JSON file')
+
+def start_from_args(args) -> None:
+    if args.profile:
+        enable()
+        atexit.register(print_summary)
+    if args.trace is not None:
+        enable(keepevents=True)
+        atexit.register(write_trace, args.trace)
@@ -0,0 +1,41 @@
+import argparse
+
+from github_issues import callhub
+from github_issues import trace
+from github_issues.close_issues import read_issue_ids
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION] [ISSUEID]...",
+        description="Transfer github issues to another repository"
+    )
+    parser.add_argument(
+        "-v", "--version", action="version",
+        version = f"{parser.prog} version 1.0.0"
+    )
+    parser.add_argument('issueids', type=str, nargs='*', metavar='ISSUEID', help='numbers of the issues to transfer')
+    parser.add_argument('-s', '--source', type=str, metavar='directory of checkout of source github repository', required=True)
+    parser.add_argument('-d', '--destination', type=str, metavar='repository (OWNER/REPO or REPO) to transfer the issues to', required=True)
+    parser.add_argument('-f', '--file', type=str, default=None, help='file of issue numbers, one per line, to transfer', required=False)
+    parser.add_argument('-j', '--jobs', type=int, default=callhub.defaultbulkworkers, help='number of issues to transfer concurrently', required=False)
+    parser.add_argument('-r', '--retries', type=int, default=callhub.defaultbulkattempts, help='number of times to try each transfer', required=False)
+    trace.add_arguments(parser)
+
+    return parser
+
+def main(argv: list = None) -> None:
+    parser = init_argparse()
+    args = parser.parse_args(argv)
+
+    issueids = read_issue_ids(args.issueids, args.file)
+    if len(issueids) == 0:
+        print("Nothing to do--specify issue numbers or a file of them")
+        exit(1)
+
+    trace.start_from_args(args)
+    with trace.span("transfer issues"):
+        results = callhub.transfer_issues(args.source, issueids, args.destination, args.jobs, args.retries)
+    callhub.print_status_table(results)
+
+if __name__ == '__main__':
+    main()
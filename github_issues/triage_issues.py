@@ -0,0 +1,164 @@
+import argparse
+
+from github_issues import callhub
+from github_issues import intervals
+from github_issues import regions
+from github_issues import snapshot
+from github_issues import trace
+
+# Closes, relabels or transfers every open issue whose region overlaps a BED
+# file of resolved (or false positive) regions--after a polishing round, say.
+# The issue regions from the local snapshot are put in an interval index, each
+# BED interval is looked up in it, and the matching issues are updated
+# concurrently with callhub.run_bulk_updates, which paces them with its rate
+# limiter. The snapshot is updated to match the issues that were triaged.
+# With --dryrun, only the report of matching issues is printed.
+
+def read_bed_intervals(bedfile: str) -> list:
+    # [chrom, one-based start, end, name] for each BED line
+    bedintervals = []
+    with open(bedfile, 'r') as fh_bed:
+        for line in fh_bed:
+            if line.startswith("#") or line.startswith("track") or line.startswith("browser"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 3:
+                continue
+            if not fields[1].isdigit() or not fields[2].isdigit():
+                print("Can\'t parse BED line " + line.rstrip("\n"))
+                exit(1)
+            name = fields[3] if len(fields) > 3 else fields[0] + ":" + str(int(fields[1]) + 1) + "-" + fields[2]
+            bedintervals.append([fields[0], int(fields[1]) + 1, int(fields[2]), name])
+
+    return bedintervals
+
+def find_overlapping_issues(issues, bedintervals: list, requiredlabels: list) -> dict:
+    # issueid -> [issue, names of the BED intervals it overlaps]
+    issueintervals = {}
+    for issue in issues:
+        if any([label not in issue.labelset for label in requiredlabels]):
+            continue
+        region = regions.parse_region(issue["region"])
+        if region is not None:
+            intervals.add_interval(issueintervals, region.chrom, region.start, region.end, issue)
+    index = intervals.build_interval_index(issueintervals)
+
+    matches = {}
+    for [chrom, start, end, name] in bedintervals:
+        for [issuestart, issueend, issue] in intervals.overlapping_intervals(index, chrom, start, end):
+            if issue["issueid"] not in matches.keys():
+                matches[issue["issueid"]] = [issue, []]
+            matches[issue["issueid"]][1].append(name)
+
+    return matches
+
+def triaged_labels(issue, addlabels: list, removelabels: list) -> list:
+    # the issue's labels after triage, or None if they don't change
+    newlabels = [label for label in issue["labels"] if label != "" and label not in removelabels]
+    newlabels.extend([label for label in addlabels if label not in newlabels])
+    if set(newlabels) == set(issue["labels"]) - set([""]):
+        return None
+    return newlabels
+
+def triage_updates(matches: dict, action: str, addlabels: list, removelabels: list, destination: str) -> dict:
+    # issueid -> update function for callhub.run_bulk_updates; labels are changed
+    # first, then the issue is closed or transferred
+    updates = {}
+    for issueid in matches.keys():
+        issue = matches[issueid][0]
+        newlabels = triaged_labels(issue, addlabels, removelabels)
+        if newlabels is None and action == "relabel":
+            continue
+
+        def update(backend, issueid=issueid, newlabels=newlabels):
+            if newlabels is not None:
+                [succeeded, message] = backend.replace_labels(issueid, newlabels)
+                if not succeeded or action == "relabel":
+                    return [succeeded, message]
+            if action == "close":
+                return backend.close_issue(issueid)
+            return backend.transfer_issue(issueid, destination)
+        updates[issueid] = update
+
+    return updates
+
+def update_snapshot(checkoutdir: str, matches: dict, results: dict, action: str, addlabels: list, removelabels: list) -> None:
+    # records the triaged issues' new state, so that another triage or create run
+    # sees them as they are now even before the next sync
+    triaged = callhub.updated_issue_ids(results)
+    if action == "transfer":
+        snapshot.remove_issues(checkoutdir, triaged)
+        return
+    newlabels = {}
+    for issueid in triaged:
+        issuelabels = triaged_labels(matches[issueid][0], addlabels, removelabels)
+        if issuelabels is not None:
+            newlabels[issueid] = issuelabels
+    snapshot.replace_labels(checkoutdir, newlabels)
+    if action == "close":
+        snapshot.mark_closed(checkoutdir, triaged)
+
+def print_triage_report(matches: dict, updates: dict, action: str) -> None:
+    print("IssueID\tRegion\tOverlaps\tAction")
+    for issueid in sorted(matches.keys(), key=int):
+        [issue, names] = matches[issueid]
+        print(issueid + "\t" + issue["region"] + "\t" + ",".join(names) + "\t" + (action if issueid in updates.keys() else "unchanged"))
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION] BEDFILE",
+        description="Close, relabel or transfer every open github issue whose region overlaps a BED file"
+    )
+    parser.add_argument(
+        "-v", "--version", action="version",
+        version = f"{parser.prog} version 1.0.0"
+    )
+    parser.add_argument('bedfile', type=str, metavar='BEDFILE', help='BED file of resolved or false positive regions')
+    parser.add_argument('-s', '--source', type=str, metavar='directory of checkout of source github repository', required=True)
+    parser.add_argument('-a', '--action', type=str, default="close", choices=["close", "relabel", "transfer"], help='what to do with the overlapping issues (default close)', required=False)
+    parser.add_argument('--add-labels', type=str, default="", help='comma-delimited labels to add to the overlapping issues (with any action)', required=False)
+    parser.add_argument('--remove-labels', type=str, default="", help='comma-delimited labels to remove from the overlapping issues (with any action)', required=False)
+    parser.add_argument('-d', '--destination', type=str, default=None, help='repository (OWNER/REPO or REPO) to transfer the issues to, for --action transfer', required=False)
+    parser.add_argument('-l', '--labels', type=str, default="", help='only triage issues with all of these comma-delimited labels', required=False)
+    parser.add_argument('-n', '--dryrun', '--dry-run', action='store_true', help='just print the issues that would be changed')
+    parser.add_argument('-j', '--jobs', type=int, default=callhub.defaultbulkworkers, help='number of issues to update concurrently', required=False)
+    parser.add_argument('-r', '--retries', type=int, default=callhub.defaultbulkattempts, help='number of times to try each update', required=False)
+    trace.add_arguments(parser)
+
+    return parser
+
+def main(argv: list = None) -> None:
+    parser = init_argparse()
+    args = parser.parse_args(argv)
+
+    addlabels = [label for label in args.add_labels.split(",") if label != ""]
+    removelabels = [label for label in args.remove_labels.split(",") if label != ""]
+    requiredlabels = [label for label in args.labels.split(",") if label != ""]
+    if args.action == "transfer" and args.destination is None:
+        print("Specify the repository to transfer the issues to with --destination")
+        exit(1)
+    if args.action == "relabel" and len(addlabels) == 0 and len(removelabels) == 0:
+        print("Nothing to do--specify labels to add or remove")
+        exit(1)
+
+    checkoutdir = args.source
+    trace.start_from_args(args)
+    bedintervals = read_bed_intervals(args.bedfile)
+    with trace.span("sync snapshot"):
+        snapshot.sync_issues(checkoutdir)
+    with trace.span("find overlapping issues"):
+        matches = find_overlapping_issues(snapshot.iterate_issues(checkoutdir), bedintervals, requiredlabels)
+    updates = triage_updates(matches, args.action, addlabels, removelabels, args.destination)
+
+    print_triage_report(matches, updates, args.action)
+    print(str(len(matches)) + " open issues overlap " + str(len(bedintervals)) + " BED intervals, " + str(len(updates)) + " to " + args.action)
+    if args.dryrun or len(updates) == 0:
+        return
+
+    with trace.span("triage issues"):
+        results = callhub.run_bulk_updates(checkoutdir, updates, args.jobs, args.retries)
+    update_snapshot(checkoutdir, matches, results, args.action, addlabels, removelabels)
+    callhub.print_status_table(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import argparse
+
+from github_issues import callhub
+from github_issues import snapshot
+from github_issues import trace
+
+def read_issue_values(valuefile: str) -> dict:
+    # tab-delimited lines of issue id and value (comma-delimited labels or user names)
+    issuevalues = {}
+    with open(valuefile, 'r') as fh_values:
+        for line in fh_values:
+            line = line.rstrip("\n")
+            if line == "" or line[0] == "#":
+                continue
+            fields = line.split("\t")
+            if len(fields) < 2:
+                fields.append("")
+            issuevalues[fields[0]] = fields[1]
+
+    return issuevalues
+
+def init_argparse() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        usage="%(prog)s [OPTION] ...",
+        description="Replace the labels or assignees of many github issues at once"
+    )
+    parser.add_argument(
+        "-v", "--version", action="version",
+        version = f"{parser.prog} version 1.0.0"
+    )
+    parser.add_argument('-s', '--source', type=str, metavar='directory of checkout of source github repository', required=True)
+    parser.add_argument('-l', '--labels', type=str, default=None, help='tab-delimited file of issue ids and the comma-delimited labels each should have', required=False)
+    parser.add_argument('-a', '--assignees', type=str, default=None, help='tab-delimited file of issue ids and the comma-delimited users each should be assigned to', required=False)
+    parser.add_argument('-j', '--jobs', type=int, default=callhub.defaultbulkworkers, help='number of issues to update concurrently', required=False)
+    parser.add_argument('-r', '--retries', type=int, default=callhub.defaultbulkattempts, help='number of times to try each update', required=False)
+    trace.add_arguments(parser)
+
+    return parser
+
+def main(argv: list = None) -> None:
+    parser = init_argparse()
+    args = parser.parse_args(argv)
+
+    checkoutdir = args.source
+    if args.labels is None and args.assignees is None:
+        print("Nothing to do--specify a file of new labels or new assignees")
+        exit(1)
+
+    trace.start_from_args(args)
+    with trace.span("sync snapshot"):
+        snapshot.sync_issues(checkoutdir)
+    currentissues = {}
+    for issue in snapshot.iterate_issues(checkoutdir, state="all"):
+        currentissues[issue["issueid"]] = issue
+
+    results = {}
+    if args.labels is not None:
+        newlabels = read_issue_values(args.labels)
+        for issueid in newlabels.keys():
+            newlabels[issueid] = newlabels[issueid].split(",")
+        with trace.span("replace labels"):
+            results = callhub.replace_labels_for_issues(checkoutdir, newlabels, currentissues, args.jobs, args.retries)
+        callhub.print_status_table(results)
+    if args.assignees is not None:
+        newassignees = read_issue_values(args.assignees)
+        with trace.span("replace assignees"):
+            results = callhub.replace_assignees_for_issues(checkoutdir, newassignees, currentissues, args.jobs, args.retries)
+        callhub.print_status_table(results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import json
+import subprocess
+
+from github_issues import backends
+
+# A RestBackend whose HTTPS connections are stubbed: each request is answered
+# by the next [status, headers, JSON body] in a list of canned responses, and
+# recorded as [method, path, payload]. An exception in place of a response is
+# raised instead--while sending for ConnectionRefusedError (the connection
+# couldn't be made), and while waiting for the response for anything else.
+
+class StubResponse:
+    def __init__(self, status: int, headers: dict, body):
+        self.status = status
+        self.headers = headers
+        self.body = b"" if body is None else json.dumps(body).encode("utf-8")
+
+    def read(self) -> bytes:
+        return self.body
+
+    def getheader(self, name: str, default: str = None) -> str:
+        return self.headers.get(name, default)
+
+    def getheaders(self) -> list:
+        return list(self.headers.items())
+
+class StubConnection:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def request(self, method: str, path: str, body=None, headers=None) -> None:
+        if isinstance(self.backend.responses[0], ConnectionRefusedError):
+            raise self.backend.responses.pop(0)
+        self.backend.requests.append([method, path, json.loads(body) if body is not None else None])
+
+    def getresponse(self) -> StubResponse:
+        response = self.backend.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        [status, headers, body] = response
+        return StubResponse(status, headers, body)
+
+    def close(self) -> None:
+        pass
+
+class StubbedRestBackend(backends.RestBackend):
+    def __init__(self, sourcedir: str, responses: list, limiter=None):
+        super().__init__(sourcedir, "stub-token", limiter)
+        self.responses = list(responses)
+        self.requests = []
+
+    def _connection(self) -> StubConnection:
+        return StubConnection(self)
+
+def github_checkout(checkoutdir: str) -> str:
+    # an empty git checkout with a github origin, which RestBackend needs to find the repository
+    subprocess.run(["git", "init", "-q", checkoutdir], check=True)
+    subprocess.run(["git", "remote", "add", "origin", "https://github.com/owner/repo.git"], cwd=checkoutdir, check=True)
+    return checkoutdir
+
+def api_issue(number: int, updated: str, labels: list = []) -> dict:
+    return {"number":number, "html_url":"https://github.com/owner/repo/issues/" + str(number), "state":"open",
+            "title":"Issue " + str(number), "labels":[{"name":label} for label in labels], "assignees":[],
+            "body":"### Assembly Region\nchr1_MATERNAL:" + str(number * 100) + "-" + str(number * 100 + 10), "updated_at":updated}
+
+def next_page(page: int) -> dict:
+    return {"link":"<https://api.github.com/repos/owner/repo/issues?page=" + str(page) + ">; rel=\"next\""}
@@ -0,0 +1,48 @@
+import random
+
+from github_issues import annotate
+
+def test_parse_track_option():
+    assert annotate.parse_track_option("censat.bed") == ["censat.bed", "{name}"]
+    assert annotate.parse_track_option("segdups.bed=segdup") == ["segdups.bed", "segdup"]
+    assert annotate.parse_track_option("dir=x/censat.bed={lcname}_sat") == ["dir=x/censat.bed", "{lcname}_sat"]
+    assert annotate.track_label("{lcname}_sat", "HSat2") == "hsat2_sat"
+
+def test_sweep_matches_brute_force(tmp_path):
+    rng = random.Random(3)
+    tracks = []
+    trackintervals = []
+    for [trackname, labelrule] in [["censat", "{lcname}"], ["segdups", "segdup"], ["repeats", "rep_{name}"]]:
+        bedfile = tmp_path / (trackname + ".bed")
+        lines = ["track name=" + trackname + "\n"]
+        for i in range(300):
+            chrom = rng.choice(["chr1_MATERNAL", "chr2_PATERNAL"])
+            start = rng.randrange(0, 50000)
+            end = start + rng.choice([1, 200, 5000])
+            name = rng.choice(["HSat2", "ALR", "ct"])
+            lines.append(chrom + "\t" + str(start) + "\t" + str(end) + "\t" + name + "\n")
+            trackintervals.append([chrom, start + 1, end, annotate.track_label(labelrule, name)])
+        bedfile.write_text("".join(lines))
+        tracks.append([str(bedfile), labelrule])
+
+    regionlist = []
+    for i in range(500):
+        chrom = rng.choice(["chr1_MATERNAL", "chr2_PATERNAL", "chrX_MATERNAL"])
+        start = rng.randrange(1, 55000)
+        regionlist.append(chrom + ":" + str(start) + "-" + str(start + rng.choice([0, 10, 2000])))
+
+    expected = {}
+    for regionstring in regionlist:
+        [chrom, span] = regionstring.split(":")
+        [start, end] = [int(coordinate) for coordinate in span.split("-")]
+        for [intervalchrom, intervalstart, intervalend, label] in trackintervals:
+            if intervalchrom == chrom and intervalstart <= end and intervalend >= start:
+                expected.setdefault(regionstring, {})[label] = True
+    assert annotate.annotate_regions(tracks, regionlist) == expected
+
+def test_touching_intervals(tmp_path):
+    # BED intervals are zero-based and half-open, regions one-based and closed
+    bedfile = tmp_path / "track.bed"
+    bedfile.write_text("chr1_MATERNAL\t100\t200\tA\n")
+    labels = annotate.annotate_regions([[str(bedfile), "{name}"]], ["chr1_MATERNAL:90-100", "chr1_MATERNAL:101-101", "chr1_MATERNAL:200-210", "chr1_MATERNAL:201-300"])
+    assert labels == {"chr1_MATERNAL:101-101":{"A":True}, "chr1_MATERNAL:200-210":{"A":True}}
@@ -0,0 +1,58 @@
+import os
+import random
+
+import pytest
+
+from github_issues import annotindex
+
+@pytest.fixture(autouse=True)
+def cachehome(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+def write_bed(bedfile, rng: random.Random, numintervals: int) -> list:
+    # [chrom, one-based start, end, name] for each interval written
+    bedintervals = []
+    lines = ["#chrom\tstart\tend\tname\n"]
+    for i in range(numintervals):
+        chrom = rng.choice(["chr1_MATERNAL", "chr2_PATERNAL"])
+        start = rng.randrange(0, 100000)
+        end = start + rng.choice([1, 100, 20000])
+        name = rng.choice(["alphasat", "HSat2", "HSat3", "ct"])
+        lines.append(chrom + "\t" + str(start) + "\t" + str(end) + "\t" + name + "\t0\t+\n")
+        bedintervals.append([chrom, start + 1, end, name])
+    bedfile.write_text("".join(lines))
+    return bedintervals
+
+def test_overlaps_match_brute_force(tmp_path):
+    rng = random.Random(5)
+    bedfile = tmp_path / "censat.bed"
+    bedintervals = write_bed(bedfile, rng, 500)
+    index = annotindex.open_index(str(bedfile))
+    for query in range(300):
+        chrom = rng.choice(["chr1_MATERNAL", "chr2_PATERNAL", "chrX_MATERNAL"])
+        start = rng.randrange(1, 110000)
+        end = start + rng.choice([0, 50, 5000])
+        expected = set([name for [intervalchrom, intervalstart, intervalend, name] in bedintervals if intervalchrom == chrom and intervalstart <= end and intervalend >= start])
+        assert set(annotindex.overlapping_annotations(index, chrom, start, end)) == expected
+
+def test_index_is_reused_until_the_bed_file_changes(tmp_path):
+    bedfile = tmp_path / "censat.bed"
+    bedfile.write_text("chr1_MATERNAL\t99\t200\talphasat\n")
+    annotindex.open_index(str(bedfile))
+    indexfile = annotindex.index_path(str(bedfile))
+    builttime = os.stat(indexfile).st_mtime_ns
+    os.utime(indexfile, ns=(builttime - 10**9, builttime - 10**9))
+    index = annotindex.open_index(str(bedfile))
+    assert os.stat(indexfile).st_mtime_ns == builttime - 10**9
+    assert annotindex.overlapping_annotations(index, "chr1_MATERNAL", 100, 100) == ["alphasat"]
+    assert annotindex.overlapping_annotations(index, "chr1_MATERNAL", 99, 99) == []
+
+    bedfile.write_text("chr1_MATERNAL\t99\t200\tHSat2\nchr1_MATERNAL\t300\t400\tHSat3\n")
+    index = annotindex.open_index(str(bedfile))
+    assert annotindex.overlapping_annotations(index, "chr1_MATERNAL", 150, 350) == ["HSat2", "HSat3"]
+
+def test_empty_bed_file(tmp_path):
+    bedfile = tmp_path / "empty.bed"
+    bedfile.write_text("")
+    index = annotindex.open_index(str(bedfile))
+    assert annotindex.overlapping_annotations(index, "chr1_MATERNAL", 1, 100) == []
@@ -0,0 +1,169 @@
+import time
+
+import pytest
+
+from github_issues import backends
+from github_issues import callhub
+from github_issues import fakegithub
+from github_issues import ratelimit
+from github_issues import trace
+
+from restfixtures import StubbedRestBackend, github_checkout, api_issue, next_page
+
+@pytest.fixture
+def fake(tmp_path):
+    fake = fakegithub.FakeGitHub()
+    fake.add_issue("Issue: chr1_MATERNAL:100-110", "### Assembly Region\nchr1_MATERNAL:100-110\n\n### Assembly Version\nv0.7", ["merqury", "hsat2"], ["curator1"])
+    fake.add_issue("Issue: chr2_PATERNAL:5", "chr2_PATERNAL:5", ["coverage_pri", "hifi_evidence"], [])
+    fake.add_issue("Closed issue", "chr3_MATERNAL:1-2", [], [], state="closed")
+    backends.set_backend(str(tmp_path), fake)
+    return fake
+
+@pytest.fixture
+def nosleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(trace, "sleep", lambda seconds, reason: sleeps.append(reason))
+    return sleeps
+
+class RecordingLimiter:
+    def __init__(self):
+        self.observed = []
+
+    def observe_ratelimit(self, remaining: int, resettime: float) -> None:
+        self.observed.append([remaining, resettime])
+
+def test_retrieve_all_issues(fake, tmp_path):
+    issues = callhub.retrieve_all_issues(str(tmp_path))
+    assert [issue["issueid"] for issue in issues] == ["1", "2"]
+    [first, second] = issues
+    assert first["region"] == "chr1_MATERNAL:100-110" and first["size"] == 11 and first["assembly"] == "v0.7"
+    assert first["programs"] == "merqury" and first["centromere"] == "hsat2" and first["assignedto"] == "curator1"
+    assert second["region"] == "chr2_PATERNAL:5-5" and second["assignedto"] == "unassigned"
+    assert second["coverage"] == "unflagged" and second["evidence"] == "hifi_evidence" and second["programs"] == "coverage_pri"
+    assert callhub.retrieve_issue_ids(str(tmp_path)) == "1\n2\n"
+
+def test_create_and_bulk_updates(fake, tmp_path, monkeypatch):
+    monkeypatch.setattr(callhub, "defaultbulkrate", 60000)
+    sourcedir = str(tmp_path)
+    assert callhub.create_new_issue(sourcedir, "New issue", "chr4_MATERNAL:1-5", ["merqury"]) == 4
+    currentissues = dict((issue["issueid"], issue) for issue in callhub.iterate_issues(sourcedir))
+    results = callhub.replace_labels_for_issues(sourcedir, {"1":["merqury", "hsat2"], "2":["false_positive"], "99":["merqury"]}, currentissues)
+    assert [results[issueid][0] for issueid in ["1", "2", "99"]] == ["unchanged", "updated", "missing"]
+    assert fake.issues[2]["labels"] == ["false_positive"]
+
+    results = callhub.close_issues(sourcedir, ["1", "98"], maxattempts=1)
+    assert [results["1"][0], results["98"][0]] == ["updated", "failed"]
+    assert fake.issues[1]["state"] == "closed"
+    results = callhub.transfer_issues(sourcedir, ["2"], "owner/other")
+    assert results["2"][0] == "updated" and fake.transferred[2] == "owner/other"
+
+def test_close_and_transfer_update_the_snapshot(fake, tmp_path, monkeypatch):
+    from github_issues import snapshot
+    monkeypatch.setattr(callhub, "defaultbulkrate", 60000)
+    sourcedir = str(tmp_path)
+    snapshot.sync_issues(sourcedir)
+    callhub.close_issues(sourcedir, ["1"])
+    callhub.transfer_issues(sourcedir, ["2", "97"], "owner/other", maxattempts=1)
+    assert [[issue["issueid"], issue["status"]] for issue in snapshot.iterate_issues(sourcedir, state="all")] == [["1", "closed"], ["3", "closed"]]
+
+def test_bulk_updates_retry_and_wait_out_rate_limits(fake, tmp_path, nosleep):
+    attempts = {"1":0, "2":0}
+    def flaky(backend, issueid: str) -> list:
+        attempts[issueid] = attempts[issueid] + 1
+        if issueid == "1" and attempts[issueid] == 1:
+            raise ratelimit.RateLimited("slow down", 0.01)
+        if issueid == "2" and attempts[issueid] < 3:
+            return [False, "HTTP 502"]
+        return backend.close_issue(issueid)
+
+    updates = dict((issueid, lambda backend, issueid=issueid: flaky(backend, issueid)) for issueid in ["1", "2"])
+    limiter = ratelimit.TokenBucket(1000, 1000)
+    results = callhub.run_bulk_updates(str(tmp_path), updates, numworkers=2, maxattempts=3, limiter=limiter)
+    assert results["1"][:2] == ["updated", 2]
+    assert results["2"][:2] == ["updated", 3]
+    assert nosleep.count("bulk update backoff") == 2
+
+def test_rest_listing_follows_pages(tmp_path):
+    checkoutdir = github_checkout(str(tmp_path))
+    pullrequest = api_issue(3, "2024-01-03T00:00:00Z")
+    pullrequest["pull_request"] = {}
+    backend = StubbedRestBackend(checkoutdir, [[200, next_page(2), [api_issue(1, "2024-01-01T00:00:00Z", ["merqury"]), pullrequest]],
+                                              [200, {}, [api_issue(2, "2024-01-02T00:00:00Z")]]])
+    records = list(backend.issue_records("all", "2024-01-01T00:00:00Z"))
+    assert [record[0] for record in records] == ["1", "2"]
+    assert records[0][4] == "merqury" and records[0][7] == "2024-01-01T00:00:00Z"
+    assert [request[1].split("?")[0] for request in backend.requests] == ["/repos/owner/repo/issues"] * 2
+    assert "page=1" in backend.requests[0][1] and "page=2" in backend.requests[1][1]
+    assert "state=all" in backend.requests[0][1] and "since=2024-01-01T00%3A00%3A00Z" in backend.requests[0][1]
+
+def test_rest_rate_limits(tmp_path):
+    checkoutdir = github_checkout(str(tmp_path))
+    resettime = time.time() + 120
+    limiter = RecordingLimiter()
+    backend = StubbedRestBackend(checkoutdir, [[201, {"x-ratelimit-remaining":"10", "x-ratelimit-reset":str(resettime)}, {"number":12}],
+                                              [403, {"x-ratelimit-remaining":"0", "x-ratelimit-reset":str(resettime)}, {"message":"API rate limit exceeded"}],
+                                              [429, {"retry-after":"30"}, {"message":"secondary rate limit"}]], limiter)
+    assert backend.create_issue("Issue", "body", ["merqury", ""]) == 12
+    assert backend.requests[0] == ["POST", "/repos/owner/repo/issues", {"title":"Issue", "body":"body", "labels":["merqury"]}]
+    assert limiter.observed[0] == [10, resettime]
+
+    with pytest.raises(ratelimit.RateLimited) as error:
+        backend.close_issue("12")
+    assert 100 < error.value.retryafter <= 120
+    with pytest.raises(ratelimit.RateLimited) as error:
+        backend.replace_labels("12", ["merqury"])
+    assert error.value.retryafter == 30
+
+def test_rest_retries_server_errors(tmp_path, nosleep):
+    checkoutdir = github_checkout(str(tmp_path))
+    backend = StubbedRestBackend(checkoutdir, [[502, {}, None], [200, {}, {}], [404, {}, {"message":"Not Found"}]])
+    assert backend.close_issue("5") == [True, "HTTP 200"]
+    assert nosleep == ["api retry backoff"]
+    assert backend.replace_assignees("6", "a,b") == [False, "HTTP 404: Not Found"]
+
+def test_rest_does_not_repeat_creations(tmp_path, nosleep):
+    import http.client
+    checkoutdir = github_checkout(str(tmp_path))
+    # the connection drops after the issue was sent, or github answers with a 502--either
+    # way the issue may exist, so it isn't sent again
+    for failure in [http.client.RemoteDisconnected("Remote end closed connection without response"), [502, {}, None]]:
+        backend = StubbedRestBackend(checkoutdir, [failure, [201, {}, {"number":12}]])
+        with pytest.raises(backends.UncertainOutcome):
+            backend.create_issue("Issue", "body", [])
+        assert [request[0] for request in backend.requests] == ["POST"]
+
+    # a creation that never got sent is safe to send again
+    backend = StubbedRestBackend(checkoutdir, [ConnectionRefusedError(), [201, {}, {"number":12}]])
+    assert backend.create_issue("Issue", "body", []) == 12
+    assert [request[0] for request in backend.requests] == ["POST"]
+
+    # updates are retried on a fresh connection
+    backend = StubbedRestBackend(checkoutdir, [http.client.RemoteDisconnected("closed"), [200, {}, {}]])
+    assert backend.close_issue("5") == [True, "HTTP 200"]
+    assert [request[0] for request in backend.requests] == ["PATCH", "PATCH"]
+    assert nosleep == []
+
+def test_backend_selection(tmp_path, monkeypatch, capsys):
+    checkoutdir = github_checkout(str(tmp_path / "checkout"))
+    hubconfig = tmp_path / "hub"
+    for variable in ["GITHUB_TOKEN", "GH_TOKEN", "GITHUB_ISSUES_BACKEND"]:
+        monkeypatch.delenv(variable, raising=False)
+    monkeypatch.setenv("HUB_CONFIG", str(tmp_path / "missing"))
+
+    monkeypatch.setattr(backends, "_backends", {})
+    assert isinstance(backends.get_backend(checkoutdir), backends.HubBackend)
+    assert "Using hub" in capsys.readouterr().err
+    # a token for another host (GitHub Enterprise) doesn't select the REST backend
+    monkeypatch.setenv("HUB_CONFIG", str(hubconfig))
+    hubconfig.write_text("github.example.com:\n- user: someone\n  oauth_token: enterprisetoken\n  protocol: https\n")
+    monkeypatch.setattr(backends, "_backends", {})
+    assert isinstance(backends.get_backend(checkoutdir), backends.HubBackend)
+    # hub's own github.com token selects the REST backend unless hub is asked for
+    hubconfig.write_text("github.example.com:\n- user: someone\n  oauth_token: enterprisetoken\ngithub.com:\n- user: someone\n  oauth_token: hubtoken\n")
+    monkeypatch.setattr(backends, "_backends", {})
+    backend = backends.get_backend(checkoutdir)
+    assert isinstance(backend, backends.RestBackend) and backend.token == "hubtoken"
+    assert "REST API with the token from " + str(hubconfig) in capsys.readouterr().err
+    monkeypatch.setenv("GITHUB_ISSUES_BACKEND", "hub")
+    monkeypatch.setattr(backends, "_backends", {})
+    assert isinstance(backends.get_backend(checkoutdir), backends.HubBackend)
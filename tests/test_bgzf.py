@@ -0,0 +1,51 @@
+import os
+import shutil
+import random
+
+import pytest
+
+from github_issues import bgzf
+from github_issues import create_new_issues
+
+# tests/data/calls.vcf.gz is a bgzipped VCF of 3000 records on two
+# chromosomes (a few of them 20 kb deletions that span index bins), indexed
+# by tabix both ways: calls.vcf.gz.tbi and calls.vcf.gz.csi (tabix --csi)
+datadir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+@pytest.fixture(params=[".tbi", ".csi"])
+def indexed_vcf(request, tmp_path) -> str:
+    vcffile = str(tmp_path / "calls.vcf.gz")
+    shutil.copyfile(os.path.join(datadir, "calls.vcf.gz"), vcffile)
+    shutil.copyfile(os.path.join(datadir, "calls.vcf.gz" + request.param), vcffile + request.param)
+    return vcffile
+
+def filter_regions() -> list:
+    rng = random.Random(5)
+    regionstrings = ["chr2_PATERNAL", "chr1_MATERNAL:1-5000", "chr3_MATERNAL:1-1000000"]
+    for i in range(40):
+        start = rng.randrange(1, 5000000)
+        regionstrings.append(rng.choice(["chr1_MATERNAL", "chr2_PATERNAL"]) + ":" + str(start) + "-" + str(start + rng.randrange(1, 200000)))
+    return regionstrings
+
+def test_index_names_the_chromosomes(indexed_vcf):
+    index = bgzf.read_index(bgzf.find_index(indexed_vcf))
+    assert sorted(index["references"].keys()) == ["chr1_MATERNAL", "chr2_PATERNAL"]
+
+def test_indexed_reads_match_unindexed(indexed_vcf, tmp_path):
+    # without its index the same file is read start to end
+    unindexed = str(tmp_path / "unindexed.vcf.gz")
+    shutil.copyfile(indexed_vcf, unindexed)
+    for regionstrings in [[regionstring] for regionstring in filter_regions()[:10]] + [filter_regions()]:
+        regionfilter = create_new_issues.read_region_filter(regionstrings, None)
+        [indexedlines, indexedregions] = create_new_issues.read_issue_vcffile(indexed_vcf, regionfilter)
+        [unindexedlines, unindexedregions] = create_new_issues.read_issue_vcffile(unindexed, regionfilter)
+        # indexed reads go chromosome by chromosome in the filter's order
+        assert indexedlines == unindexedlines
+        assert sorted(indexedregions) == sorted(unindexedregions)
+
+def test_shared_chunks_are_read_once(indexed_vcf):
+    index = bgzf.read_index(bgzf.find_index(indexed_vcf))
+    # nearby regions that share their coarse bins' chunks
+    regionlist = [[start, start + 100] for start in range(1000, 200000, 5000)]
+    lines = list(bgzf.iterate_region_lines(indexed_vcf, index, "chr1_MATERNAL", regionlist))
+    assert len(lines) == len(set(lines))
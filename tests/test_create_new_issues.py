@@ -0,0 +1,88 @@
+import pytest
+
+from github_issues import backends
+from github_issues import create_new_issues
+from github_issues import fakegithub
+from github_issues import journal
+from github_issues import ratelimit
+from github_issues import trace
+
+regionlist = ["chr1_MATERNAL:100-110", "chr1_MATERNAL:500-510"]
+vcflines = dict((region, region.replace(":", "\t") + "\tA\tT\n") for region in regionlist)
+
+class FlakyGitHub(fakegithub.FakeGitHub):
+    # fails the first creation of each listed region: "lost" creates the issue and then
+    # loses the answer, "refused" is turned down, "dropped" never reaches github
+    failures = {}
+
+    def create_issue(self, name: str, comment: str, labels: list) -> int:
+        failure = self.failures.pop(name[len(create_new_issues.issuenameprefix):], None)
+        if failure == "lost":
+            super().create_issue(name, comment, labels)
+            raise backends.UncertainOutcome("connection dropped")
+        if failure == "refused":
+            return -1
+        if failure == "dropped":
+            raise backends.UncertainOutcome("connection dropped")
+        return super().create_issue(name, comment, labels)
+
+@pytest.fixture
+def nosleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(trace, "sleep", lambda seconds, reason: sleeps.append(reason))
+    return sleeps
+
+def create_issues(tmp_path, failures: dict) -> list:
+    fake = FlakyGitHub()
+    fake.failures = dict(failures)
+    backends.set_backend(str(tmp_path), fake)
+    creationjournal = journal.CreationJournal(str(tmp_path / "test.journal"))
+    issueids = create_new_issues.create_github_issues(regionlist, vcflines, {}, ["merqury"], str(tmp_path), "v0.7",
+                                                      ratelimit.TokenBucket(1000, 1000), 2, creationjournal)
+    creationjournal.close()
+    return [fake, issueids, journal.CreationJournal(str(tmp_path / "test.journal"))]
+
+def test_lost_creation_is_found_not_repeated(tmp_path, nosleep):
+    [fake, issueids, creationjournal] = create_issues(tmp_path, {"chr1_MATERNAL:100-110":"lost"})
+    assert fake.calls["create"] == 2
+    assert sorted(issue["title"] for issue in fake.issues.values()) == ["Issue: " + region for region in regionlist]
+    assert creationjournal.created_issues() == issueids
+    assert creationjournal.states["chr1_MATERNAL:100-110"]["message"] == "found in snapshot"
+
+def test_failures_that_created_nothing_are_retried(tmp_path, nosleep):
+    [fake, issueids, creationjournal] = create_issues(tmp_path, {"chr1_MATERNAL:100-110":"refused", "chr1_MATERNAL:500-510":"dropped"})
+    assert sorted(issue["title"] for issue in fake.issues.values()) == ["Issue: " + region for region in regionlist]
+    assert sorted(issueids.keys()) == regionlist
+    assert creationjournal.unconfirmed_regions() == []
+
+def test_hub_failures(tmp_path, monkeypatch):
+    # hub's own report of a refused request, and a failure that says nothing about the issue
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    hubscript = bindir / "hub"
+    monkeypatch.setenv("PATH", str(bindir), prepend=":")
+    backend = backends.HubBackend(str(tmp_path))
+    hubscript.write_text("#!/bin/sh\necho 'Error creating issue: Unprocessable Entity (HTTP 422)' >&2\nexit 1\n")
+    hubscript.chmod(0o755)
+    assert backend.create_issue("Issue", "body", []) == -1
+    hubscript.write_text("#!/bin/sh\necho 'Post \"https://api.github.com/repos/o/r/issues\": EOF' >&2\nexit 1\n")
+    with pytest.raises(backends.UncertainOutcome):
+        backend.create_issue("Issue", "body", [])
+
+def test_cluster_vcf_records(tmp_path):
+    vcffile = tmp_path / "calls.vcf"
+    records = [["chr1_MATERNAL", 1000, "ACGT"], ["chr1_MATERNAL", 1002, "G"], ["chr1_MATERNAL", 1010, "T"],
+               ["chr1_MATERNAL", 1100, "A"], ["chr2_PATERNAL", 5, "C"], ["chr1_MATERNAL", 1101, "A"], ["chr10_MATERNAL", 7, "TT"]]
+    vcffile.write_text("##fileformat=VCFv4.2\n" + "".join([chrom + "\t" + str(position) + "\t.\t" + ref + "\tN\t30\tPASS\t.\n" for [chrom, position, ref] in records]))
+    [vcflines, regionlist] = create_new_issues.read_issue_vcffile(str(vcffile))
+    assert regionlist[:2] == ["chr1_MATERNAL:1000-1003", "chr1_MATERNAL:1002-1002"]
+
+    # records within 10 bases of the cluster's end join it; chromosomes never merge
+    [clusteredlines, clusteredregions] = create_new_issues.cluster_vcf_records(vcflines, regionlist, 10)
+    assert clusteredregions == ["chr1_MATERNAL:1000-1010", "chr1_MATERNAL:1100-1101", "chr2_PATERNAL:5-5", "chr10_MATERNAL:7-8"]
+    assert clusteredlines["chr1_MATERNAL:1000-1010"] == vcflines["chr1_MATERNAL:1000-1003"] + vcflines["chr1_MATERNAL:1002-1002"] + vcflines["chr1_MATERNAL:1010-1010"]
+    assert clusteredlines["chr2_PATERNAL:5-5"] == vcflines["chr2_PATERNAL:5-5"]
+
+    # at distance 0 only overlapping records merge, not adjacent ones
+    [clusteredlines, clusteredregions] = create_new_issues.cluster_vcf_records(vcflines, regionlist, 0)
+    assert clusteredregions == ["chr1_MATERNAL:1000-1003", "chr1_MATERNAL:1010-1010", "chr1_MATERNAL:1100-1100", "chr1_MATERNAL:1101-1101", "chr2_PATERNAL:5-5", "chr10_MATERNAL:7-8"]
@@ -0,0 +1,50 @@
+import random
+
+from github_issues import intervals
+
+def random_index(rng: random.Random, numintervals: int) -> list:
+    entries = {}
+    for i in range(numintervals):
+        chrom = rng.choice(["chr1_MATERNAL", "chr2_PATERNAL"])
+        start = rng.randrange(1, 10000)
+        intervals.add_interval(entries, chrom, start, start + rng.choice([0, 5, 50, 500, 3000]), i)
+    return [entries, intervals.build_interval_index(entries)]
+
+def test_overlaps_match_brute_force():
+    rng = random.Random(1)
+    # sizes around the powers of two that shape the implicit tree
+    for numintervals in [0, 1, 2, 3, 7, 8, 9, 31, 33, 200, 1000]:
+        [entries, index] = random_index(rng, numintervals)
+        for query in range(200):
+            chrom = rng.choice(["chr1_MATERNAL", "chr2_PATERNAL", "chrX_MATERNAL"])
+            start = rng.randrange(1, 11000)
+            end = start + rng.choice([0, 10, 1000])
+            expected = sorted([entry for entry in entries.get(chrom, []) if entry[0] <= end and entry[1] >= start])
+            hits = intervals.overlapping_intervals(index, chrom, start, end)
+            assert sorted(hits) == expected
+            assert [hit[0] for hit in hits] == sorted([hit[0] for hit in hits])
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(2)
+    [entries, index] = random_index(rng, 300)
+    accept = lambda data: data % 3 != 0
+    for query in range(200):
+        chrom = rng.choice(["chr1_MATERNAL", "chr2_PATERNAL"])
+        start = rng.randrange(1, 11000)
+        end = start + rng.choice([0, 10])
+        count = rng.choice([1, 3, 10])
+        distances = sorted([max(0, entry[0] - end, start - entry[1]) for entry in entries[chrom] if accept(entry[2])])
+        nearest = intervals.nearest_intervals(index, chrom, start, end, count, accept)
+        assert [hit[3] for hit in nearest] == distances[:count]
+        for [hitstart, hitend, data, distance] in nearest:
+            assert accept(data) and distance == max(0, hitstart - end, start - hitend)
+
+def test_nearest_edge_cases():
+    entries = {}
+    intervals.add_interval(entries, "chr1_MATERNAL", 100, 200, "a")
+    intervals.add_interval(entries, "chr1_MATERNAL", 300, 400, "b")
+    index = intervals.build_interval_index(entries)
+    assert intervals.nearest_intervals(index, "chr1_MATERNAL", 150, 150, 5) == [[100, 200, "a", 0], [300, 400, "b", 150]]
+    assert intervals.nearest_intervals(index, "chr1_MATERNAL", 240, 240, 1) == [[100, 200, "a", 40]]
+    assert intervals.nearest_intervals(index, "chr2_MATERNAL", 250, 250, 1) == []
+    assert intervals.nearest_intervals(index, "chr1_MATERNAL", 250, 250, 0) == []
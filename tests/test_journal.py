@@ -0,0 +1,23 @@
+from github_issues import journal
+
+def test_resume_after_truncated_line(tmp_path):
+    journalfile = str(tmp_path / "test.journal")
+    creationjournal = journal.CreationJournal(journalfile)
+    creationjournal.record("chr1_MATERNAL:100-110", "submitted")
+    creationjournal.record("chr1_MATERNAL:100-110", "created", 7)
+    creationjournal.record("chr1_MATERNAL:200-210", "submitted")
+    creationjournal.close()
+
+    # the run is killed part way through writing a record
+    with open(journalfile, 'a') as fh_journal:
+        fh_journal.write('{"region": "chr1_MATERNAL:200-210", "sta')
+
+    creationjournal = journal.CreationJournal(journalfile)
+    assert creationjournal.unconfirmed_regions() == ["chr1_MATERNAL:200-210"]
+    creationjournal.record("chr1_MATERNAL:200-210", "created", 8)
+    creationjournal.close()
+
+    creationjournal = journal.CreationJournal(journalfile)
+    assert creationjournal.created_issues() == {"chr1_MATERNAL:100-110":7, "chr1_MATERNAL:200-210":8}
+    assert creationjournal.unconfirmed_regions() == []
+    creationjournal.close()
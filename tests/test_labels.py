@@ -0,0 +1,52 @@
+import pytest
+
+from github_issues import labels
+
+@pytest.fixture(autouse=True)
+def default_taxonomy():
+    yield
+    labels.set_taxonomy(labels.defaulttaxonomy)
+
+def test_default_classification():
+    labels.set_taxonomy(labels.defaulttaxonomy)
+    assert labels.classify_label("alpha_sat") == 0
+    assert labels.classify_label("hsat2") == 0
+    assert labels.classify_label("low_cov_pri") == 1
+    assert labels.classify_label("hifi_evidence") == 2
+    assert labels.classify_label("merqury") == 6
+    assert labels.classify_label("unknown") == -1
+
+def test_patterns_with_their_own_groups():
+    labels.set_taxonomy({"categories": [
+        {"column":"satellite", "patterns":["(?P<kind>hsat)\\d", "beta(_sat)?"], "default":"no"},
+        {"column":"repeat", "patterns":["(?P<kind>[a-z]+)_repeat", "(ab)\\1", "line.*"], "default":"no"},
+        {"column":"other", "patterns":[".*"], "default":"none"}
+    ]})
+    assert labels.classify_label("hsat3") == 0
+    assert labels.classify_label("beta") == 0
+    assert labels.classify_label("tandem_repeat") == 1
+    assert labels.classify_label("abab") == 1
+    assert labels.classify_label("line1") == 1
+    assert labels.classify_label("hsat") == 2
+
+def test_patterns_with_inline_flags():
+    labels.set_taxonomy({"categories": [
+        {"column":"satellite", "patterns":["(?i)hsat\\d", "beta"], "default":"no"},
+        {"column":"other", "patterns":["(?a)\\w+"], "default":"none"}
+    ]})
+    assert labels.classify_label("HSat2") == 0
+    assert labels.classify_label("beta") == 0
+    assert labels.classify_label("Beta") == 1
+
+def test_first_category_wins():
+    labels.set_taxonomy({"categories": [
+        {"column":"first", "patterns":["(x)y"], "default":"no"},
+        {"column":"second", "labels":["xy", "xz"], "patterns":["x.*"], "default":"no"}
+    ]})
+    assert labels.classify_label("xy") == 0
+    assert labels.classify_label("xz") == 1
+    assert labels.classify_label("xw") == 1
+
+def test_invalid_pattern_exits():
+    with pytest.raises(SystemExit):
+        labels.set_taxonomy({"categories": [{"column":"broken", "patterns":["(unclosed"], "default":"no"}]})
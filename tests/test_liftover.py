@@ -0,0 +1,38 @@
+from github_issues import liftover
+from github_issues import regions
+from github_issues import retrieve_issues_from_github
+
+# chrA positions 101-1100 align to chrB 201-1200, then after a 50 base gap
+# 1151-3150 align to 1301-3300; chrR 1-3000 aligns to the reverse strand of chrC
+chain = """chain 100 chrA 10000 + 100 3150 chrB 20000 + 200 3300 1
+1000 50 100
+2000
+
+chain 50 chrR 3000 + 0 3000 chrC 4000 - 500 3500 2
+3000
+"""
+
+def chain_index(tmp_path) -> dict:
+    chainfile = tmp_path / "test.chain"
+    chainfile.write_text(chain)
+    return liftover.load_alignment_index(str(chainfile))
+
+def test_lift_region(tmp_path):
+    index = chain_index(tmp_path)
+    assert liftover.lift_region(index, regions.Region("chrA", 101, 110)) == ["lifted", "chrB:201-210", ""]
+    assert liftover.lift_region(index, regions.Region("chrA", 1151, 1151)) == ["lifted", "chrB:1301-1301", ""]
+    assert liftover.lift_region(index, regions.Region("chrR", 10, 20)) == ["lifted", "chrC:3481-3491", "reverse strand"]
+    assert liftover.lift_region(index, regions.Region("chrA", 1091, 1160))[:2] == ["partial", "chrB:1191-1310"]
+    assert liftover.lift_region(index, regions.Region("chrA", 5000, 5010))[0] == "unliftable"
+
+def test_export_lifts_only_the_source_assembly(tmp_path, capsys):
+    chainfile = tmp_path / "test.chain"
+    chainfile.write_text(chain)
+    regiondict = {"chrA:101-110":{"issuename":"old", "issueid":"1", "assembly":"v0.7"},
+                  "chrB:5000-5010":{"issuename":"current", "issueid":"2", "assembly":"v1.0"},
+                  "chrA:5000-5010":{"issuename":"unliftable", "issueid":"3", "assembly":"v0.7"},
+                  "chrA:201-210":{"issuename":"other", "issueid":"4", "assembly":"v0.5"}}
+    lifted = retrieve_issues_from_github.lift_region_dict(regiondict, str(chainfile), "v0.7", "v1.0")
+    assert sorted([[region, lifted[region]["issueid"]] for region in lifted.keys()]) == [["chrB:201-210", "1"], ["chrB:5000-5010", "2"]]
+    messages = capsys.readouterr().err
+    assert "issue 3" in messages and "issue 4" in messages
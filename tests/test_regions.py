@@ -0,0 +1,33 @@
+import re
+import random
+
+from github_issues import regions
+
+def padded_region(regionstring: str) -> str:
+    # the sort key regions replaced
+    m = re.search(r'(\S+)\:(\d+)\-(\d+)', regionstring)
+    [chrom, start, end] = m.groups()
+    for [name, replacement] in regions.chromosomerenames:
+        chrom = chrom.replace(name, replacement)
+    return chrom.zfill(50) + start.zfill(12) + end.zfill(12)
+
+def test_sort_matches_padded_regions():
+    rng = random.Random(13)
+    chroms = ["chr" + str(number) + haplotype for number in list(range(1, 23)) + ["X", "Y", "M", "EBV"] for haplotype in ["_MATERNAL", "_PATERNAL"]]
+    regionstrings = []
+    for i in range(5000):
+        start = rng.randrange(1, 250000000)
+        regionstrings.append(rng.choice(chroms) + ":" + str(start) + "-" + str(start + rng.randrange(0, 10000)))
+    assert sorted(regionstrings, key=regions.sort_key) == sorted(regionstrings, key=padded_region)
+
+def test_long_chromosome_names_sort_last():
+    longchrom = "chr1_MATERNAL_" + "x" * 60
+    regionstrings = [longchrom + ":5-10", "chrY_PATERNAL:100-200", "chr2_MATERNAL:1-2", longchrom + ":1-2"]
+    assert sorted(regionstrings, key=regions.sort_key) == ["chr2_MATERNAL:1-2", "chrY_PATERNAL:100-200", longchrom + ":1-2", longchrom + ":5-10"]
+
+def test_parse_region_cache_is_bounded():
+    for i in range(regions.regioncachesize + 10):
+        regions.parse_region("chr1_MATERNAL:" + str(i + 1) + "-" + str(i + 1))
+    assert regions.parse_region.cache_info().currsize <= regions.regioncachesize
+    assert regions.parse_region("not a region") is None
+    assert regions.make_region("chr1_MATERNAL:5-9").sortkey == regions.parse_region("chr1_MATERNAL:5-9").sortkey
@@ -0,0 +1,60 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import http.server
+
+import pytest
+
+from github_issues import backends
+from github_issues import fakegithub
+from github_issues import regions
+from github_issues import serve_issues
+
+def seeded_index(tmp_path) -> list:
+    fake = fakegithub.FakeGitHub()
+    for [start, issuelabels] in [[100, ["merqury"]], [500, ["phase_switch"]], [2000, ["merqury"]]]:
+        fake.add_issue("Issue at " + str(start), "### Assembly Region\nchr1_MATERNAL:" + str(start) + "-" + str(start + 10), issuelabels, [])
+    backends.set_backend(str(tmp_path), fake)
+    issueindex = serve_issues.IssueIndex(str(tmp_path))
+    issueindex.load()
+    return [fake, issueindex]
+
+@pytest.fixture
+def server(tmp_path):
+    [fake, issueindex] = seeded_index(tmp_path)
+    serve_issues.QueryHandler.issueindex = issueindex
+    httpserver = http.server.ThreadingHTTPServer(("127.0.0.1", 0), serve_issues.QueryHandler)
+    threading.Thread(target=httpserver.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:" + str(httpserver.server_address[1])
+    httpserver.shutdown()
+    httpserver.server_close()
+
+def get(url: str) -> list:
+    try:
+        with urllib.request.urlopen(url) as response:
+            return [response.status, json.loads(response.read())]
+    except urllib.error.HTTPError as error:
+        return [error.code, json.loads(error.read())]
+
+def test_overlap_and_nearest(server):
+    [status, issues] = get(server + "/overlap?region=chr1_MATERNAL:1-600")
+    assert status == 200 and [issue["issueid"] for issue in issues] == ["1", "2"]
+    [status, issues] = get(server + "/nearest?region=chr1_MATERNAL:1500-1500&count=2&labels=merqury")
+    assert [[issue["issueid"], issue["distance"]] for issue in issues] == [["3", 500], ["1", 1390]]
+
+def test_bad_regions_are_rejected(server):
+    assert get(server + "/overlap?region=chr1_MATERNAL:5-1")[0] == 400
+    assert get(server + "/overlap?region=nonsense")[0] == 400
+
+def test_query_regions_are_not_cached(server):
+    cachedbefore = regions.parse_region.cache_info().currsize
+    get(server + "/overlap?region=chr9_PATERNAL:123456-123457")
+    assert regions.parse_region.cache_info().currsize == cachedbefore
+
+def test_refresh_drops_transferred_issues(tmp_path):
+    [fake, issueindex] = seeded_index(tmp_path)
+    fake.transfer_issue("2", "owner/other")
+    assert issueindex.refresh() == 1
+    assert sorted(issueindex.issues.keys()) == ["1", "3"]
+    assert [issue["issueid"] for issue in issueindex.overlapping(regions.parse_region("chr1_MATERNAL:1-600"), lambda issue: True)] == ["1"]
@@ -0,0 +1,41 @@
+from github_issues import sheetdiff
+
+urlprefix = "https://github.com/owner/repo/issues/"
+sheetconfig = {"name":"test", "columns":{"IssueID":"issueid", "GithubURL":"url", "Curator":"assignedto", "Status":"status"},
+               "idcolumn":"IssueID", "urlcolumn":"GithubURL"}
+
+def issue(issueid: str, assignedto: str, status: str = "open") -> dict:
+    return {"issueid":issueid, "url":urlprefix + issueid, "assignedto":assignedto, "status":status}
+
+def test_column_positions():
+    headers = ["Notes", "Curator", "IssueID", "Unmapped"]
+    assert sheetdiff.column_positions(headers, sheetconfig["columns"]) == [[1, "Curator", "assignedto"], [2, "IssueID", "issueid"]]
+
+def test_diff_sheet():
+    values = [["IssueID", "Notes", "Curator", "GithubURL", "Status"],
+              ["1", "keep this", "curator1", urlprefix + "1", "open"],
+              ["2", "", "curator1", urlprefix + "2", "open"],
+              # the URL wins over a mistyped id
+              ["30", "", "", urlprefix + "3"],
+              ["9", "", "curator2", urlprefix + "9", "open"],
+              ["2", "", "curator1", urlprefix + "2", "open"],
+              ["", "a note with no issue", "", "", ""]]
+    github_issues = {"1":issue("1", "curator1"), "2":issue("2", "curator2", "closed"), "3":issue("3", "unassigned"), "4":issue("4", "curator3")}
+    changeset = sheetdiff.diff_sheet(values, sheetconfig, github_issues)
+    # one-based rows and columns
+    assert changeset.updates == [[3, 3, "2", "Curator", "curator1", "curator2"], [3, 5, "2", "Status", "open", "closed"],
+                                 [4, 1, "3", "IssueID", "30", "3"], [4, 3, "3", "Curator", "", "unassigned"], [4, 5, "3", "Status", "", "open"]]
+    assert changeset.cell_updates()[0] == [3, 3, "curator2"]
+    assert changeset.orphans == [[5, "9"]]
+    assert changeset.inserts == [["4", ["4", "", "curator3", urlprefix + "4", "open"]]]
+    # issues missing from the sheet are only appended to sheets configured for it
+    assert changeset.new_rows() == []
+    assert sheetdiff.diff_sheet(values, dict(sheetconfig, appendnew=True), github_issues).new_rows() == [["4", "", "curator3", urlprefix + "4", "open"]]
+
+def test_sheet_without_url_column():
+    config = dict(sheetconfig)
+    del config["urlcolumn"]
+    values = [["IssueID", "Curator"], ["1", "curator1"]]
+    changeset = sheetdiff.diff_sheet(values, config, {"1":issue("1", "curator2")})
+    assert changeset.updates == [[2, 2, "1", "Curator", "curator1", "curator2"]]
+    assert sheetdiff.diff_sheet([], config, {}).updates == []
@@ -0,0 +1,121 @@
+import pytest
+
+from github_issues import backends
+from github_issues import fakegithub
+from github_issues import snapshot
+
+class FailingGitHub(fakegithub.FakeGitHub):
+    # lists failafter issues, newest first, then fails the way a broken hub process or REST page does
+    failafter = None
+
+    def issue_records(self, state: str = None, since: str = None):
+        records = sorted(super().issue_records(state, since), key=lambda record: record[7], reverse=True)
+        for recordindex in range(len(records)):
+            if self.failafter is not None and recordindex == self.failafter:
+                raise backends.ListingFailed("listing interrupted")
+            yield records[recordindex]
+
+def seeded_checkout(tmp_path) -> FailingGitHub:
+    fake = FailingGitHub()
+    for number in range(1, 6):
+        fake.add_issue("Issue " + str(number), "### Assembly Region\nchr1_MATERNAL:" + str(number * 100) + "-" + str(number * 100 + 10), ["merqury"], [])
+        fake.issues[number]["updated"] = "2024-01-01T00:00:0" + str(number) + "Z"
+    backends.set_backend(str(tmp_path), fake)
+    return fake
+
+def snapshot_titles(checkoutdir: str) -> dict:
+    return dict((issue["issueid"], issue["name"]) for issue in snapshot.iterate_issues(checkoutdir, state="all"))
+
+def test_incremental_sync_fetches_updated_issues(tmp_path):
+    fake = seeded_checkout(tmp_path)
+    assert snapshot.sync_issues(str(tmp_path)) == 5
+    fake.issues[3]["title"] = "Issue 3 renamed"
+    fake.issues[3]["updated"] = "2024-01-02T00:00:00Z"
+    snapshot.sync_issues(str(tmp_path))
+    assert snapshot_titles(str(tmp_path))["3"] == "Issue 3 renamed"
+    assert snapshot.read_watermark(str(tmp_path)) == "2024-01-02T00:00:00Z"
+
+def test_incremental_sync_drops_transferred_issues(tmp_path):
+    fake = seeded_checkout(tmp_path)
+    snapshot.sync_issues(str(tmp_path))
+    fake.transfer_issue("2", "owner/other")
+    del fake.issues[4]
+    fake.issues[5]["state"] = "closed"
+    fake.issues[5]["updated"] = "2024-01-02T00:00:00Z"
+    snapshot.sync_issues(str(tmp_path))
+    assert sorted(snapshot_titles(str(tmp_path)).keys()) == ["1", "3", "5"]
+    assert [issue["issueid"] for issue in snapshot.iterate_issues(str(tmp_path))] == ["1", "3"]
+
+def test_rest_open_issue_numbers(tmp_path):
+    from restfixtures import StubbedRestBackend, github_checkout
+    checkoutdir = github_checkout(str(tmp_path))
+    def page(numbers: list, cursor: str) -> list:
+        return [200, {}, {"data":{"repository":{"issues":{"nodes":[{"number":number} for number in numbers], "pageInfo":{"hasNextPage":cursor is not None, "endCursor":cursor}}}}}]
+    backend = StubbedRestBackend(checkoutdir, [page([1, 2], "c1"), page([7], None)])
+    assert backend.open_issue_numbers() == set([1, 2, 7])
+    assert [request[2]["variables"]["cursor"] for request in backend.requests] == [None, "c1"]
+
+    backend = StubbedRestBackend(checkoutdir, [page([1, 2], "c1"), [200, {}, {"errors":[{"message":"timeout"}]}]])
+    with pytest.raises(backends.ListingFailed):
+        backend.open_issue_numbers()
+
+def test_failed_incremental_sync_keeps_watermark(tmp_path):
+    fake = seeded_checkout(tmp_path)
+    snapshot.sync_issues(str(tmp_path))
+    fake.issues[3]["title"] = "Issue 3 renamed"
+    fake.issues[3]["updated"] = "2024-01-03T00:00:00Z"
+    fake.issues[5]["title"] = "Issue 5 renamed"
+    fake.issues[5]["updated"] = "2024-01-05T00:00:00Z"
+
+    # the listing fails after delivering only issue 5
+    fake.failafter = 1
+    with pytest.raises(backends.ListingFailed):
+        snapshot.sync_issues(str(tmp_path))
+    assert snapshot.read_watermark(str(tmp_path)) == "2024-01-01T00:00:05Z"
+    assert snapshot_titles(str(tmp_path))["5"] == "Issue 5"
+
+    # so the next sync still picks up issue 3
+    fake.failafter = None
+    snapshot.sync_issues(str(tmp_path))
+    titles = snapshot_titles(str(tmp_path))
+    assert titles["3"] == "Issue 3 renamed"
+    assert titles["5"] == "Issue 5 renamed"
+
+def test_failed_full_sync_keeps_issues(tmp_path):
+    fake = seeded_checkout(tmp_path)
+    snapshot.sync_issues(str(tmp_path))
+    fake.failafter = 2
+    with pytest.raises(backends.ListingFailed):
+        snapshot.sync_issues(str(tmp_path), fullsync=True)
+    assert len(snapshot_titles(str(tmp_path))) == 5
+
+def test_failed_rest_page_is_not_committed(tmp_path):
+    from restfixtures import StubbedRestBackend, github_checkout, api_issue, next_page
+    checkoutdir = github_checkout(str(tmp_path))
+    backends.set_backend(checkoutdir, StubbedRestBackend(checkoutdir, [[200, {}, [api_issue(1, "2024-01-01T00:00:01Z")]]]))
+    snapshot.sync_issues(checkoutdir)
+
+    # page 1 of the next sync arrives, page 2 fails
+    backends.set_backend(checkoutdir, StubbedRestBackend(checkoutdir, [[200, next_page(2), [api_issue(5, "2024-01-05T00:00:00Z")]],
+                                                                       [500, {}, {"message":"Server Error"}]]))
+    with pytest.raises(backends.ListingFailed):
+        snapshot.sync_issues(checkoutdir)
+    assert snapshot.read_watermark(checkoutdir) == "2024-01-01T00:00:01Z"
+    assert list(snapshot_titles(checkoutdir).keys()) == ["1"]
+
+def test_failed_hub_listing_is_not_committed(tmp_path, monkeypatch):
+    # a hub that prints one issue and then fails
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    hubscript = bindir / "hub"
+    hubscript.write_text("#!/bin/sh\nprintf '7\\037url\\037open\\037Issue 7\\037\\037\\037body\\0372024-01-07T00:00:00Z\\036'\nexit 1\n")
+    hubscript.chmod(0o755)
+    monkeypatch.setenv("PATH", str(bindir), prepend=":")
+    checkoutdir = tmp_path / "checkout"
+    checkoutdir.mkdir()
+    backends.set_backend(str(checkoutdir), backends.HubBackend(str(checkoutdir)))
+
+    with pytest.raises(backends.ListingFailed):
+        snapshot.sync_issues(str(checkoutdir))
+    assert snapshot.read_watermark(str(checkoutdir)) is None
+    assert len(snapshot_titles(str(checkoutdir))) == 0
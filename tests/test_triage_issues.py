@@ -0,0 +1,67 @@
+import pytest
+
+from github_issues import backends
+from github_issues import callhub
+from github_issues import fakegithub
+from github_issues import snapshot
+from github_issues import triage_issues
+
+@pytest.fixture
+def checkout(tmp_path, monkeypatch):
+    monkeypatch.setattr(callhub, "defaultbulkrate", 60000)
+    fake = fakegithub.FakeGitHub()
+    for [start, issuelabels] in [[100, ["merqury"]], [500, ["phase_switch"]], [2000, ["merqury", "hsat2"]]]:
+        fake.add_issue("Issue at " + str(start), "### Assembly Region\nchr1_MATERNAL:" + str(start) + "-" + str(start + 10), issuelabels, [])
+    backends.set_backend(str(tmp_path), fake)
+    bedfile = tmp_path / "resolved.bed"
+    bedfile.write_text("track name=resolved\nchr1_MATERNAL\t90\t520\tpolished\nchr1_MATERNAL\t2005\t2006\n")
+    return [fake, str(tmp_path), str(bedfile)]
+
+def snapshot_state(checkoutdir: str) -> list:
+    return [[issue["issueid"], issue["status"], sorted(issue["labels"])] for issue in snapshot.iterate_issues(checkoutdir, state="all")]
+
+def test_triage_updates_the_snapshot(checkout):
+    [fake, checkoutdir, bedfile] = checkout
+    triage_issues.main(["-s", checkoutdir, "-l", "merqury", "--add-labels", "false_positive", "--remove-labels", "merqury", bedfile])
+    assert [fake.issues[number]["state"] for number in [1, 2, 3]] == ["closed", "open", "closed"]
+    assert snapshot_state(checkoutdir) == [["1", "closed", ["false_positive"]], ["2", "open", ["phase_switch"]], ["3", "closed", ["false_positive", "hsat2"]]]
+
+    triage_issues.main(["-s", checkoutdir, "-a", "transfer", "-d", "owner/other", bedfile])
+    assert list(fake.transferred.keys()) == [2]
+    assert [state[0] for state in snapshot_state(checkoutdir)] == ["1", "3"]
+
+def test_find_overlapping_issues(checkout):
+    [fake, checkoutdir, bedfile] = checkout
+    snapshot.sync_issues(checkoutdir)
+    bedintervals = triage_issues.read_bed_intervals(bedfile)
+    # BED starts are zero-based; unnamed intervals are named for their region
+    assert bedintervals == [["chr1_MATERNAL", 91, 520, "polished"], ["chr1_MATERNAL", 2006, 2006, "chr1_MATERNAL:2006-2006"]]
+    matches = triage_issues.find_overlapping_issues(snapshot.iterate_issues(checkoutdir), bedintervals, [])
+    assert dict((issueid, matches[issueid][1]) for issueid in matches.keys()) == {"1":["polished"], "2":["polished"], "3":["chr1_MATERNAL:2006-2006"]}
+    matches = triage_issues.find_overlapping_issues(snapshot.iterate_issues(checkoutdir), bedintervals, ["merqury", "hsat2"])
+    assert list(matches.keys()) == ["3"]
+
+def test_triage_updates(checkout):
+    [fake, checkoutdir, bedfile] = checkout
+    snapshot.sync_issues(checkoutdir)
+    matches = triage_issues.find_overlapping_issues(snapshot.iterate_issues(checkoutdir), triage_issues.read_bed_intervals(bedfile), [])
+    assert triage_issues.triaged_labels(matches["3"][0], ["merqury"], []) is None
+    assert triage_issues.triaged_labels(matches["3"][0], ["false_positive"], ["hsat2"]) == ["merqury", "false_positive"]
+
+    # relabeling skips issues whose labels wouldn't change
+    updates = triage_issues.triage_updates(matches, "relabel", ["merqury"], [], None)
+    assert list(updates.keys()) == ["2"]
+    assert updates["2"](fake)[0] and fake.issues[2]["labels"] == ["phase_switch", "merqury"]
+    assert fake.issues[2]["state"] == "open"
+
+    updates = triage_issues.triage_updates(matches, "transfer", [], [], "owner/other")
+    assert sorted(updates.keys()) == ["1", "2", "3"]
+    updates["1"](fake)
+    assert fake.transferred == {1:"owner/other"}
+
+def test_dryrun_changes_nothing(checkout, capsys):
+    [fake, checkoutdir, bedfile] = checkout
+    triage_issues.main(["-s", checkoutdir, "--dryrun", bedfile])
+    assert "3 open issues overlap 2 BED intervals, 3 to close" in capsys.readouterr().out
+    assert [issue["state"] for issue in fake.issues.values()] == ["open"] * 3
+    assert "close" not in fake.calls